@@ -39,6 +39,9 @@ urlpatterns = [
     path('stores/add/', views.StoreCreateView.as_view(), name='store_create'),
     path('stores/<int:pk>/edit/', views.StoreUpdateView.as_view(), name='store_update'),
     
+    # Company Admin: Audit Log
+    path('audit-log/', views.AuditLogListView.as_view(), name='audit_log'),
+    
     # Company Admin: Data Purge
     path('purge/', views.DataPurgeView.as_view(), name='data_purge'),
 ]
@@ -5,6 +5,7 @@ Separated into:
 - Company Admin: Can manage users, stores within their company
 """
 
+import logging
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
@@ -14,12 +15,15 @@ from django.db.models import Count
 from django.http import Http404
 
 from apps.core.models import User, Store, AuditLog, Company, Role
+from apps.core.pagination import KeysetPaginationMixin
 from .forms import (
     UserForm, StoreForm, CompanyForm, CompanyAdminForm,
     CompanyModuleForm, UserModuleForm, CompanyDeleteForm, 
     DataPurgeForm, BackupRequestForm
 )
 
+logger = logging.getLogger(__name__)
+
 
 # --- Mixins ---
 
@@ -161,8 +165,35 @@ class UserUpdateView(LoginRequiredMixin, CompanyAdminRequiredMixin, UpdateView):
         return super().form_valid(form)
 
 
+# --- Company Admin: Audit Log ---
+
+class AuditLogListView(LoginRequiredMixin, CompanyAdminRequiredMixin, KeysetPaginationMixin, ListView):
+    """Company admin: Browse the company's audit trail, newest first."""
+    model = AuditLog
+    template_name = 'admin_portal/audit_log.html'
+    context_object_name = 'logs'
+    paginate_by = 50
+    keyset_ordering = ('-timestamp', '-id')
+
+    def get_queryset(self):
+        qs = AuditLog.objects.filter(company=self.request.user.company).select_related('user')
+        action = self.request.GET.get('action')
+        if action:
+            qs = qs.filter(action_type=action)
+        return qs
+
+
 # --- Company Admin: Store Management ---
 
+def relink_store_locations(company):
+    """Point imported sales/stock rows at stores again after a store's names change."""
+    from apps.analytics.locations import relink_locations
+    try:
+        relink_locations(company)
+    except Exception as e:
+        logger.error(f"Location relink failed for company {company.id}: {e}")
+
+
 class StoreListView(LoginRequiredMixin, CompanyAdminRequiredMixin, ListView):
     """Company admin: List stores in their company."""
     model = Store
@@ -181,26 +212,9 @@ class StoreCreateView(LoginRequiredMixin, CompanyAdminRequiredMixin, CreateView)
     success_url = reverse_lazy('admin_portal:store_list')
     
     def get_available_locations(self):
-        """Fetch unique locations from StockSnapshot and SalesRecord for the company."""
-        from apps.analytics.models import StockSnapshot, SalesRecord
-        
-        company = self.request.user.company
-        locations = set()
-        
-        # Get unique locations from StockSnapshot
-        stock_locations = StockSnapshot.objects.filter(
-            company=company
-        ).exclude(location='').values_list('location', flat=True).distinct()
-        locations.update(stock_locations)
-        
-        # Get unique regions from SalesRecord (used as locations)
-        sales_regions = SalesRecord.objects.filter(
-            company=company
-        ).exclude(region='').values_list('region', flat=True).distinct()
-        locations.update(sales_regions)
-        
-        # Sort and return as list
-        return sorted([loc for loc in locations if loc])
+        """Location strings seen in imports for the company, from the location alias table."""
+        from apps.analytics.locations import available_locations
+        return available_locations(self.request.user.company)
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -215,7 +229,9 @@ class StoreCreateView(LoginRequiredMixin, CompanyAdminRequiredMixin, CreateView)
     def form_valid(self, form):
         form.instance.company = self.request.user.company
         messages.success(self.request, "Store created successfully!")
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        relink_store_locations(self.object.company)
+        return response
 
 
 
@@ -230,26 +246,9 @@ class StoreUpdateView(LoginRequiredMixin, CompanyAdminRequiredMixin, UpdateView)
         return Store.objects.filter(company=self.request.user.company)
     
     def get_available_locations(self):
-        """Fetch unique locations from StockSnapshot and SalesRecord for the company."""
-        from apps.analytics.models import StockSnapshot, SalesRecord
-        
-        company = self.request.user.company
-        locations = set()
-        
-        # Get unique locations from StockSnapshot
-        stock_locations = StockSnapshot.objects.filter(
-            company=company
-        ).exclude(location='').values_list('location', flat=True).distinct()
-        locations.update(stock_locations)
-        
-        # Get unique regions from SalesRecord (used as locations)
-        sales_regions = SalesRecord.objects.filter(
-            company=company
-        ).exclude(region='').values_list('region', flat=True).distinct()
-        locations.update(sales_regions)
-        
-        # Sort and return as list
-        return sorted([loc for loc in locations if loc])
+        """Location strings seen in imports for the company, from the location alias table."""
+        from apps.analytics.locations import available_locations
+        return available_locations(self.request.user.company)
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -263,7 +262,9 @@ class StoreUpdateView(LoginRequiredMixin, CompanyAdminRequiredMixin, UpdateView)
 
     def form_valid(self, form):
         messages.success(self.request, "Store updated successfully!")
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        relink_store_locations(self.object.company)
+        return response
 
 
 
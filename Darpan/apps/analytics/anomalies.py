@@ -0,0 +1,151 @@
+"""
+Daily sales anomaly detection for Darpan analytics.
+Scores each location's daily net sales against a rolling robust baseline (median and
+median absolute deviation of the preceding selling days) read from DailySalesRollup, and
+stores the location-days that fall far outside it in SalesAnomaly.
+"""
+
+import logging
+import warnings
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from django.db import transaction
+from django.db.models import Sum, Min, Max
+
+from .models import DailySalesRollup, SalesAnomaly
+
+logger = logging.getLogger(__name__)
+
+# Preceding days in each baseline
+WINDOW_DAYS = 28
+
+# Days with data needed in the window before a day is scored
+MIN_BASELINE_DAYS = 14
+
+# Robust z-score above which a day is flagged (Iglewicz-Hoaglin)
+THRESHOLD = 3.5
+
+# Scales the MAD to a standard deviation for normally distributed sales
+MAD_SCALE = 0.6745
+
+# Floor on the MAD as a share of the baseline, so very steady locations aren't flagged on noise
+MIN_MAD_SHARE = 0.05
+
+# The baseline is taken over the window's selling days (net sales > 0), of which a location needs
+# MIN_SELLING_DAYS. Days without sales (or with only returns) are scored as drops only for locations
+# that sell on at least DAILY_SHARE of their days; for the rest such days are ordinary.
+MIN_SELLING_DAYS = 7
+DAILY_SHARE = 0.8
+
+
+def _daily_matrix(company, start, end):
+    """
+    Net sales (revenue less returns) per location per day, days x locations.
+    Days before a location's first sale in the range are NaN; days without rows after it are 0.
+    """
+    rows = DailySalesRollup.objects.filter(
+        company=company, date__gte=start, date__lte=end
+    ).values('region', 'date').annotate(revenue=Sum('revenue'), returns=Sum('return_amount')).order_by()
+
+    days = pd.date_range(start, end, freq='D')
+    df = pd.DataFrame.from_records(list(rows), columns=['region', 'date', 'revenue', 'returns'])
+    if df.empty:
+        return pd.DataFrame(index=days)
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['net'] = df['revenue'].astype(float) - df['returns'].astype(float).abs()
+    matrix = df.pivot_table(index='date', columns='region', values='net', aggfunc='sum').reindex(days)
+    opened = matrix.notna().cummax()
+    return matrix.fillna(0).where(opened)
+
+
+def score_days(matrix):
+    """
+    Robust z-scores of every day after the first WINDOW_DAYS against the selling days before it.
+
+    Returns:
+        (baseline, mad, score) arrays of shape (days - WINDOW_DAYS) x locations;
+        score is NaN where the day has no data or the baseline is too thin
+    """
+    values = matrix.to_numpy(dtype=float)
+    windows = sliding_window_view(values, WINDOW_DAYS, axis=0)[:-1]
+    current = values[WINDOW_DAYS:]
+
+    data_days = np.sum(~np.isnan(windows), axis=2)
+    selling_days = np.sum(windows > 0, axis=2)
+    # A median over all days is 0 for locations selling on fewer than half of them
+    selling = np.where(windows > 0, windows, np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # windows without selling days
+        baseline = np.nanmedian(selling, axis=2)
+        mad = np.nanmedian(np.abs(selling - baseline[..., None]), axis=2)
+
+    scale = np.maximum(mad, MIN_MAD_SHARE * baseline)
+    daily = selling_days >= DAILY_SHARE * data_days
+    usable = (
+        (data_days >= MIN_BASELINE_DAYS) & (selling_days >= MIN_SELLING_DAYS)
+        & ~np.isnan(current) & ((current > 0) | daily) & (scale > 0)
+    )
+    score = np.full(current.shape, np.nan)
+    np.divide(MAD_SCALE * (current - baseline), scale, out=score, where=usable)
+    return baseline, mad, score
+
+
+def detect_anomalies(company, dates=None):
+    """
+    Re-score the given days and the following WINDOW_DAYS (whose baselines include them).
+
+    Args:
+        dates: Days touched by an import (None re-scores the full history)
+
+    Returns:
+        List of SalesAnomaly rows stored for the re-scored range
+    """
+    bounds = DailySalesRollup.objects.filter(company=company).aggregate(first=Min('date'), latest=Max('date'))
+    dates = sorted(d for d in (dates or []) if d)
+    if not bounds['latest']:
+        return []
+
+    start = dates[0] if dates else bounds['first']
+    end = min(dates[-1] + timedelta(days=WINDOW_DAYS), bounds['latest']) if dates else bounds['latest']
+    if start > end:
+        return []
+
+    matrix = _daily_matrix(company, start - timedelta(days=WINDOW_DAYS), end)
+    anomalies = []
+    if len(matrix.columns) and len(matrix.index) > WINDOW_DAYS:
+        baseline, mad, score = score_days(matrix)
+        days = matrix.index[WINDOW_DAYS:]
+        current = matrix.to_numpy(dtype=float)[WINDOW_DAYS:]
+        for t, l in zip(*np.nonzero(np.abs(np.nan_to_num(score)) > THRESHOLD)):
+            anomalies.append(SalesAnomaly(
+                company=company,
+                location=matrix.columns[l],
+                date=days[t].date(),
+                revenue=round(float(current[t, l]), 2),
+                baseline=round(float(baseline[t, l]), 2),
+                mad=round(float(mad[t, l]), 2),
+                score=round(float(score[t, l]), 2),
+                direction='spike' if score[t, l] > 0 else 'drop',
+            ))
+
+    with transaction.atomic():
+        SalesAnomaly.objects.filter(company=company, date__gte=start, date__lte=end).delete()
+        SalesAnomaly.objects.bulk_create(anomalies, batch_size=1000)
+
+    logger.info(f"Anomalies re-scored for company {company.id} ({start} to {end}): {len(anomalies)} flagged")
+    return anomalies
+
+
+def anomaly_summary(anomaly):
+    """JSON-safe summary of an anomaly for ImportLog.anomalies."""
+    return {
+        'location': anomaly.location,
+        'date': anomaly.date.isoformat(),
+        'direction': anomaly.direction,
+        'revenue': float(anomaly.revenue),
+        'baseline': float(anomaly.baseline),
+    }
@@ -0,0 +1,220 @@
+"""
+Chart data endpoints for Darpan analytics.
+Each chart series is served as JSON from api/charts/<chart>/ and fetched by the page after it
+renders, so dashboards and reports no longer compute their charts before the first byte.
+Responses carry an ETag and Last-Modified from the company's data generation (latest import,
+plus the day for the nightly refreshes), so repeat views are answered with 304 Not Modified.
+The generation is the latest ImportLog id: derived tables rebuilt without an import (the
+rebuild_* tasks, relink_locations after store edits) only show up after the next import or
+at the day rollover.
+"""
+
+import hashlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Sum, Max, F
+from django.http import JsonResponse, Http404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
+
+from .models import SalesRecord, StockSnapshot, ImportLog, DailySalesRollup
+from .forecasting import forecast_chart
+from .reports import ReportAccessMixin, get_company, apply_filters, apply_rollup_filters, EXHIBITION_SALES
+from .store_reports import data_version
+from .timeseries import trend_series, DEFAULT_POINTS
+
+# Days shown by the dashboard trend
+TREND_DAYS = 30
+
+# Bars / slices per ranked chart (?limit=)
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def _limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def _series(rows, key, value):
+    return {
+        'labels': [r[key] or 'Unknown' for r in rows],
+        'values': [float(r[value] or 0) for r in rows],
+    }
+
+
+def _daily_series(daily_totals, days):
+    sorted_days = sorted(daily_totals)[-days:]
+    return {
+        'labels': [d.strftime('%d %b') for d in sorted_days],
+        'values': [daily_totals[d] for d in sorted_days],
+    }
+
+
+def _latest_stock(company):
+    stock_qs = StockSnapshot.objects.filter(company=company)
+    latest_date = stock_qs.aggregate(Max('snapshot_date'))['snapshot_date__max']
+    return stock_qs.filter(snapshot_date=latest_date) if latest_date else stock_qs
+
+
+def sales_trend(request, company):
+    """Daily sales of the last TREND_DAYS days"""
+    since = timezone.now().date() - timedelta(days=TREND_DAYS)
+    recent_sales = SalesRecord.objects.filter(
+        company=company, transaction_type='sale', transaction_date__gte=since
+    ).values('transaction_date', 'final_amount')
+
+    # Group by date in Python (Oracle TruncDate has compatibility issues)
+    daily_totals = defaultdict(float)
+    for sale in recent_sales:
+        if sale['transaction_date'] and sale['final_amount']:
+            daily_totals[sale['transaction_date']] += float(sale['final_amount'])
+    return _daily_series(daily_totals, TREND_DAYS + 1)
+
+
+def sales_by_category(request, company):
+    rows = SalesRecord.objects.filter(company=company, transaction_type='sale').values('product_category').annotate(
+        total=Sum('revenue')
+    ).order_by('-total')[:_limit(request)]
+    return _series(rows, 'product_category', 'total')
+
+
+def sales_by_location(request, company):
+    rows = SalesRecord.objects.filter(company=company, transaction_type='sale').values('region').annotate(
+        total=Sum('revenue')
+    ).order_by('-total')[:_limit(request)]
+    return _series(rows, 'region', 'total')
+
+
+def stock_by_location(request, company):
+    rows = _latest_stock(company).values('location').annotate(
+        value=Sum(F('quantity') * F('sale_price'))
+    ).order_by('-value')[:_limit(request)]
+    return _series(rows, 'location', 'value')
+
+
+def stock_by_category(request, company):
+    rows = _latest_stock(company).values('category').annotate(
+        value=Sum(F('quantity') * F('sale_price'))
+    ).order_by('-value')[:_limit(request)]
+    return _series(rows, 'category', 'value')
+
+
+def sales_forecast(request, company):
+    """Forecast vs actual by day (precomputed nightly, see apps.analytics.forecasting)"""
+    forecast = forecast_chart(company)
+    return {
+        'labels': forecast['labels'],
+        'values': forecast['forecast'],
+        'actual': forecast['actual'],
+        'wape': forecast['wape'],
+    }
+
+
+def _date_param(request, name):
+    try:
+        return datetime.strptime(request.GET.get(name, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _report_trend(request, company, extra=None):
+    """
+    Revenue trend for the report filters, downsampled to ?points= (see apps.analytics.timeseries).
+    Read from the rollup, or from the sale lines when filtering by subcategory, which the rollup lacks.
+    """
+    if [s for s in request.GET.getlist('subcategory') if s]:
+        queryset = apply_filters(
+            SalesRecord.objects.filter(company=company, transaction_type='sale'), request, with_dates=False
+        )
+        date_field = 'transaction_date'
+    else:
+        queryset = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), request, with_dates=False)
+        date_field = 'date'
+    if extra is not None:
+        queryset = queryset.filter(extra)
+    try:
+        points = int(request.GET.get('points', DEFAULT_POINTS))
+    except ValueError:
+        points = DEFAULT_POINTS
+    return trend_series(
+        queryset, date_field, 'revenue',
+        _date_param(request, 'date_from'), _date_param(request, 'date_to'), points,
+    )
+
+
+def report_sales_trend(request, company):
+    """Revenue trend for the sales report filters"""
+    return _report_trend(request, company)
+
+
+def exhibition_trend(request, company):
+    """Exhibition revenue trend for the exhibition report filters"""
+    return _report_trend(request, company, EXHIBITION_SALES)
+
+
+CHARTS = {
+    'sales-trend': sales_trend,
+    'sales-by-category': sales_by_category,
+    'sales-by-location': sales_by_location,
+    'stock-by-location': stock_by_location,
+    'stock-by-category': stock_by_category,
+    'sales-forecast': sales_forecast,
+    'report-sales-trend': report_sales_trend,
+    'exhibition-trend': exhibition_trend,
+}
+
+# Report charts that take the report filters (so ?store=); the rest are company-wide
+STORE_SCOPED_CHARTS = {'report-sales-trend', 'exhibition-trend'}
+
+
+def _generation(request):
+    """(data version, last modified) of the requesting user's company, looked up once per request"""
+    if not hasattr(request, '_chart_generation'):
+        company = get_company(request.user)
+        version = data_version(company)
+        imported_at = ImportLog.objects.filter(id=version).values_list('imported_at', flat=True).first()
+        # Nightly jobs (forecasts) refresh derived tables without an import, so a new day is a new generation
+        today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        request._chart_generation = (version, max(imported_at, today) if imported_at else today)
+    return request._chart_generation
+
+
+def chart_etag(request, chart):
+    version, _ = _generation(request)
+    params = '&'.join(f'{k}={",".join(sorted(request.GET.getlist(k)))}' for k in sorted(request.GET))
+    digest = hashlib.md5(f'{request.user.pk}|{params}'.encode()).hexdigest()[:12]
+    return f'{chart}-{version}-{timezone.localdate():%Y%m%d}-{digest}'
+
+
+def chart_last_modified(request, chart):
+    return _generation(request)[1]
+
+
+class ChartDataView(LoginRequiredMixin, ReportAccessMixin, View):
+    """
+    One chart series as JSON: {labels, values, ...}; report charts take the report filter parameters.
+    Conditional GETs (If-None-Match / If-Modified-Since) get 304 until the data changes.
+    """
+
+    def allows_store_scope(self, chart=None, **kwargs):
+        return chart in STORE_SCOPED_CHARTS
+
+    def store_scope_denied(self):
+        raise PermissionDenied("This chart covers the whole company")
+
+    @method_decorator(condition(etag_func=chart_etag, last_modified_func=chart_last_modified))
+    def get(self, request, chart):
+        if chart not in CHARTS:
+            raise Http404(f"No chart '{chart}'")
+        response = JsonResponse(CHARTS[chart](request, get_company(request.user)))
+        # Keep a private copy but revalidate on every view
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
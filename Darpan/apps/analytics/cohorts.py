@@ -0,0 +1,195 @@
+"""
+Customer cohort retention for Darpan analytics.
+Groups customers by month of first purchase and counts how many buy again in each
+following month. Stored per cohort in CohortRetention; imports recompute only the
+cohorts whose members they touched, using CustomerProfile.first_purchase for membership.
+"""
+
+import logging
+from datetime import date
+import pandas as pd
+from django.db import transaction
+
+from .customers import MOBILE_CHUNK, valid_mobiles
+from .lookup import normalise_mobile_series, mobile_variants
+from .models import SalesRecord, CustomerProfile, CohortRetention
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(value):
+    return value.replace(day=1)
+
+
+def _next_month(value):
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _sales_frame(company, mobiles=None):
+    """Sale lines of the given customers (all customers when mobiles is None)."""
+    columns = ['mobile', 'bill', 'date', 'revenue']
+    base = SalesRecord.objects.filter(company=company, transaction_type='sale').exclude(client_mobile='')
+
+    if mobiles is None:
+        rows = list(base.values_list('client_mobile', 'transaction_no', 'transaction_date', 'revenue'))
+    else:
+        rows = []
+        for i in range(0, len(mobiles), MOBILE_CHUNK):
+            variants = [v for m in mobiles[i:i + MOBILE_CHUNK] for v in mobile_variants(m)]
+            rows += base.filter(client_mobile__in=variants).values_list(
+                'client_mobile', 'transaction_no', 'transaction_date', 'revenue'
+            )
+
+    df = pd.DataFrame.from_records(rows, columns=columns)
+    df['mobile'] = normalise_mobile_series(df['mobile'])
+    return df[df['mobile'].str.len() == 10]
+
+
+def compute_cohorts(sales):
+    """
+    Vectorized cohort matrix.
+
+    Args:
+        sales: DataFrame with mobile, bill, date, revenue (sale lines only)
+
+    Returns:
+        dict of cohort month (date) -> {'size', 'repeat_customers', 'active', 'revenue'},
+        where active / revenue are lists indexed by months since the cohort month,
+        trimmed after the last month with any activity
+    """
+    if sales.empty:
+        return {}
+
+    dates = pd.to_datetime(sales['date'])
+    df = pd.DataFrame({
+        'mobile': sales['mobile'].values,
+        'bill': sales['bill'].values,
+        'revenue': sales['revenue'].astype(float).values,
+        'month': (dates.dt.year * 12 + dates.dt.month - 1).values,
+    })
+    df['cohort'] = df.groupby('mobile')['month'].transform('min')
+    df['offset'] = df['month'] - df['cohort']
+
+    grouped = df.groupby(['cohort', 'offset'])
+    offsets = range(int(df['offset'].max()) + 1)
+    active = grouped['mobile'].nunique().unstack(fill_value=0).reindex(columns=offsets, fill_value=0)
+    revenue = grouped['revenue'].sum().unstack(fill_value=0).reindex(columns=offsets, fill_value=0)
+
+    customers = df.groupby('mobile').agg(cohort=('cohort', 'first'), bills=('bill', 'nunique'))
+    repeat = (customers['bills'] >= 2).groupby(customers['cohort']).sum()
+
+    cohorts = {}
+    for cohort in active.index:
+        counts = active.loc[cohort].tolist()
+        last = max(i for i, n in enumerate(counts) if n)
+        cohorts[date(cohort // 12, cohort % 12 + 1, 1)] = {
+            'size': int(counts[0]),
+            'repeat_customers': int(repeat.get(cohort, 0)),
+            'active': [int(n) for n in counts[:last + 1]],
+            'revenue': [round(float(v), 2) for v in revenue.loc[cohort].tolist()[:last + 1]],
+        }
+    return cohorts
+
+
+def _save(company, cohorts, months):
+    """Replace the stored rows for months with the computed cohorts."""
+    with transaction.atomic():
+        CohortRetention.objects.filter(company=company, cohort_month__in=months).delete()
+        CohortRetention.objects.bulk_create([
+            CohortRetention(company=company, cohort_month=month, **cohorts[month])
+            for month in months if month in cohorts
+        ], batch_size=500)
+
+
+def refresh_cohorts(company, months):
+    """
+    Recompute the given cohort months from their members' sales.
+
+    Returns:
+        Number of cohorts written
+    """
+    months = sorted({_month_start(m) for m in months})
+    cohorts = {}
+    for month in months:
+        members = valid_mobiles(CustomerProfile.objects.filter(
+            company=company, first_purchase__gte=month, first_purchase__lt=_next_month(month)
+        ).values_list('mobile', flat=True))
+        computed = compute_cohorts(_sales_frame(company, members))
+        if month in computed:
+            cohorts[month] = computed[month]
+
+    _save(company, cohorts, months)
+    return len(cohorts)
+
+
+def update_cohorts(company, records):
+    """
+    Incremental cohort update after a sales import.
+    Touches the cohorts of the imported customers plus stored cohorts from the earliest
+    imported month on (a customer's cohort can move earlier when older sales arrive).
+    Call after customer profiles have been refreshed for the same records.
+    """
+    records = [r for r in records if r.transaction_type == 'sale' and r.transaction_date]
+    mobiles = valid_mobiles({r.client_mobile for r in records if r.client_mobile})
+    if not mobiles:
+        return 0
+
+    months = set()
+    for i in range(0, len(mobiles), 1000):
+        months.update(_month_start(d) for d in CustomerProfile.objects.filter(
+            company=company, mobile__in=mobiles[i:i + 1000]
+        ).values_list('first_purchase', flat=True) if d)
+
+    earliest = _month_start(min(r.transaction_date for r in records))
+    months.update(CohortRetention.objects.filter(
+        company=company, cohort_month__gte=earliest
+    ).values_list('cohort_month', flat=True))
+
+    return refresh_cohorts(company, months)
+
+
+def rebuild_cohorts(company):
+    """Recompute every cohort of a company from the full sales history."""
+    cohorts = compute_cohorts(_sales_frame(company))
+    with transaction.atomic():
+        CohortRetention.objects.filter(company=company).delete()
+        _save(company, cohorts, list(cohorts))
+    logger.info(f"Cohorts rebuilt for company {company.id}: {len(cohorts)} cohorts")
+    return len(cohorts)
+
+
+def _cell(count, size):
+    pct = round(count / size * 100, 1) if size else 0
+    return {'count': count, 'pct': pct, 'shade': round(min(pct, 100) / 100, 2)}
+
+
+def cohort_matrix(company):
+    """
+    Retention matrix for display, read from CohortRetention only.
+
+    Returns:
+        dict with 'periods' (month offsets shown) and 'rows' - one per cohort with size,
+        repeat_rate and 'cells' (active customers, retention %, heatmap shade) padded to the latest month
+    """
+    stored = list(CohortRetention.objects.filter(company=company).order_by('cohort_month'))
+    if not stored:
+        return {'periods': [], 'rows': []}
+
+    def month_index(d):
+        return d.year * 12 + d.month - 1
+
+    latest = max(month_index(c.cohort_month) + len(c.active) - 1 for c in stored)
+    periods = latest - month_index(stored[0].cohort_month) + 1
+
+    rows = []
+    for c in stored:
+        span = latest - month_index(c.cohort_month) + 1
+        active = (c.active + [0] * span)[:span]
+        rows.append({
+            'cohort_month': c.cohort_month,
+            'size': c.size,
+            'repeat_rate': round(c.repeat_customers / c.size * 100, 1) if c.size else 0,
+            'revenue': round(sum(c.revenue), 2),
+            'cells': [_cell(n, c.size) for n in active],
+        })
+    return {'periods': list(range(periods)), 'rows': rows}
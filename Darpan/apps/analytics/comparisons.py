@@ -0,0 +1,132 @@
+"""
+Period-over-period comparisons for Darpan analytics.
+Aggregates a current and a comparison window side by side in one grouped query (filtered
+sums per window) and returns deltas and growth per breakdown value. Breakdowns read
+DailySalesRollup; styles read SalesRecord, as the rollup carries no style dimension.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from django.db.models import Sum, Count, Max, Q
+
+from apps.core.utils import safe_float
+
+COMPARISONS = {
+    'previous': 'Previous period',
+    'month': 'Same period last month',
+    'year': 'Same period last year',
+}
+
+# Breakdown -> (label, grouping field); None groups by style on SalesRecord
+BREAKDOWNS = {
+    'store': ('Store', 'store__name'),
+    'location': ('Location', 'region'),
+    'category': ('Category', 'category'),
+    'collection': ('Collection', 'collection'),
+    'salesperson': ('Salesperson', 'sales_person'),
+    'style': ('Style', None),
+}
+
+# Metric -> (aggregate, DailySalesRollup field, SalesRecord field)
+METRICS = {
+    'revenue': (Sum, 'revenue', 'revenue'),
+    'transactions': (Sum, 'sale_count', None),
+    'quantity': (Sum, 'quantity', 'quantity'),
+    'margin': (Sum, 'gross_margin', 'gross_margin'),
+}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _shift_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    return day.replace(year=year, month=month + 1, day=min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def current_window(rollup, date_from=None, date_to=None):
+    """
+    The (start, end) being reported on: the requested dates, defaulting to month-to-date
+    of the latest day in the rollup rows. None when there is nothing to compare.
+    """
+    end = _parse_date(date_to) or rollup.aggregate(latest=Max('date'))['latest']
+    if not end:
+        return None
+    start = _parse_date(date_from) or end.replace(day=1)
+    return (start, end) if start <= end else None
+
+
+def comparison_window(window, compare='previous'):
+    """The window compared against: the same span shifted back a month or a year, or the span just before."""
+    start, end = window
+    if compare == 'month':
+        return _shift_months(start, -1), _shift_months(end, -1)
+    if compare == 'year':
+        return _shift_months(start, -12), _shift_months(end, -12)
+    span = end - start + timedelta(days=1)
+    return start - span, start - timedelta(days=1)
+
+
+def _growth(current, previous):
+    return round((current - previous) / previous * 100, 1) if previous else None
+
+
+def _aggregates(date_field, current, comparison, on_records):
+    aggregates = {}
+    for name, (function, rollup_field, record_field) in METRICS.items():
+        field = (record_field or 'id') if on_records else rollup_field
+        function = Count if on_records and record_field is None else function
+        for prefix, (start, end) in (('current', current), ('previous', comparison)):
+            aggregates[f'{prefix}_{name}'] = function(field, filter=Q(**{f'{date_field}__gte': start, f'{date_field}__lte': end}))
+    return aggregates
+
+
+def _row(key, values):
+    row = {'key': key, 'current': {}, 'previous': {}, 'delta': {}, 'growth': {}}
+    for name in METRICS:
+        current = safe_float(values.get(f'current_{name}'), 0)
+        previous = safe_float(values.get(f'previous_{name}'), 0)
+        row['current'][name] = current
+        row['previous'][name] = previous
+        row['delta'][name] = round(current - previous, 2)
+        row['growth'][name] = _growth(current, previous)
+    return row
+
+
+def compare_periods(queryset, current, comparison, by=None, limit=None):
+    """
+    Current vs comparison window in one grouped query.
+
+    Args:
+        queryset: DailySalesRollup queryset, or SalesRecord sale lines when by == 'style'
+                  (filtered by company etc. but not by date)
+        current, comparison: (start, end) date windows
+        by: BREAKDOWNS key, or None for totals only
+
+    Returns:
+        (rows, totals) - rows ordered by current revenue, each with key and current / previous /
+        delta / growth dicts per metric (growth None where the comparison window had nothing)
+    """
+    on_records = by == 'style'
+    date_field = 'transaction_date' if on_records else 'date'
+    windows = Q(**{f'{date_field}__gte': current[0], f'{date_field}__lte': current[1]}) | Q(
+        **{f'{date_field}__gte': comparison[0], f'{date_field}__lte': comparison[1]}
+    )
+    queryset = queryset.filter(windows)
+    aggregates = _aggregates(date_field, current, comparison, on_records)
+
+    if not by:
+        return [], _row(None, queryset.aggregate(**aggregates))
+
+    dimension = 'style_code' if on_records else BREAKDOWNS[by][1]
+    grouped = list(queryset.values(dimension).annotate(**aggregates).order_by())
+    totals = _row(None, {name: sum(safe_float(g[name], 0) for g in grouped) for name in aggregates})
+
+    rows = [_row(g[dimension] or 'Unknown', g) for g in grouped]
+    rows.sort(key=lambda r: (r['current']['revenue'], r['previous']['revenue']), reverse=True)
+    return (rows[:limit] if limit else rows), totals
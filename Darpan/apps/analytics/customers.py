@@ -0,0 +1,157 @@
+"""
+Customer 360 profiles for Darpan analytics.
+Folds a customer's sales, CRM contact, referrals and old gold purchases into one
+CustomerProfile row per normalised mobile, refreshed only for the mobiles an import touched.
+"""
+
+import logging
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Sum, Min, Max, Count
+
+from apps.customer_referrals.models import CustomerReferral
+from apps.old_gold.models import OldGoldTransaction
+from .lookup import normalise_mobile, mobile_variants
+from .models import SalesRecord, CRMContact, CustomerProfile
+
+logger = logging.getLogger(__name__)
+
+# Customers refreshed per batch of queries (each expands to four stored mobile shapes)
+MOBILE_CHUNK = 200
+
+
+def valid_mobiles(mobiles):
+    """Sorted distinct 10-digit normalised mobiles among raw values."""
+    return sorted({m for m in (normalise_mobile(v) for v in mobiles) if len(m) == 10})
+
+
+def _by_mobile(rows, field):
+    """Group value rows under the normalised form of their mobile field."""
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[normalise_mobile(row[field])].append(row)
+    return grouped
+
+
+def _build_profiles(company, mobiles):
+    """Unsaved CustomerProfile rows for customers among mobiles that have sales."""
+    variants = [v for m in mobiles for v in mobile_variants(m)]
+    sales = SalesRecord.objects.filter(company=company, client_mobile__in=variants)
+
+    totals = _by_mobile(sales.filter(transaction_type__in=['sale', 'return']).values(
+        'client_mobile', 'transaction_type'
+    ).annotate(
+        first=Min('transaction_date'),
+        last=Max('transaction_date'),
+        bills=Count('transaction_no', distinct=True),
+        qty=Sum('quantity'),
+        amount=Sum('revenue'),
+    ).order_by(), 'client_mobile')
+
+    categories = _by_mobile(sales.filter(transaction_type='sale').exclude(product_category='').values(
+        'client_mobile', 'product_category'
+    ).annotate(amount=Sum('revenue')).order_by(), 'client_mobile')
+
+    names = _by_mobile(sales.exclude(client_name='').values('client_mobile', 'client_name').annotate(
+        last=Max('transaction_date')
+    ).order_by(), 'client_mobile')
+
+    contacts = _by_mobile(CRMContact.objects.filter(company=company, mobile__in=variants).values(
+        'mobile', 'full_name', 'lead_status', 'loyalty_points', 'imported_at'
+    ), 'mobile')
+
+    referrals = {
+        r['affiliate__mobile_number']: r['count']
+        for r in CustomerReferral.objects.filter(company=company, affiliate__mobile_number__in=mobiles).values(
+            'affiliate__mobile_number'
+        ).annotate(count=Count('id')).order_by()
+    }
+
+    old_gold = _by_mobile(OldGoldTransaction.objects.filter(company=company, customer_mobile__in=variants).values(
+        'customer_mobile'
+    ).annotate(count=Count('id'), value=Sum('final_value')).order_by(), 'customer_mobile')
+
+    profiles = []
+    for mobile in mobiles:
+        sale_rows = [r for r in totals.get(mobile, []) if r['transaction_type'] == 'sale']
+        if not sale_rows:
+            continue
+        return_rows = [r for r in totals.get(mobile, []) if r['transaction_type'] == 'return']
+
+        spend_by_category = defaultdict(float)
+        for r in categories.get(mobile, []):
+            spend_by_category[r['product_category'] or ''] += float(r['amount'] or 0)
+
+        contact = max(contacts.get(mobile, []), key=lambda r: r['imported_at'], default=None)
+        latest_name = max(names.get(mobile, []), key=lambda r: r['last'], default=None)
+
+        profiles.append(CustomerProfile(
+            company=company,
+            mobile=mobile,
+            # Oracle returns blank text columns as None
+            name=((latest_name['client_name'] if latest_name else '') or (contact['full_name'] if contact else '') or '')[:255],
+            first_purchase=min(r['first'] for r in sale_rows),
+            last_purchase=max(r['last'] for r in sale_rows),
+            visit_count=sum(r['bills'] for r in sale_rows),
+            items_bought=sum(r['qty'] or 0 for r in sale_rows),
+            lifetime_spend=sum(r['amount'] or 0 for r in sale_rows),
+            return_amount=abs(sum(r['amount'] or 0 for r in return_rows)),
+            favourite_category=max(spend_by_category, key=spend_by_category.get, default='')[:100],
+            lead_status=(contact['lead_status'] or '')[:50] if contact else '',
+            loyalty_points=contact['loyalty_points'] if contact else 0,
+            referral_count=referrals.get(mobile, 0),
+            old_gold_count=sum(r['count'] for r in old_gold.get(mobile, [])),
+            old_gold_value=sum(r['value'] or 0 for r in old_gold.get(mobile, [])),
+        ))
+    return profiles
+
+
+def refresh_customer_profiles(company, mobiles):
+    """
+    Recompute profiles for the given customers of a company.
+
+    Args:
+        company: Company object
+        mobiles: Mobile numbers in any stored shape; values that are not 10-digit numbers are ignored
+
+    Returns:
+        Number of profiles written
+    """
+    mobiles = valid_mobiles(mobiles)
+    written = 0
+    for i in range(0, len(mobiles), MOBILE_CHUNK):
+        chunk = mobiles[i:i + MOBILE_CHUNK]
+        profiles = _build_profiles(company, chunk)
+        with transaction.atomic():
+            CustomerProfile.objects.filter(company=company, mobile__in=chunk).delete()
+            CustomerProfile.objects.bulk_create(profiles, batch_size=500)
+        written += len(profiles)
+    return written
+
+
+def refresh_existing_profiles(company, mobiles):
+    """Recompute only customers that already have a profile, e.g. after a CRM import."""
+    mobiles = valid_mobiles(mobiles)
+    existing = []
+    for i in range(0, len(mobiles), 1000):
+        existing += CustomerProfile.objects.filter(
+            company=company, mobile__in=mobiles[i:i + 1000]
+        ).values_list('mobile', flat=True)
+    return refresh_customer_profiles(company, existing)
+
+
+def rebuild_customer_profiles(company):
+    """Recompute every customer of a company from the full sales history."""
+    mobiles = SalesRecord.objects.filter(company=company).exclude(client_mobile='').values_list(
+        'client_mobile', flat=True
+    ).distinct()
+    mobiles = valid_mobiles(mobiles)
+
+    # Customers whose sales were purged
+    stale = sorted(set(CustomerProfile.objects.filter(company=company).values_list('mobile', flat=True)) - set(mobiles))
+    for i in range(0, len(stale), 1000):
+        CustomerProfile.objects.filter(company=company, mobile__in=stale[i:i + 1000]).delete()
+
+    written = refresh_customer_profiles(company, mobiles)
+    logger.info(f"Customer profiles rebuilt for company {company.id}: {written} profiles")
+    return written
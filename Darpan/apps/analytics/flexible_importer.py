@@ -3,6 +3,7 @@ Flexible Data Import System for Darpan ERP.
 Handles sales.csv, stock.csv, and CRM data with graceful column mapping.
 """
 
+import hashlib
 import logging
 import pandas as pd
 from datetime import datetime
@@ -11,9 +12,13 @@ from django.db import transaction
 from django.utils import timezone
 
 from apps.analytics.models import SalesRecord, StockSnapshot, ImportLog, CRMContact
+from apps.analytics.lookup import normalise_mobile
 
 logger = logging.getLogger(__name__)
 
+# Bytes read per step when hashing a file that is not a Django upload
+HASH_CHUNK = 1024 * 1024
+
 
 class FlexibleImporter:
     """
@@ -105,6 +110,7 @@ class FlexibleImporter:
         self.user = user
         self.errors = []
         self.warnings = []
+        self.anomalies = []
         
         # Validate company - get from user or create default
         if company:
@@ -196,6 +202,51 @@ class FlexibleImporter:
         prefix = str(transaction_no).split('/')[0].upper()
         return self.TRANSACTION_TYPES.get(prefix, 'sale')
     
+    def _content_hash(self, file, *options):
+        """
+        SHA-256 of the file's bytes, read chunk by chunk, plus any import options that change
+        what the same bytes load as. The file is rewound for parsing.
+        """
+        digest = hashlib.sha256()
+        chunks = file.chunks() if hasattr(file, 'chunks') else iter(lambda: file.read(HASH_CHUNK), b'')
+        for chunk in chunks:
+            digest.update(chunk)
+        for option in options:
+            digest.update(f'|{option}'.encode())
+        file.seek(0)
+        return digest.hexdigest()
+    
+    def _already_imported(self, file_type, content_hash):
+        """Result for a re-upload of a file this company already imported, or None"""
+        previous = ImportLog.objects.filter(
+            company=self.company, file_type=file_type, content_hash=content_hash
+        ).order_by('-imported_at').first()
+        if previous is None:
+            return None
+        return {
+            'success': True,
+            'already_imported': True,
+            'rows_imported': 0,
+            'previous_import': {
+                'id': previous.id,
+                'file_name': previous.file_name,
+                'imported_at': previous.imported_at,
+                'rows_imported': previous.rows_imported,
+            },
+        }
+    
+    def _profile(self, df, file_type, returns=None):
+        """
+        Data-quality profile of the mapped file for its ImportLog (apps.analytics.profiling).
+        Failures are logged but never fail the import itself.
+        """
+        try:
+            from apps.analytics.profiling import profile_frame
+            return profile_frame(df, file_type, returns)
+        except Exception as e:
+            logger.error(f"Import profiling failed: {e}")
+            return {}
+    
     def _map_columns(self, df, column_map):
         """Map DataFrame columns and return mapped/unmapped lists"""
         mapped = []
@@ -231,12 +282,17 @@ class FlexibleImporter:
         
         return rename_map, mapped, unmapped
     
-    def import_sales(self, file):
-        """Import sales data from CSV/Excel"""
+    def import_sales(self, file, force=False):
+        """Import sales data from CSV/Excel (an identical re-upload is skipped unless force)"""
         try:
             # Validate company first
             self._validate_company()
             
+            content_hash = self._content_hash(file)
+            previous = None if force else self._already_imported('sales', content_hash)
+            if previous:
+                return previous
+            
             # Read file
             if file.name.endswith('.csv'):
                 df = pd.read_csv(file)
@@ -250,6 +306,14 @@ class FlexibleImporter:
             rename_map, mapped, unmapped = self._map_columns(df, self.SALES_COLUMN_MAP)
             df = df.rename(columns=rename_map)
             
+            # Profile only the lines that get imported (RI / RR / GE are dropped); return lines
+            # are signed negative on import, so they stay out of the amount checks
+            if 'transaction_no' in df.columns:
+                tx_types = df['transaction_no'].map(self._get_transaction_type)
+            else:
+                tx_types = pd.Series('sale', index=df.index)
+            profile = self._profile(df[tx_types != 'ignore'], 'sales', returns=tx_types == 'return')
+            
             # Debug: Log column mapping result
             logger.info(f"Columns after mapping: {list(df.columns)[:15]}")
             logger.info(f"'transaction_date' in columns: {'transaction_date' in df.columns}")
@@ -320,7 +384,7 @@ class FlexibleImporter:
                         transaction_date=tx_date,
                         transaction_type=tx_type,
                         client_name=str(row.get('client_name', ''))[:255],
-                        client_mobile=str(row.get('client_mobile', ''))[:20],
+                        client_mobile=normalise_mobile(row.get('client_mobile', ''))[:20],
                         jewel_code=str(row.get('jewel_code', ''))[:100],
                         style_code=str(row.get('style_code', ''))[:100],
                         product_category=str(row.get('product_category', ''))[:100],
@@ -347,7 +411,7 @@ class FlexibleImporter:
                         region=str(row.get('region', ''))[:100],
                         sales_person=str(row.get('sales_person', ''))[:100],
                         entry_type=str(row.get('entry_type', ''))[:20],
-                        pan_no=str(row.get('pan_no', ''))[:20] if row.get('pan_no') else None,
+                        pan_no=str(row.get('pan_no')).strip().upper()[:20] if pd.notna(row.get('pan_no')) and row.get('pan_no') else None,
                         gst_no=str(row.get('gst_no', ''))[:50] if row.get('gst_no') else None,
                         created_by=self.user,
                     )
@@ -367,12 +431,15 @@ class FlexibleImporter:
             
             # Bulk create
             if records_to_create:
+                self._assign_stores(records_to_create, 'sales')
                 try:
                     with transaction.atomic():
                         SalesRecord.objects.bulk_create(records_to_create, batch_size=500)
                 except Exception as e:
                     logger.error(f"Bulk create failed: {e}")
                     return {'success': False, 'error': f'Database error: {str(e)}'}
+                
+                self._after_sales_import(records_to_create)
             
             # Create import log
             ImportLog.objects.create(
@@ -385,6 +452,9 @@ class FlexibleImporter:
                 columns_mapped=mapped,
                 columns_unmapped=unmapped,
                 errors=self.warnings[:50],  # Limit stored errors
+                anomalies=self.anomalies[:50],
+                profile=profile,
+                content_hash=content_hash,
                 imported_by=self.user,
             )
             
@@ -394,6 +464,7 @@ class FlexibleImporter:
                 'rows_skipped': rows_skipped,
                 'rows_ignored': rows_ignored,
                 'rows_duplicate': rows_duplicate,
+                'anomalies': self.anomalies[:20],
                 'columns_mapped': mapped,
                 'columns_unmapped': unmapped,
                 'warnings': self.warnings[:20],
@@ -403,18 +474,106 @@ class FlexibleImporter:
             logger.error(f"Sales import failed: {e}")
             return {'success': False, 'error': str(e)}
     
-    def import_stock(self, file, stock_date=None):
+    def _assign_stores(self, records, source):
+        """
+        Resolve location strings of records about to be created to Store ids.
+        Records stay unlinked if resolution fails; the import itself continues.
+        """
+        try:
+            from apps.analytics.locations import assign_stores
+            assign_stores(self.company, records, source)
+        except Exception as e:
+            logger.error(f"Location resolution failed: {e}")
+    
+    def _after_sales_import(self, records):
+        """
+        Incremental post-import stages for newly created sales records.
+        Failures are logged but never fail the import itself.
+        """
+        try:
+            from apps.analytics.rollups import refresh_sales_rollup
+            refresh_sales_rollup(self.company, {r.transaction_date for r in records})
+        except Exception as e:
+            logger.error(f"Sales rollup refresh failed: {e}")
+        
+        try:
+            from apps.analytics.recommendations import update_co_purchases
+            update_co_purchases(self.company, [
+                (r.transaction_no, r.style_code) for r in records if r.transaction_type == 'sale'
+            ])
+        except Exception as e:
+            logger.error(f"Co-purchase update failed: {e}")
+        
+        try:
+            from apps.analytics.customers import refresh_customer_profiles
+            refresh_customer_profiles(self.company, {r.client_mobile for r in records if r.client_mobile})
+        except Exception as e:
+            logger.error(f"Customer profile refresh failed: {e}")
+        
+        try:
+            from apps.analytics.cohorts import update_cohorts
+            update_cohorts(self.company, records)
+        except Exception as e:
+            logger.error(f"Cohort update failed: {e}")
+        
+        try:
+            from apps.analytics.anomalies import detect_anomalies, anomaly_summary
+            dates = {r.transaction_date for r in records}
+            self.anomalies = [anomaly_summary(a) for a in detect_anomalies(self.company, dates) if a.date in dates]
+        except Exception as e:
+            logger.error(f"Anomaly detection failed: {e}")
+    
+    def _after_crm_import(self, contacts):
+        """
+        Refresh customer profiles that carry CRM fields for the imported contacts.
+        Failures are logged but never fail the import itself.
+        """
+        try:
+            from apps.analytics.customers import refresh_existing_profiles
+            refresh_existing_profiles(self.company, {c.mobile for c in contacts if c.mobile})
+        except Exception as e:
+            logger.error(f"Customer profile refresh failed: {e}")
+    
+    def _after_stock_import(self, records):
+        """
+        Incremental post-import stages for newly created stock snapshots.
+        Failures are logged but never fail the import itself.
+        """
+        try:
+            from apps.analytics.stock_ageing import update_stock_age_index
+            update_stock_age_index(self.company, records)
+        except Exception as e:
+            logger.error(f"Stock age index update failed: {e}")
+        
+        try:
+            from apps.analytics.sketches import refresh_stock_sketches
+            refresh_stock_sketches(self.company, {r.snapshot_date for r in records})
+        except Exception as e:
+            logger.error(f"Stock sketch refresh failed: {e}")
+    
+    def import_stock(self, file, stock_date=None, force=False):
         """Import stock/inventory data from CSV/Excel
         
         Args:
             file: Uploaded file (CSV or Excel)
             stock_date: Optional date to use as snapshot_date for all rows.
                        If provided, overrides any date in the file.
+            force: Re-import even if the same file was already imported for the same date
         """
         try:
             # Validate company first
             self._validate_company()
             
+            # Use provided stock_date or fall back to file date or current date
+            default_snapshot_date = stock_date if stock_date else timezone.now().date()
+            
+            # The same file loaded for another snapshot date is a different import; an undated
+            # file is today's snapshot, so unchanged stock is still recorded the next day
+            content_hash = self._content_hash(file, default_snapshot_date)
+            previous = None if force else self._already_imported('stock', content_hash)
+            if previous:
+                return previous
+            
             if file.name.endswith('.csv'):
                 df = pd.read_csv(file)
             else:
@@ -425,14 +584,13 @@ class FlexibleImporter:
             
             rename_map, mapped, unmapped = self._map_columns(df, self.STOCK_COLUMN_MAP)
             df = df.rename(columns=rename_map)
+            profile = self._profile(df, 'stock')
             
             rows_imported = 0
             rows_skipped = 0
             rows_deleted = 0  # Track deleted duplicates
             
             records_to_create = []
-            # Use provided stock_date or fall back to file date or current date
-            default_snapshot_date = stock_date if stock_date else timezone.now().date()
             
             # Determine the actual snapshot date that will be used
             # If stock_date is explicitly provided, delete existing records for that date
@@ -495,12 +653,15 @@ class FlexibleImporter:
                     rows_skipped += 1
             
             if records_to_create:
+                self._assign_stores(records_to_create, 'stock')
                 try:
                     with transaction.atomic():
                         StockSnapshot.objects.bulk_create(records_to_create, batch_size=500)
                 except Exception as e:
                     logger.error(f"Stock bulk create failed: {e}")
                     return {'success': False, 'error': f'Database error: {str(e)}'}
+                
+                self._after_stock_import(records_to_create)
             
             ImportLog.objects.create(
                 company=self.company,
@@ -511,6 +672,8 @@ class FlexibleImporter:
                 columns_mapped=mapped,
                 columns_unmapped=unmapped,
                 errors=self.warnings[:50],
+                profile=profile,
+                content_hash=content_hash,
                 imported_by=self.user,
             )
             
@@ -561,11 +724,16 @@ class FlexibleImporter:
         'Modified Time': 'modified_time',
     }
     
-    def import_crm(self, file):
-        """Import CRM contact data from CSV/Excel"""
+    def import_crm(self, file, force=False):
+        """Import CRM contact data from CSV/Excel (an identical re-upload is skipped unless force)"""
         try:
             self._validate_company()
             
+            content_hash = self._content_hash(file)
+            previous = None if force else self._already_imported('crm', content_hash)
+            if previous:
+                return previous
+            
             if file.name.endswith('.csv'):
                 df = pd.read_csv(file)
             else:
@@ -576,6 +744,7 @@ class FlexibleImporter:
             
             rename_map, mapped, unmapped = self._map_columns(df, self.CRM_COLUMN_MAP)
             df = df.rename(columns=rename_map)
+            profile = self._profile(df, 'crm')
             
             rows_imported = 0
             rows_skipped = 0
@@ -591,9 +760,7 @@ class FlexibleImporter:
                         last = str(row.get('last_name', '')).strip()
                         full_name = f"{first} {last}".strip()
                     
-                    mobile = str(row.get('mobile', ''))[:20]
-                    if not mobile or mobile == 'nan':
-                        mobile = ''
+                    mobile = normalise_mobile(row.get('mobile', ''))[:20]
                     
                     record = CRMContact(
                         company=self.company,
@@ -639,6 +806,8 @@ class FlexibleImporter:
                 except Exception as e:
                     logger.error(f"CRM bulk create failed: {e}")
                     return {'success': False, 'error': f'Database error: {str(e)}'}
+                
+                self._after_crm_import(records_to_create)
             
             ImportLog.objects.create(
                 company=self.company,
@@ -649,6 +818,8 @@ class FlexibleImporter:
                 columns_mapped=mapped,
                 columns_unmapped=unmapped,
                 errors=self.warnings[:50],
+                profile=profile,
+                content_hash=content_hash,
                 imported_by=self.user,
             )
             
@@ -0,0 +1,201 @@
+"""
+Sales forecasting for Darpan analytics.
+Fits lightweight weekly-seasonal models to every location x category daily revenue series
+of a company at once (one NumPy matrix, one row per series), picks the better model per
+series on a back-test, and stores forecasts with their errors in SalesForecast.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Sum, Max
+
+from .models import DailySalesRollup, SalesForecast
+
+logger = logging.getLogger(__name__)
+
+# Days of history fitted
+HISTORY_DAYS = 182
+
+# Days forecast beyond the latest sales date
+HORIZON_DAYS = 28
+
+# Most recent days held back to measure each model's error
+HOLDOUT_DAYS = 28
+
+# Weekly seasonality
+SEASON = 7
+
+# Smoothing weight of the newest day in the seasonal level
+ALPHA = 0.3
+
+# Series with fewer selling days in the history are too sparse to forecast
+MIN_ACTIVE_DAYS = 14
+
+
+def _series_matrix(company, as_of):
+    """
+    Daily revenue per (location, category) for the HISTORY_DAYS ending as_of.
+
+    Returns:
+        (list of (location, category) keys, DatetimeIndex of days, ndarray series x days)
+    """
+    start = as_of - timedelta(days=HISTORY_DAYS - 1)
+    rows = DailySalesRollup.objects.filter(
+        company=company, date__gte=start, date__lte=as_of
+    ).values('region', 'category', 'date').annotate(revenue=Sum('revenue')).order_by()
+
+    days = pd.date_range(start, as_of, freq='D')
+    df = pd.DataFrame.from_records(list(rows), columns=['region', 'category', 'date', 'revenue'])
+    if df.empty:
+        return [], days, np.zeros((0, len(days)))
+
+    df['date'] = pd.to_datetime(df['date'])
+    df['revenue'] = df['revenue'].astype(float)
+    matrix = df.pivot_table(index=['region', 'category'], columns='date', values='revenue', aggfunc='sum', fill_value=0)
+    matrix = matrix.reindex(columns=days, fill_value=0)
+    matrix = matrix[(matrix > 0).sum(axis=1) >= MIN_ACTIVE_DAYS]
+    return list(matrix.index), days, matrix.to_numpy()
+
+
+def seasonal_naive(history, horizon):
+    """Repeat each series' last week."""
+    last_week = history[:, -SEASON:]
+    return np.tile(last_week, (1, -(-horizon // SEASON)))[:, :horizon]
+
+
+def seasonal_smoothing(history, horizon, alpha=ALPHA):
+    """
+    Weekday indices times an exponentially smoothed level (Holt-Winters without trend).
+    The smoothing loop runs over days; every series is updated at once.
+    """
+    n_days = history.shape[1]
+    phase = np.arange(n_days) % SEASON
+    means = history.mean(axis=1)
+
+    weekday = np.stack([history[:, phase == p].mean(axis=1) for p in range(SEASON)], axis=1)
+    index = np.divide(weekday, means[:, None], out=np.ones_like(weekday), where=means[:, None] > 0)
+
+    season = index[:, phase]
+    deseasonalised = np.divide(history, season, out=np.zeros_like(history), where=season > 0)
+    level = deseasonalised[:, 0]
+    for t in range(1, n_days):
+        level = np.where(season[:, t] > 0, alpha * deseasonalised[:, t] + (1 - alpha) * level, level)
+
+    future_phase = (n_days + np.arange(horizon)) % SEASON
+    return level[:, None] * index[:, future_phase]
+
+
+MODELS = {
+    'seasonal_naive': seasonal_naive,
+    'seasonal_smoothing': seasonal_smoothing,
+}
+
+
+def fit_forecasts(history, holdout=HOLDOUT_DAYS, horizon=HORIZON_DAYS):
+    """
+    Back-test every model on the last holdout days, keep the lower-MAE model per series
+    and forecast the horizon with it.
+
+    Returns:
+        dict with model (names per series), mae, wape (NaN where the holdout had no sales),
+        backtest (series x holdout) and forecast (series x horizon)
+    """
+    names = list(MODELS)
+    train, actual = history[:, :-holdout], history[:, -holdout:]
+
+    backtests = np.stack([MODELS[name](train, holdout) for name in names])
+    errors = np.abs(backtests - actual).mean(axis=2)
+    best = errors.argmin(axis=0)
+    rows = np.arange(history.shape[0])
+
+    forecasts = np.stack([MODELS[name](history, horizon) for name in names])
+    backtest = np.clip(backtests[best, rows], 0, None)
+    totals = actual.sum(axis=1)
+
+    return {
+        'model': [names[i] for i in best],
+        'mae': errors[best, rows],
+        'wape': np.divide(
+            np.abs(backtest - actual).sum(axis=1), totals, out=np.full(len(rows), np.nan), where=totals > 0
+        ),
+        'backtest': backtest,
+        'forecast': np.clip(forecasts[best, rows], 0, None),
+    }
+
+
+def refresh_forecasts(company, as_of=None):
+    """
+    Recompute the SalesForecast table for a company.
+
+    Args:
+        as_of: Last day of history (defaults to the latest day in the rollup)
+
+    Returns:
+        Number of series forecast
+    """
+    as_of = as_of or DailySalesRollup.objects.filter(company=company).aggregate(latest=Max('date'))['latest']
+    if not as_of:
+        return 0
+
+    keys, days, history = _series_matrix(company, as_of)
+    to_create = []
+    if keys and history.shape[1] > HOLDOUT_DAYS + SEASON:
+        fit = fit_forecasts(history)
+        holdout_days = [d.date() for d in days[-HOLDOUT_DAYS:]]
+        future_days = [as_of + timedelta(days=h + 1) for h in range(HORIZON_DAYS)]
+
+        for i, (location, category) in enumerate(keys):
+            common = {
+                'company': company,
+                'location': location[:100],
+                'category': category[:100],
+                'model': fit['model'][i],
+                'mae': round(float(fit['mae'][i]), 2),
+                'wape': None if np.isnan(fit['wape'][i]) else round(float(fit['wape'][i]), 4),
+            }
+            for j, day in enumerate(holdout_days):
+                to_create.append(SalesForecast(
+                    date=day, forecast=round(float(fit['backtest'][i, j]), 2),
+                    actual=round(float(history[i, j - HOLDOUT_DAYS]), 2), **common
+                ))
+            for j, day in enumerate(future_days):
+                to_create.append(SalesForecast(date=day, forecast=round(float(fit['forecast'][i, j]), 2), **common))
+
+    with transaction.atomic():
+        SalesForecast.objects.filter(company=company).delete()
+        SalesForecast.objects.bulk_create(to_create, batch_size=1000)
+
+    logger.info(f"Forecasts refreshed for company {company.id}: {len(keys)} series")
+    return len(keys)
+
+
+def forecast_chart(company):
+    """
+    Company-wide forecast vs actual by day, read from SalesForecast only.
+
+    Returns:
+        dict with labels, forecast, actual (None for future days) and the overall back-test wape
+    """
+    daily = SalesForecast.objects.filter(company=company).values('date').annotate(
+        forecast=Sum('forecast'), actual=Sum('actual')
+    ).order_by('date')
+
+    labels, forecast, actual = [], [], []
+    error = total = 0.0
+    for d in daily:
+        labels.append(d['date'].strftime('%d %b'))
+        forecast.append(float(d['forecast'] or 0))
+        actual.append(float(d['actual']) if d['actual'] is not None else None)
+        if d['actual'] is not None:
+            error += abs(float(d['forecast'] or 0) - float(d['actual']))
+            total += float(d['actual'])
+
+    return {
+        'labels': labels,
+        'forecast': forecast,
+        'actual': actual,
+        'wape': round(error / total * 100, 1) if total else None,
+    }
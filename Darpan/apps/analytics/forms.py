@@ -40,6 +40,14 @@ class CSVImportForm(forms.Form):
         }),
         help_text='Upload CSV or Excel file'
     )
+    
+    force = forms.BooleanField(
+        required=False,
+        initial=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input', 'id': 'id_force'}),
+        label="Re-import even if this file was already imported",
+        help_text='Identical files are otherwise skipped'
+    )
 
 class GoldRateForm(forms.ModelForm):
     class Meta:
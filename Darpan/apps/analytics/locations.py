@@ -0,0 +1,127 @@
+"""
+Location reconciliation for imported data.
+Resolves StockSnapshot.location / SalesRecord.region strings to Store ids through
+LocationAlias, so store-scoped queries can filter on store_id instead of string lists.
+"""
+
+import logging
+from django.db import transaction
+
+from apps.core.models import Store
+from .models import LocationAlias, SalesRecord, StockSnapshot, DailySalesRollup
+
+logger = logging.getLogger(__name__)
+
+# Import source -> (LocationAlias flag, model, location field)
+SOURCES = {
+    'sales': ('in_sales', SalesRecord, 'region'),
+    'stock': ('in_stock', StockSnapshot, 'location'),
+}
+
+
+def _match_key(value):
+    return (value or '').strip().lower()
+
+
+def store_matcher(company):
+    """Normalised location string -> store id. A GATI location name wins over a store name."""
+    matcher = {}
+    stores = Store.objects.filter(company=company, is_active=True).values_list('id', 'name', 'gati_location_name')
+    for store_id, name, _ in stores:
+        matcher.setdefault(_match_key(name), store_id)
+    for store_id, _, gati_name in stores:
+        if gati_name:
+            matcher[_match_key(gati_name)] = store_id
+    return matcher
+
+
+def register_locations(company, locations, source):
+    """
+    Record location strings seen in an import and resolve new ones to stores.
+
+    Args:
+        company: Company object
+        locations: Iterable of location strings
+        source: 'sales' or 'stock'
+
+    Returns:
+        dict of location string -> store id (None when unlinked)
+    """
+    flag = SOURCES[source][0]
+    locations = {l for l in locations if l}
+    if not locations:
+        return {}
+
+    aliases = {a.alias: a for a in LocationAlias.objects.filter(company=company, alias__in=list(locations))}
+    new = [l for l in locations if l not in aliases]
+    stale = [a for a in aliases.values() if not getattr(a, flag)]
+
+    if new:
+        matcher = store_matcher(company)
+        created = [
+            LocationAlias(company=company, alias=l, store_id=matcher.get(_match_key(l)), **{flag: True})
+            for l in new
+        ]
+        LocationAlias.objects.bulk_create(created, batch_size=500)
+        aliases.update((a.alias, a) for a in created)
+    if stale:
+        for a in stale:
+            setattr(a, flag, True)
+        LocationAlias.objects.bulk_update(stale, [flag], batch_size=500)
+
+    return {alias: a.store_id for alias, a in aliases.items()}
+
+
+def assign_stores(company, records, source):
+    """Set store_id on unsaved import records from their location string."""
+    field = SOURCES[source][2]
+    mapping = register_locations(company, {getattr(r, field) for r in records}, source)
+    for r in records:
+        r.store_id = mapping.get(getattr(r, field))
+
+
+def relink_locations(company, backfill=False):
+    """
+    Re-resolve every alias of a company against its current stores and push changed
+    store ids onto the imported rows with one UPDATE per alias and source.
+    Call after stores are created or renamed.
+
+    Args:
+        backfill: Also register locations imported before the alias table existed
+                  and update rows for every linked alias, not only changed ones
+
+    Returns:
+        Number of aliases whose store changed
+    """
+    if backfill:
+        for source, (_, model, field) in SOURCES.items():
+            seen = model.objects.filter(company=company).exclude(**{field: ''}).values_list(field, flat=True).distinct()
+            register_locations(company, seen, source)
+
+    matcher = store_matcher(company)
+    changed = []
+    with transaction.atomic():
+        for alias in LocationAlias.objects.filter(company=company):
+            store_id = matcher.get(_match_key(alias.alias))
+            if store_id != alias.store_id:
+                alias.store_id = store_id
+                changed.append(alias)
+            elif not (backfill and store_id):
+                continue
+
+            for source, (flag, model, field) in SOURCES.items():
+                if getattr(alias, flag):
+                    model.objects.filter(company=company, **{field: alias.alias}).update(store_id=store_id)
+            if alias.in_sales:
+                DailySalesRollup.objects.filter(company=company, region=alias.alias).update(store_id=store_id)
+
+        LocationAlias.objects.bulk_update(changed, ['store'], batch_size=500)
+
+    if changed:
+        logger.info(f"Relinked {len(changed)} locations for company {company.id}")
+    return len(changed)
+
+
+def available_locations(company):
+    """Sorted location strings seen in imports, read from the alias table."""
+    return list(LocationAlias.objects.filter(company=company).values_list('alias', flat=True).order_by('alias'))
@@ -0,0 +1,101 @@
+"""
+Sales lookup by customer-desk identifiers.
+Finds SalesRecord rows by transaction number, jewel code, mobile or PAN using the
+(company, identifier) indexes - exact or prefix matches only, never a scan.
+"""
+
+import re
+from django.db.models import Q
+
+from .models import SalesRecord
+
+# Search kinds -> SalesRecord field
+LOOKUP_FIELDS = {
+    'transaction_no': 'transaction_no',
+    'jewel_code': 'jewel_code',
+    'mobile': 'client_mobile',
+    'pan': 'pan_no',
+}
+
+PAN_RE = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]$')
+
+# Prefix searches shorter than this would match too much of the index
+MIN_PREFIX_LENGTH = 3
+
+RESULT_FIELDS = [
+    'id', 'transaction_no', 'transaction_date', 'transaction_type', 'client_name', 'client_mobile',
+    'pan_no', 'jewel_code', 'style_code', 'product_name', 'product_category', 'region',
+    'sales_person', 'quantity', 'final_amount',
+]
+
+
+def normalise_mobile(value):
+    """Digits of a mobile number without country code, e.g. '+91 98765-43210' -> '9876543210'."""
+    value = str(value or '').strip()
+    if value.endswith('.0'):
+        value = value[:-2]  # pandas reads numeric columns with blanks as floats
+    digits = re.sub(r'\D', '', value)
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    return digits
+
+
+def normalise_mobile_series(values):
+    """Vectorized normalise_mobile over a pandas Series of raw mobile values."""
+    digits = values.astype(str).str.strip().str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+    return digits.where(~((digits.str.len() == 12) & digits.str.startswith('91')), digits.str[2:])
+
+
+def mobile_variants(digits):
+    """Stored shapes of a normalised mobile - older imports kept the raw spreadsheet value."""
+    return [digits, f'+91{digits}', f'91{digits}', f'{digits}.0']
+
+
+def detect_kinds(query):
+    """Search kinds worth trying for a free-text query, most specific first."""
+    if PAN_RE.match(query.upper()):
+        return ['pan']
+    digits = normalise_mobile(query)
+    if len(digits) == 10 and not re.search(r'[A-Za-z]', query):
+        return ['mobile', 'transaction_no']
+    return ['transaction_no', 'jewel_code']
+
+
+def lookup_sales(company, query, kind='auto', limit=50):
+    """
+    Find sales records by identifier.
+
+    Args:
+        company: Company object
+        query: Identifier typed by the user
+        kind: One of LOOKUP_FIELDS, or 'auto' to detect from the query
+        limit: Maximum rows returned
+
+    Returns:
+        (kind matched or None, list of record dicts newest first)
+    """
+    query = (query or '').strip()
+    if not company or len(query) < MIN_PREFIX_LENGTH:
+        return None, []
+
+    kinds = detect_kinds(query) if kind == 'auto' else [kind] if kind in LOOKUP_FIELDS else []
+    base = SalesRecord.objects.filter(company=company)
+
+    for k in kinds:
+        field = LOOKUP_FIELDS[k]
+        if k == 'mobile':
+            qs = base.filter(client_mobile__in=mobile_variants(normalise_mobile(query)))
+        elif k == 'pan':
+            qs = base.filter(pan_no=query.upper())
+        else:
+            prefixes = {query, query.upper()}
+            condition = Q()
+            for prefix in prefixes:
+                condition |= Q(**{f'{field}__startswith': prefix})
+            qs = base.filter(condition)
+
+        rows = list(qs.order_by('-transaction_date', '-id').values(*RESULT_FIELDS)[:limit])
+        if rows:
+            return k, rows
+
+    return None, []
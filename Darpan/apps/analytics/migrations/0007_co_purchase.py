@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0006_crm_contact'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('style_code', models.CharField(max_length=100)),
+                ('related_style_code', models.CharField(max_length=100)),
+                ('basket_count', models.IntegerField(default=0)),
+                ('rank', models.IntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='co_purchases', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Co-Purchase',
+                'indexes': [models.Index(fields=['company', 'style_code', 'rank'], name='analytics_c_company_272282_idx')],
+                'unique_together': {('company', 'style_code', 'related_style_code')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0007_co_purchase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAgeIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jewel_code', models.CharField(max_length=100)),
+                ('location', models.CharField(max_length=100)),
+                ('style_code', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('first_seen', models.DateField()),
+                ('last_seen', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('sale_price', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_age_index', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Stock Age Index',
+                'indexes': [models.Index(fields=['company', 'last_seen', 'first_seen'], name='analytics_s_company_c70e34_idx')],
+                'unique_together': {('company', 'jewel_code', 'location')},
+            },
+        ),
+    ]
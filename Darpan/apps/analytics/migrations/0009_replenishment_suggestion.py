@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0008_stock_age_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplenishmentSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('style', 'Style'), ('category', 'Category')], max_length=20)),
+                ('location', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('sold_qty', models.IntegerField(default=0)),
+                ('daily_velocity', models.DecimalField(decimal_places=4, default=0, max_digits=12)),
+                ('on_hand', models.IntegerField(default=0)),
+                ('days_of_cover', models.DecimalField(blank=True, decimal_places=1, max_digits=12, null=True)),
+                ('suggested_qty', models.IntegerField(default=0)),
+                ('snapshot_date', models.DateField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='replenishment_suggestions', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Replenishment Suggestion',
+                'indexes': [models.Index(fields=['company', 'level', 'suggested_qty'], name='analytics_r_company_2b09f3_idx'), models.Index(fields=['company', 'level', 'location'], name='analytics_r_company_f856a3_idx')],
+                'unique_together': {('company', 'level', 'location', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0009_replenishment_suggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias', models.CharField(max_length=100)),
+                ('in_sales', models.BooleanField(default=False)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Location Alias',
+                'verbose_name_plural': 'Location Aliases',
+                'ordering': ['alias'],
+            },
+        ),
+        migrations.AddField(
+            model_name='salesrecord',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_records', to='core.store'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_snapshots', to='core.store'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'store', 'transaction_date'], name='analytics_s_company_e09cb2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['company', 'store', 'snapshot_date'], name='analytics_s_company_c5f1ee_idx'),
+        ),
+        migrations.AddField(
+            model_name='locationalias',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_aliases', to='core.company'),
+        ),
+        migrations.AddField(
+            model_name='locationalias',
+            name='store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='location_aliases', to='core.store'),
+        ),
+        migrations.AddIndex(
+            model_name='locationalias',
+            index=models.Index(fields=['company', 'store'], name='analytics_l_company_5765e1_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='locationalias',
+            unique_together={('company', 'alias')},
+        ),
+    ]
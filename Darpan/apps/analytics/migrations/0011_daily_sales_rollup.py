@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0010_location_alias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('region', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('collection', models.CharField(blank=True, max_length=100)),
+                ('base_metal', models.CharField(blank=True, max_length=50)),
+                ('sales_person', models.CharField(blank=True, max_length=100)),
+                ('sale_count', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('discount_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('final_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('gross_margin', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('return_count', models.IntegerField(default=0)),
+                ('return_quantity', models.IntegerField(default=0)),
+                ('return_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales_rollups', to='core.company')),
+                ('store', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales_rollups', to='core.store')),
+            ],
+            options={
+                'verbose_name': 'Daily Sales Rollup',
+                'indexes': [models.Index(fields=['company', 'date'], name='analytics_d_company_66898d_idx'), models.Index(fields=['company', 'store', 'date'], name='analytics_d_company_8ba2a7_idx'), models.Index(fields=['company', 'sales_person', 'date'], name='analytics_d_company_087ae9_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_daily_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'transaction_no'], name='analytics_s_company_feecc9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'jewel_code'], name='analytics_s_company_3ea38c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'client_mobile'], name='analytics_s_company_fad594_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrecord',
+            index=models.Index(fields=['company', 'pan_no'], name='analytics_s_company_b5473f_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0012_sales_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mobile', models.CharField(max_length=20)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('first_purchase', models.DateField(blank=True, null=True)),
+                ('last_purchase', models.DateField(blank=True, null=True)),
+                ('visit_count', models.IntegerField(default=0)),
+                ('items_bought', models.IntegerField(default=0)),
+                ('lifetime_spend', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('return_amount', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('favourite_category', models.CharField(blank=True, max_length=100)),
+                ('lead_status', models.CharField(blank=True, max_length=50)),
+                ('loyalty_points', models.IntegerField(default=0)),
+                ('referral_count', models.IntegerField(default=0)),
+                ('old_gold_count', models.IntegerField(default=0)),
+                ('old_gold_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_profiles', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Customer Profile',
+                'indexes': [models.Index(fields=['company', 'lifetime_spend'], name='analytics_c_company_5654c8_idx'), models.Index(fields=['company', 'last_purchase'], name='analytics_c_company_24027b_idx')],
+                'unique_together': {('company', 'mobile')},
+            },
+        ),
+    ]
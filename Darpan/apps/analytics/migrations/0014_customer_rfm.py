@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0013_customer_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerRFM',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mobile', models.CharField(max_length=20)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('last_purchase', models.DateField()),
+                ('recency_days', models.IntegerField()),
+                ('frequency', models.IntegerField()),
+                ('monetary', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('r_score', models.SmallIntegerField()),
+                ('f_score', models.SmallIntegerField()),
+                ('m_score', models.SmallIntegerField()),
+                ('segment', models.CharField(choices=[('champions', 'Champions'), ('new', 'New Customers'), ('loyal', 'Loyal'), ('potential', 'Potential Loyalists'), ('at_risk', 'At Risk'), ('needs_attention', 'Needs Attention'), ('hibernating', 'Hibernating'), ('lost', 'Lost')], max_length=20)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customer_rfm', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Customer RFM Score',
+                'indexes': [models.Index(fields=['company', 'segment', 'monetary'], name='analytics_c_company_751d6c_idx')],
+                'unique_together': {('company', 'mobile')},
+            },
+        ),
+    ]
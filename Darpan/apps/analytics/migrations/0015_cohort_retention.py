@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0014_customer_rfm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_month', models.DateField()),
+                ('size', models.IntegerField(default=0)),
+                ('repeat_customers', models.IntegerField(default=0)),
+                ('active', models.JSONField(default=list)),
+                ('revenue', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cohort Retention',
+                'ordering': ['cohort_month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='customerprofile',
+            index=models.Index(fields=['company', 'first_purchase'], name='analytics_c_company_0405db_idx'),
+        ),
+        migrations.AddField(
+            model_name='cohortretention',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_retention', to='core.company'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='cohortretention',
+            unique_together={('company', 'cohort_month')},
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0015_cohort_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('date', models.DateField()),
+                ('forecast', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('actual', models.DecimalField(blank=True, decimal_places=2, max_digits=18, null=True)),
+                ('model', models.CharField(max_length=30)),
+                ('mae', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('wape', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_forecasts', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Sales Forecast',
+                'indexes': [models.Index(fields=['company', 'date'], name='analytics_s_company_f8cbd1_idx')],
+                'unique_together': {('company', 'location', 'category', 'date')},
+            },
+        ),
+    ]
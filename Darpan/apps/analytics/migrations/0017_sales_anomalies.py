@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0016_sales_forecast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='anomalies',
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name='SalesAnomaly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(blank=True, max_length=100)),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('baseline', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('mad', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('score', models.FloatField()),
+                ('direction', models.CharField(choices=[('spike', 'Spike'), ('drop', 'Drop')], max_length=10)),
+                ('detected_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_anomalies', to='core.company')),
+            ],
+            options={
+                'verbose_name': 'Sales Anomaly',
+                'ordering': ['-date', 'location'],
+                'indexes': [models.Index(fields=['company', 'date'], name='analytics_s_company_f3c00c_idx')],
+                'unique_together': {('company', 'location', 'date')},
+            },
+        ),
+    ]
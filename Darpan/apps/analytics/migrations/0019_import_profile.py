@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0018_distinct_sketches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='profile',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0019_import_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importlog',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='importlog',
+            index=models.Index(fields=['company', 'file_type', 'content_hash'], name='analytics_i_company_32271d_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:10
+
+from django.db import migrations
+
+
+def backfill_location_aliases(apps, schema_editor):
+    """Register locations imported before the alias table existed and link their rows to stores."""
+    # Runs the live resolver (it also relinks rollup rows), so it uses the current models
+    from apps.core.models import Company
+    from apps.analytics.locations import relink_locations
+    
+    for company in Company.objects.all():
+        relink_locations(company, backfill=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('analytics', '0020_import_content_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_location_aliases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:20
+
+from django.db import migrations
+
+
+def populate_daily_sales_rollup(apps, schema_editor):
+    """Build the rollup for sales imported before it existed; reports read only the rollup."""
+    # Runs the live rollup builder, so it uses the current models
+    from apps.core.models import Company
+    from apps.analytics.rollups import rebuild_sales_rollup
+    
+    for company in Company.objects.all():
+        rebuild_sales_rollup(company)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0021_backfill_location_aliases'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_daily_sales_rollup, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,5 @@
 from django.db import models
-from apps.core.models import Company, User
+from apps.core.models import Company, User, Store
 
 
 class ImportLog(models.Model):
@@ -19,15 +19,27 @@ class ImportLog(models.Model):
     columns_mapped = models.JSONField(default=list)
     columns_unmapped = models.JSONField(default=list)
     errors = models.JSONField(default=list)
+    anomalies = models.JSONField(default=list)  # Daily location anomalies flagged on the imported days
+    profile = models.JSONField(default=dict, blank=True)  # Data-quality profile of the file (apps.analytics.profiling)
+    content_hash = models.CharField(max_length=64, blank=True)  # SHA-256 of the file, to skip identical re-uploads
     imported_at = models.DateTimeField(auto_now_add=True)
     imported_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     
     class Meta:
         ordering = ['-imported_at']
+        indexes = [
+            models.Index(fields=['company', 'file_type', 'content_hash']),
+        ]
         verbose_name = "Import Log"
     
     def __str__(self):
         return f"{self.file_type} import - {self.file_name} ({self.imported_at.strftime('%Y-%m-%d %H:%M')})"
+    
+    @property
+    def quality_issues(self):
+        """Findings of the data-quality profile, one line each"""
+        from .profiling import profile_issues
+        return profile_issues(self.profile or {})
 
 
 class SalesRecord(models.Model):
@@ -84,6 +96,7 @@ class SalesRecord(models.Model):
     # Metadata
     region = models.CharField(max_length=100, blank=True)
     store_code = models.CharField(max_length=50, blank=True)
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales_records')  # Resolved from region via LocationAlias
     sales_person = models.CharField(max_length=100, blank=True)
     entry_type = models.CharField(max_length=20, blank=True)
     
@@ -101,6 +114,12 @@ class SalesRecord(models.Model):
             models.Index(fields=['company', 'transaction_date', '-final_amount']),
             models.Index(fields=['company', 'sales_person', 'transaction_date']),
             models.Index(fields=['transaction_date', 'transaction_type']),
+            models.Index(fields=['company', 'store', 'transaction_date']),
+            # Customer-desk lookups (apps.analytics.lookup)
+            models.Index(fields=['company', 'transaction_no']),
+            models.Index(fields=['company', 'jewel_code']),
+            models.Index(fields=['company', 'client_mobile']),
+            models.Index(fields=['company', 'pan_no']),
         ]
 
     def __str__(self):
@@ -122,6 +141,7 @@ class StockSnapshot(models.Model):
     jewel_code = models.CharField(max_length=100)
     style_code = models.CharField(max_length=100, db_index=True)
     location = models.CharField(max_length=100)
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_snapshots')  # Resolved from location via LocationAlias
     
     category = models.CharField(max_length=100, blank=True)
     sub_category = models.CharField(max_length=100, blank=True)
@@ -157,6 +177,7 @@ class StockSnapshot(models.Model):
             models.Index(fields=['company', 'location']),
             models.Index(fields=['company', 'category']),
             models.Index(fields=['company', 'snapshot_date']),
+            models.Index(fields=['company', 'store', 'snapshot_date']),
         ]
     
     def __str__(self):
@@ -278,3 +299,355 @@ class CRMContact(models.Model):
     def __str__(self):
         return f"{self.full_name} ({self.mobile})"
 
+
+
+class CoPurchase(models.Model):
+    """
+    Sparse style-by-style co-occurrence counts from sales baskets (transaction_no).
+    Maintained incrementally by apps.analytics.recommendations after each sales import.
+    Rows in a style's top-K carry a rank; the rest keep rank NULL so counts stay exact.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='co_purchases')
+    style_code = models.CharField(max_length=100)
+    related_style_code = models.CharField(max_length=100)
+    basket_count = models.IntegerField(default=0)  # Baskets containing both styles
+    rank = models.IntegerField(null=True, blank=True)  # 1..K within style_code, NULL outside top-K
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'style_code', 'related_style_code']
+        indexes = [
+            models.Index(fields=['company', 'style_code', 'rank']),
+        ]
+        verbose_name = "Co-Purchase"
+    
+    def __str__(self):
+        return f"{self.style_code} + {self.related_style_code} ({self.basket_count})"
+
+
+class StockAgeIndex(models.Model):
+    """
+    First-seen / last-seen dates of each piece (jewel_code) at each location.
+    Updated incrementally on every stock import so ageing never rescans StockSnapshot history.
+    A piece is currently in stock when last_seen equals the latest snapshot date.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='stock_age_index')
+    
+    jewel_code = models.CharField(max_length=100)
+    location = models.CharField(max_length=100)
+    style_code = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    
+    first_seen = models.DateField()
+    last_seen = models.DateField()
+    
+    # As of last_seen
+    quantity = models.IntegerField(default=0)
+    sale_price = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    
+    class Meta:
+        unique_together = ['company', 'jewel_code', 'location']
+        indexes = [
+            models.Index(fields=['company', 'last_seen', 'first_seen']),
+        ]
+        verbose_name = "Stock Age Index"
+    
+    def __str__(self):
+        return f"{self.jewel_code} @ {self.location} ({self.first_seen} - {self.last_seen})"
+
+
+class ReplenishmentSuggestion(models.Model):
+    """
+    Precomputed sales velocity vs on-hand stock per location, by style or by category.
+    Rebuilt in one batch by apps.analytics.replenishment; the report only reads this table.
+    """
+    LEVEL_CHOICES = [
+        ('style', 'Style'),
+        ('category', 'Category'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='replenishment_suggestions')
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    location = models.CharField(max_length=100)
+    key = models.CharField(max_length=100)  # style_code or category, depending on level
+    category = models.CharField(max_length=100, blank=True)
+    
+    sold_qty = models.IntegerField(default=0)  # Net pieces sold in the lookback window
+    daily_velocity = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    on_hand = models.IntegerField(default=0)
+    days_of_cover = models.DecimalField(max_digits=12, decimal_places=1, null=True, blank=True)  # Null when nothing sells
+    suggested_qty = models.IntegerField(default=0)
+    
+    snapshot_date = models.DateField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'level', 'location', 'key']
+        indexes = [
+            models.Index(fields=['company', 'level', 'suggested_qty']),
+            models.Index(fields=['company', 'level', 'location']),
+        ]
+        verbose_name = "Replenishment Suggestion"
+    
+    def __str__(self):
+        return f"{self.key} @ {self.location}: reorder {self.suggested_qty}"
+
+
+class LocationAlias(models.Model):
+    """
+    An imported location string (StockSnapshot.location or SalesRecord.region) and the Store it resolves to.
+    Registered at import time; store stays null until a store's GATI location name or name matches.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='location_aliases')
+    alias = models.CharField(max_length=100)
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='location_aliases')
+    
+    in_sales = models.BooleanField(default=False)
+    in_stock = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['company', 'alias']
+        indexes = [
+            models.Index(fields=['company', 'store']),
+        ]
+        ordering = ['alias']
+        verbose_name = "Location Alias"
+        verbose_name_plural = "Location Aliases"
+    
+    def __str__(self):
+        return f"{self.alias} -> {self.store.name if self.store else 'unlinked'}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Sales aggregated per company, day and breakdown (store/region, category, collection, metal, salesperson).
+    Rebuilt for the affected days after every sales import; reports read it instead of scanning SalesRecord.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='daily_sales_rollups')
+    date = models.DateField()
+    
+    # Breakdown
+    store = models.ForeignKey(Store, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_sales_rollups')
+    region = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    collection = models.CharField(max_length=100, blank=True)
+    base_metal = models.CharField(max_length=50, blank=True)
+    sales_person = models.CharField(max_length=100, blank=True)
+    
+    # Sales (transaction_type = 'sale')
+    sale_count = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    gross_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    final_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    gross_margin = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    # Returns (transaction_type = 'return')
+    return_count = models.IntegerField(default=0)
+    return_quantity = models.IntegerField(default=0)
+    return_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    # HyperLogLog sketches of the sold customers / styles (apps.analytics.sketches); null on rows built before them
+    customer_sketch = models.BinaryField(null=True, blank=True)
+    style_sketch = models.BinaryField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'date']),
+            models.Index(fields=['company', 'store', 'date']),
+            models.Index(fields=['company', 'sales_person', 'date']),
+        ]
+        verbose_name = "Daily Sales Rollup"
+    
+    def __str__(self):
+        return f"{self.date} {self.region or '-'} {self.category or '-'}: {self.revenue}"
+
+
+class StockSketch(models.Model):
+    """
+    HyperLogLog sketch of the styles on hand per company, snapshot date, location and category
+    (apps.analytics.sketches). Rebuilt for the snapshot dates of every stock import.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='stock_sketches')
+    snapshot_date = models.DateField()
+    location = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    style_sketch = models.BinaryField()
+    
+    class Meta:
+        unique_together = ['company', 'snapshot_date', 'location', 'category']
+        verbose_name = "Stock Sketch"
+    
+    def __str__(self):
+        return f"{self.snapshot_date} {self.location or '-'} {self.category or '-'}"
+
+
+class CustomerProfile(models.Model):
+    """
+    Per-customer aggregates keyed by normalised mobile, assembled from SalesRecord, CRMContact,
+    referrals and old gold purchases. Refreshed for the affected mobiles after each sales or CRM import.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='customer_profiles')
+    mobile = models.CharField(max_length=20)
+    name = models.CharField(max_length=255, blank=True)
+    
+    # Sales history
+    first_purchase = models.DateField(null=True, blank=True)
+    last_purchase = models.DateField(null=True, blank=True)
+    visit_count = models.IntegerField(default=0)
+    items_bought = models.IntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    return_amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    favourite_category = models.CharField(max_length=100, blank=True)
+    
+    # CRM, referrals and old gold
+    lead_status = models.CharField(max_length=50, blank=True)
+    loyalty_points = models.IntegerField(default=0)
+    referral_count = models.IntegerField(default=0)
+    old_gold_count = models.IntegerField(default=0)
+    old_gold_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'mobile']
+        indexes = [
+            models.Index(fields=['company', 'lifetime_spend']),
+            models.Index(fields=['company', 'last_purchase']),
+            models.Index(fields=['company', 'first_purchase']),
+        ]
+        verbose_name = "Customer Profile"
+    
+    def __str__(self):
+        return f"{self.name or self.mobile}: {self.lifetime_spend}"
+
+
+class CustomerRFM(models.Model):
+    """
+    Recency / frequency / monetary scores per customer (normalised mobile), 1-5 by quintile.
+    Recomputed nightly by apps.analytics.rfm; segment reports and exports read only this table.
+    """
+    SEGMENT_CHOICES = [
+        ('champions', 'Champions'),
+        ('new', 'New Customers'),
+        ('loyal', 'Loyal'),
+        ('potential', 'Potential Loyalists'),
+        ('at_risk', 'At Risk'),
+        ('needs_attention', 'Needs Attention'),
+        ('hibernating', 'Hibernating'),
+        ('lost', 'Lost'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='customer_rfm')
+    mobile = models.CharField(max_length=20)
+    name = models.CharField(max_length=255, blank=True)
+    
+    last_purchase = models.DateField()
+    recency_days = models.IntegerField()
+    frequency = models.IntegerField()
+    monetary = models.DecimalField(max_digits=18, decimal_places=2)
+    
+    r_score = models.SmallIntegerField()
+    f_score = models.SmallIntegerField()
+    m_score = models.SmallIntegerField()
+    segment = models.CharField(max_length=20, choices=SEGMENT_CHOICES)
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'mobile']
+        indexes = [
+            models.Index(fields=['company', 'segment', 'monetary']),
+        ]
+        verbose_name = "Customer RFM Score"
+    
+    def __str__(self):
+        return f"{self.mobile}: {self.r_score}{self.f_score}{self.m_score} {self.segment}"
+
+
+class CohortRetention(models.Model):
+    """
+    One row of the cohort retention matrix: customers whose first purchase fell in cohort_month,
+    with active customers and revenue for each month since (index 0 = the cohort month itself).
+    Recomputed only for the cohorts an import touches (apps.analytics.cohorts).
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='cohort_retention')
+    cohort_month = models.DateField()  # First day of the month
+    size = models.IntegerField(default=0)
+    repeat_customers = models.IntegerField(default=0)
+    active = models.JSONField(default=list)
+    revenue = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'cohort_month']
+        ordering = ['cohort_month']
+        verbose_name = "Cohort Retention"
+    
+    def __str__(self):
+        return f"{self.cohort_month:%b %Y}: {self.size} customers"
+
+
+class SalesForecast(models.Model):
+    """
+    Daily revenue forecast per location x category series, refreshed nightly by apps.analytics.forecasting.
+    Rows cover the back-test window (actual filled in, forecast made without those days) and the
+    forecast horizon (actual NULL). mae / wape are the series' back-test errors for the chosen model.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='sales_forecasts')
+    location = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    date = models.DateField()
+    
+    forecast = models.DecimalField(max_digits=18, decimal_places=2)
+    actual = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)
+    
+    model = models.CharField(max_length=30)
+    mae = models.DecimalField(max_digits=18, decimal_places=2)
+    wape = models.FloatField(null=True, blank=True)  # NULL when the back-test window had no sales
+    computed_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'location', 'category', 'date']
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+        verbose_name = "Sales Forecast"
+    
+    def __str__(self):
+        return f"{self.location} / {self.category} {self.date}: {self.forecast}"
+
+
+class SalesAnomaly(models.Model):
+    """
+    A location-day whose net sales fall far outside the location's recent range (apps.analytics.anomalies).
+    baseline / mad are the median and median absolute deviation of the preceding selling days; score is the
+    robust z-score. Re-scored for the days an import touches and the days whose baseline they feed.
+    """
+    DIRECTION_CHOICES = [
+        ('spike', 'Spike'),
+        ('drop', 'Drop'),
+    ]
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='sales_anomalies')
+    location = models.CharField(max_length=100, blank=True)
+    date = models.DateField()
+    
+    revenue = models.DecimalField(max_digits=18, decimal_places=2)  # Net of returns
+    baseline = models.DecimalField(max_digits=18, decimal_places=2)
+    mad = models.DecimalField(max_digits=18, decimal_places=2)
+    score = models.FloatField()
+    direction = models.CharField(max_length=10, choices=DIRECTION_CHOICES)
+    detected_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['company', 'location', 'date']
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+        ordering = ['-date', 'location']
+        verbose_name = "Sales Anomaly"
+    
+    def __str__(self):
+        return f"{self.location or '-'} {self.date}: {self.get_direction_display()} ({self.revenue} vs {self.baseline})"
@@ -0,0 +1,202 @@
+"""
+Ad-hoc pivot queries for Darpan analytics.
+Answers whitelisted dimension / measure / filter combinations from the precomputed tables only:
+DailySalesRollup for sales and the current pieces in StockAgeIndex for stock. Results are
+cached per company and data version, so repeated exploration costs one cache read.
+"""
+
+import hashlib
+from datetime import datetime
+from django.core.cache import cache
+from django.db.models import Sum, Count, Max, F
+from django.db.models.functions import TruncWeek, TruncMonth, TruncQuarter, TruncYear
+
+from .models import DailySalesRollup, StockAgeIndex, LocationAlias
+from .store_reports import data_version
+
+CACHE_TIMEOUT = 60 * 60
+
+# Most dimensions per query, and most result rows returned
+MAX_DIMENSIONS = 3
+MAX_ROWS = 5000
+
+# Source -> whitelisted dimensions (field name or expression), measures and filters (GET parameter -> field)
+SOURCES = {
+    'sales': {
+        'dimensions': {
+            'day': F('date'),
+            'week': TruncWeek('date'),
+            'month': TruncMonth('date'),
+            'quarter': TruncQuarter('date'),
+            'year': TruncYear('date'),
+            'region': F('region'),
+            'store': F('store__name'),
+            'category': F('category'),
+            'collection': F('collection'),
+            'metal': F('base_metal'),
+            'salesperson': F('sales_person'),
+        },
+        'measures': {
+            'revenue': Sum('revenue'),
+            'margin': Sum('gross_margin'),
+            'qty': Sum('quantity'),
+            'count': Sum('sale_count'),
+            'discount': Sum('discount_amount'),
+            'gross': Sum('gross_amount'),
+            'returns': Sum('return_amount'),
+        },
+        'filters': {
+            'category': 'category',
+            'collection': 'collection',
+            'location': 'region',
+            'metal': 'base_metal',
+            'salesperson': 'sales_person',
+        },
+        'date_field': 'date',
+    },
+    'stock': {
+        'dimensions': {
+            'region': F('location'),
+            'category': F('category'),
+            'style': F('style_code'),
+        },
+        'measures': {
+            'qty': Sum('quantity'),
+            'value': Sum(F('quantity') * F('sale_price')),
+            'count': Count('id'),
+        },
+        'filters': {
+            'category': 'category',
+            'location': 'location',
+        },
+        'date_field': None,
+    },
+}
+
+
+def _names(params, key):
+    """Comma-separated and/or repeated GET values, in order, without blanks or repeats."""
+    names = []
+    for value in params.getlist(key):
+        for name in value.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+    return names
+
+
+def parse_pivot(params):
+    """
+    Validate a pivot request against the whitelist.
+
+    Args:
+        params: QueryDict with source, dimensions, measures and the report filter parameters
+
+    Returns:
+        dict with source, dimensions and measures
+
+    Raises:
+        ValueError with a message fit for the API response
+    """
+    source = params.get('source', 'sales')
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source '{source}'. Choose from: {', '.join(SOURCES)}")
+    spec = SOURCES[source]
+
+    dimensions = _names(params, 'dimensions')
+    measures = _names(params, 'measures') or [next(iter(spec['measures']))]
+    unknown = [d for d in dimensions if d not in spec['dimensions']]
+    if unknown:
+        raise ValueError(f"Unknown {source} dimension(s): {', '.join(unknown)}. Choose from: {', '.join(spec['dimensions'])}")
+    unknown = [m for m in measures if m not in spec['measures']]
+    if unknown:
+        raise ValueError(f"Unknown {source} measure(s): {', '.join(unknown)}. Choose from: {', '.join(spec['measures'])}")
+    if len(dimensions) > MAX_DIMENSIONS:
+        raise ValueError(f"At most {MAX_DIMENSIONS} dimensions per query")
+
+    return {'source': source, 'dimensions': dimensions, 'measures': measures}
+
+
+def _base_queryset(company, source, params):
+    spec = SOURCES[source]
+    if source == 'sales':
+        queryset = DailySalesRollup.objects.filter(company=company)
+    else:
+        index = StockAgeIndex.objects.filter(company=company)
+        queryset = index.filter(last_seen=index.aggregate(latest=Max('last_seen'))['latest'], quantity__gt=0)
+
+    if spec['date_field']:
+        for param, lookup in (('date_from', 'gte'), ('date_to', 'lte')):
+            try:
+                value = datetime.strptime(params.get(param, ''), '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            queryset = queryset.filter(**{f"{spec['date_field']}__{lookup}": value})
+
+    for param, field in spec['filters'].items():
+        values = [v for v in params.getlist(param) if v]
+        if values:
+            queryset = queryset.filter(**{f'{field}__in': values})
+
+    stores = [int(s) for s in params.getlist('store') if s.isdigit()]
+    if stores and source == 'sales':
+        queryset = queryset.filter(store_id__in=stores)
+    elif stores:
+        # The age index is keyed by location string - use the stores' aliases
+        aliases = LocationAlias.objects.filter(company=company, store_id__in=stores).values('alias')
+        queryset = queryset.filter(location__in=aliases)
+    return queryset
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()[:10]
+    return value if value not in (None, '') else 'Unknown'
+
+
+def run_pivot(company, query, params):
+    """
+    Grouped totals for a parsed query (see parse_pivot).
+
+    Returns:
+        dict with source, dimensions, measures, rows (one dict per dimension combination,
+        ordered by the dimensions), totals per measure and truncated (more than MAX_ROWS rows)
+    """
+    spec = SOURCES[query['source']]
+    queryset = _base_queryset(company, query['source'], params)
+    measures = {m: spec['measures'][m] for m in query['measures']}
+
+    totals = queryset.aggregate(**{f'm_{m}': expression for m, expression in measures.items()})
+    rows = []
+    if query['dimensions']:
+        aliases = {f'd_{d}': spec['dimensions'][d] for d in query['dimensions']}
+        grouped = queryset.values(**aliases).annotate(**{f'm_{m}': expression for m, expression in measures.items()})
+        for g in grouped.order_by(*aliases)[:MAX_ROWS + 1]:
+            row = {d: _value(g[f'd_{d}']) for d in query['dimensions']}
+            row.update({m: float(g[f'm_{m}'] or 0) for m in measures})
+            rows.append(row)
+
+    return {
+        **query,
+        'rows': rows[:MAX_ROWS],
+        'totals': {m: float(totals[f'm_{m}'] or 0) for m in measures},
+        'truncated': len(rows) > MAX_ROWS,
+    }
+
+
+def cached_pivot(company, params):
+    """
+    parse_pivot + run_pivot, cached until the company's next import.
+
+    Raises:
+        ValueError for queries outside the whitelist
+    """
+    query = parse_pivot(params)
+    canonical = '&'.join(f'{k}={",".join(sorted(params.getlist(k)))}' for k in sorted(params))
+    key = f"pivot_{company.id}_{data_version(company)}_{hashlib.md5(canonical.encode()).hexdigest()}"
+
+    data = cache.get(key)
+    if data is None:
+        data = run_pivot(company, query, params)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
@@ -0,0 +1,177 @@
+"""
+Data-quality profiling of imported files for Darpan analytics.
+Profiles the mapped DataFrame column-wise with vectorised pandas operations while the importer
+has it in memory: null rates, zero / negative amounts, out-of-range weights, the date range,
+distinct-value counts and z-score outliers. The compact result is stored on ImportLog.profile
+and shown on the import history page, so a bad file is spotted without rescanning its rows.
+"""
+
+import pandas as pd
+
+# Per file type: which mapped columns get which checks (columns missing from a file are skipped)
+PROFILES = {
+    'sales': {
+        'date': 'transaction_date',
+        'amounts': ['revenue', 'final_amount', 'gross_amount', 'gross_margin'],
+        'weights': ['gross_weight', 'net_weight'],
+        'distinct': ['transaction_no', 'style_code', 'client_mobile', 'region', 'product_category', 'sales_person'],
+        'outliers': ['revenue', 'discount_amount'],
+    },
+    'stock': {
+        'date': 'snapshot_date',
+        'amounts': ['sale_price'],
+        'weights': ['gross_weight', 'net_weight'],
+        'distinct': ['jewel_code', 'style_code', 'location', 'category'],
+        'outliers': ['sale_price'],
+    },
+    'crm': {
+        'date': None,
+        'amounts': [],
+        'weights': [],
+        'distinct': ['mobile', 'email', 'store_name', 'lead_source'],
+        'outliers': [],
+    },
+}
+
+# Same formats the importer's _parse_date accepts, in the same order, then the text of the
+# datetimes Excel cells are read as
+DATE_FORMATS = ['%d-%m-%Y', '%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S']
+
+# Plausible gross / net weight of one line, in grams
+WEIGHT_RANGE = (0, 1000)
+
+# |z| above which an amount is reported as an outlier, and the row numbers kept per column
+Z_LIMIT = 4
+SAMPLE_ROWS = 10
+
+
+def _numeric(series):
+    """Column as floats, with the importer's comma / rupee / space clean-up; unparseable -> NaN"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    cleaned = series.astype(str).str.replace(r'[,₹\s]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _dates(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    text = series.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=series.index)
+    for fmt in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(text, format=fmt, errors='coerce'))
+    return parsed
+
+
+def _blank(series):
+    """Missing or whitespace-only cells"""
+    return series.isna() | series.astype(str).str.strip().isin(['', 'nan', 'NaN', 'None'])
+
+
+def _row_numbers(mask):
+    # File row numbers as the importer reports them (header is row 1)
+    return [int(i) + 2 for i in mask[mask].index[:SAMPLE_ROWS]]
+
+
+def profile_frame(df, file_type, returns=None):
+    """
+    Data-quality profile of a mapped import DataFrame.
+
+    Args:
+        df: DataFrame with columns renamed to model field names
+        file_type: 'sales', 'stock' or 'crm'
+        returns: Optional boolean Series marking return lines; their amounts are negative
+                 by design, so they are left out of the amount and outlier checks
+
+    Returns:
+        dict with rows, nulls (percent per column that has any), dates, amounts, weights,
+        distinct and outliers; sections with nothing to report are left out
+    """
+    spec = PROFILES[file_type]
+    rows = len(df)
+    profile = {'rows': rows}
+    if not rows:
+        return profile
+
+    blanks = df.apply(_blank)
+    nulls = (blanks.mean() * 100).round(1)
+    nulls = {str(col): float(rate) for col, rate in nulls.items() if rate > 0}
+    if nulls:
+        profile['nulls'] = nulls
+
+    date_col = spec['date']
+    if date_col in df.columns:
+        dates = _dates(df[date_col])
+        profile['dates'] = {
+            'from': dates.min().date().isoformat() if dates.notna().any() else None,
+            'to': dates.max().date().isoformat() if dates.notna().any() else None,
+            'unparsed': int((dates.isna() & ~blanks[date_col]).sum()),
+        }
+
+    priced = df if returns is None else df[~returns.reindex(df.index, fill_value=False)]
+    amounts = {}
+    numbers = {}
+    for col in spec['amounts']:
+        if col in priced.columns:
+            numbers[col] = values = _numeric(priced[col])
+            counts = {'zero': int((values == 0).sum()), 'negative': int((values < 0).sum())}
+            if any(counts.values()):
+                amounts[col] = counts
+    if amounts:
+        profile['amounts'] = amounts
+
+    low, high = WEIGHT_RANGE
+    weights = {}
+    for col in spec['weights']:
+        if col in df.columns:
+            values = _numeric(df[col])
+            out_of_range = (values < low) | (values > high)
+            if out_of_range.any():
+                weights[col] = {'count': int(out_of_range.sum()), 'rows': _row_numbers(out_of_range)}
+    if weights:
+        profile['weights'] = weights
+
+    distinct = {col: int(df[col][~blanks[col]].nunique()) for col in spec['distinct'] if col in df.columns}
+    if distinct:
+        profile['distinct'] = distinct
+
+    outliers = {}
+    for col in spec['outliers']:
+        values = numbers.get(col)
+        if values is None:
+            if col not in priced.columns:
+                continue
+            values = _numeric(priced[col])
+        std = values.std()
+        if not std or pd.isna(std):
+            continue
+        z = (values - values.mean()) / std
+        flagged = z.abs() > Z_LIMIT
+        if flagged.any():
+            outliers[col] = {
+                'count': int(flagged.sum()),
+                'max': float(values[flagged].abs().max()),
+                'rows': _row_numbers(flagged),
+            }
+    if outliers:
+        profile['outliers'] = outliers
+
+    return profile
+
+
+def profile_issues(profile):
+    """Readable one-line findings of a stored profile (null rates and distinct counts are not issues)."""
+    issues = []
+    dates = profile.get('dates') or {}
+    if dates.get('unparsed'):
+        issues.append(f"{dates['unparsed']} unparseable dates")
+    for col, counts in (profile.get('amounts') or {}).items():
+        if counts.get('negative'):
+            issues.append(f"{col}: {counts['negative']} negative")
+        if counts.get('zero'):
+            issues.append(f"{col}: {counts['zero']} zero")
+    for col, found in (profile.get('weights') or {}).items():
+        issues.append(f"{col}: {found['count']} outside {WEIGHT_RANGE[0]}-{WEIGHT_RANGE[1]} g (rows {', '.join(map(str, found['rows']))})")
+    for col, found in (profile.get('outliers') or {}).items():
+        issues.append(f"{col}: {found['count']} outliers beyond {Z_LIMIT} sd, up to {found['max']:,.0f} (rows {', '.join(map(str, found['rows']))})")
+    return issues
@@ -0,0 +1,154 @@
+"""
+Item-to-item "frequently bought together" recommendations.
+Builds a sparse style-by-style co-occurrence matrix from SalesRecord baskets
+(rows sharing a transaction_no) and keeps the top-K neighbours per style in CoPurchase.
+"""
+
+import logging
+from collections import defaultdict
+import pandas as pd
+from django.db import transaction
+
+from .models import SalesRecord, CoPurchase
+
+logger = logging.getLogger(__name__)
+
+# Neighbours kept (ranked) per style
+TOP_K = 10
+
+
+def pair_counts(items):
+    """
+    Count co-occurring style pairs across baskets.
+
+    Args:
+        items: DataFrame with columns tx, style and is_old. is_old marks styles that
+               were already in the basket before the current import; pairs made only
+               of old styles were counted previously and are skipped.
+
+    Returns:
+        pandas Series of basket counts indexed by (style_code, related_style_code),
+        holding both directions of every pair
+    """
+    if items.empty:
+        return pd.Series(dtype=int)
+
+    # One row per style per basket - a basket counts once however many pieces it holds
+    items = items.groupby(['tx', 'style'], as_index=False)['is_old'].all()
+    pairs = items.merge(items, on='tx', suffixes=('_a', '_b'))
+    pairs = pairs[(pairs['style_a'] != pairs['style_b']) & ~(pairs['is_old_a'] & pairs['is_old_b'])]
+    return pairs.groupby(['style_a', 'style_b']).size()
+
+
+def _basket_items(company, tx_numbers=None):
+    """(tx, style) rows of sale baskets, optionally limited to some transaction numbers."""
+    qs = SalesRecord.objects.filter(company=company, transaction_type='sale').exclude(
+        transaction_no='').exclude(transaction_no__isnull=True).exclude(style_code='')
+    if tx_numbers is not None:
+        qs = qs.filter(transaction_no__in=list(tx_numbers))
+    return pd.DataFrame.from_records(
+        list(qs.values_list('transaction_no', 'style_code')), columns=['tx', 'style']
+    )
+
+
+def update_co_purchases(company, new_items):
+    """
+    Fold newly imported sales into the co-occurrence counts.
+
+    Only baskets touched by the import are read; pairs they already contributed
+    before the import are not counted twice.
+
+    Args:
+        company: Company object
+        new_items: Iterable of (transaction_no, style_code) for the records just created
+
+    Returns:
+        Number of styles whose neighbours changed
+    """
+    new_df = pd.DataFrame.from_records(list(new_items), columns=['tx', 'style'])
+    new_df = new_df[(new_df['tx'] != '') & (new_df['style'] != '')]
+    if new_df.empty:
+        return 0
+
+    all_df = _basket_items(company, new_df['tx'].unique())
+    if all_df.empty:
+        return 0
+
+    # Styles present in a basket before this import: more pieces in the DB than were just added
+    all_counts = all_df.groupby(['tx', 'style']).size()
+    new_counts = new_df.groupby(['tx', 'style']).size().reindex(all_counts.index, fill_value=0)
+    items = (all_counts - new_counts).gt(0).rename('is_old').reset_index()
+
+    return _apply_delta(company, pair_counts(items))
+
+
+def rebuild_co_purchases(company):
+    """
+    Recompute the whole co-occurrence matrix for a company from sales history.
+
+    Returns:
+        Number of styles with neighbours
+    """
+    items = _basket_items(company)
+    items['is_old'] = False
+    counts = pair_counts(items)
+
+    with transaction.atomic():
+        CoPurchase.objects.filter(company=company).delete()
+        return _apply_delta(company, counts)
+
+
+def _apply_delta(company, delta):
+    """Add pair counts to CoPurchase and re-rank the top-K of every affected style."""
+    if delta.empty:
+        return 0
+
+    styles = delta.index.get_level_values(0).unique().tolist()
+
+    with transaction.atomic():
+        rows = defaultdict(dict)
+        for row in CoPurchase.objects.filter(company=company, style_code__in=styles):
+            rows[row.style_code][row.related_style_code] = row
+
+        to_create = []
+        for (style, related), count in delta.items():
+            row = rows[style].get(related)
+            if row is None:
+                row = CoPurchase(company=company, style_code=style, related_style_code=related)
+                rows[style][related] = row
+                to_create.append(row)
+            row.basket_count += int(count)
+
+        to_update = []
+        for style in styles:
+            ranked = sorted(rows[style].values(), key=lambda r: (-r.basket_count, r.related_style_code))
+            for i, row in enumerate(ranked):
+                row.rank = i + 1 if i < TOP_K else None
+                if row.pk:
+                    to_update.append(row)
+
+        CoPurchase.objects.bulk_create(to_create, batch_size=500)
+        CoPurchase.objects.bulk_update(to_update, ['basket_count', 'rank'], batch_size=500)
+
+    logger.info(f"Co-purchase neighbours refreshed for {len(styles)} styles (company {company.id})")
+    return len(styles)
+
+
+def frequently_bought_together(company, style_codes, limit=5):
+    """
+    Top neighbours for a set of styles, read from the ranked rows only.
+
+    Returns:
+        dict of style_code -> list of {'style_code', 'basket_count'} ordered by rank
+    """
+    style_codes = [s for s in set(style_codes) if s]
+    if not company or not style_codes:
+        return {}
+
+    result = defaultdict(list)
+    rows = CoPurchase.objects.filter(
+        company=company, style_code__in=style_codes, rank__lte=limit
+    ).order_by('style_code', 'rank').values_list('style_code', 'related_style_code', 'basket_count')
+    for style, related, count in rows:
+        result[style].append({'style_code': related, 'basket_count': count})
+    return dict(result)
@@ -0,0 +1,124 @@
+"""
+Replenishment suggestions for Darpan analytics.
+Compares per-location sales velocity (SalesRecord) with on-hand stock from the latest
+StockSnapshot and stores days-of-cover and reorder quantities in ReplenishmentSuggestion.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import SalesRecord, StockSnapshot, ReplenishmentSuggestion
+
+logger = logging.getLogger(__name__)
+
+# Sales window the velocity is averaged over
+LOOKBACK_DAYS = 90
+
+# Stock a location should hold, in days of sales, after replenishment
+TARGET_COVER_DAYS = 45
+
+
+def _sales_frame(company, as_of, lookback_days):
+    """Net pieces sold per (location, style, category) in the lookback window."""
+    rows = SalesRecord.objects.filter(
+        company=company,
+        transaction_type__in=['sale', 'return'],
+        transaction_date__gt=as_of - timedelta(days=lookback_days),
+        transaction_date__lte=as_of,
+    ).exclude(region='').values_list('region', 'style_code', 'product_category', 'transaction_type', 'quantity')
+
+    df = pd.DataFrame.from_records(list(rows), columns=['location', 'style', 'category', 'type', 'qty'])
+    # Return quantities are stored as they appear in the file, with or without a minus sign
+    df['sold'] = np.where(df['type'] == 'return', -df['qty'].abs(), df['qty'])
+    return df[['location', 'style', 'category', 'sold']]
+
+
+def _stock_frame(company):
+    """On-hand pieces per (location, style, category) in the latest snapshot."""
+    stock_qs = StockSnapshot.objects.filter(company=company)
+    snapshot_date = stock_qs.aggregate(latest=Max('snapshot_date'))['latest']
+    rows = stock_qs.filter(snapshot_date=snapshot_date).exclude(location='').values_list(
+        'location', 'style_code', 'category', 'quantity'
+    ) if snapshot_date else []
+
+    df = pd.DataFrame.from_records(list(rows), columns=['location', 'style', 'category', 'on_hand'])
+    return df, snapshot_date
+
+
+def compute_suggestions(sales, stock, lookback_days=LOOKBACK_DAYS, target_cover_days=TARGET_COVER_DAYS, level='style'):
+    """
+    Vectorized velocity / cover / reorder computation for every location at once.
+
+    Args:
+        sales: DataFrame with location, style, category, sold
+        stock: DataFrame with location, style, category, on_hand
+        level: 'style' or 'category'
+
+    Returns:
+        DataFrame with location, key, category, sold_qty, daily_velocity, on_hand,
+        days_of_cover (NaN when nothing sells) and suggested_qty
+    """
+    key = 'style' if level == 'style' else 'category'
+    columns = ['location', 'key', 'category', 'sold_qty', 'daily_velocity', 'on_hand', 'days_of_cover', 'suggested_qty']
+    if sales.empty and stock.empty:
+        return pd.DataFrame(columns=columns)
+
+    sold = sales.groupby(['location', key]).agg(sold_qty=('sold', 'sum'), sales_category=('category', 'last'))
+    held = stock.groupby(['location', key]).agg(on_hand=('on_hand', 'sum'), stock_category=('category', 'last'))
+    df = sold.join(held, how='outer')
+    df = df[df.index.get_level_values(key) != ''].reset_index().rename(columns={key: 'key'})
+
+    df['sold_qty'] = df['sold_qty'].fillna(0).clip(lower=0).astype(int)
+    df['on_hand'] = df['on_hand'].fillna(0).clip(lower=0).astype(int)
+    df['category'] = df['key'] if level == 'category' else df['stock_category'].fillna(df['sales_category']).fillna('')
+
+    velocity = df['sold_qty'].to_numpy(dtype=float) / lookback_days
+    on_hand = df['on_hand'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['days_of_cover'] = np.where(velocity > 0, on_hand / velocity, np.nan)
+    df['daily_velocity'] = velocity
+    df['suggested_qty'] = np.ceil(velocity * target_cover_days - on_hand).clip(min=0).astype(int)
+
+    return df[columns]
+
+
+def refresh_replenishment(company, as_of=None, lookback_days=LOOKBACK_DAYS, target_cover_days=TARGET_COVER_DAYS):
+    """
+    Recompute the ReplenishmentSuggestion table for a company at style and category level.
+
+    Returns:
+        Number of rows written
+    """
+    as_of = as_of or timezone.localdate()
+    sales = _sales_frame(company, as_of, lookback_days)
+    stock, snapshot_date = _stock_frame(company)
+
+    to_create = []
+    for level in ('style', 'category'):
+        df = compute_suggestions(sales, stock, lookback_days, target_cover_days, level=level)
+        for row in df.itertuples(index=False):
+            to_create.append(ReplenishmentSuggestion(
+                company=company,
+                level=level,
+                location=row.location[:100],
+                key=row.key[:100],
+                category=row.category[:100],
+                sold_qty=row.sold_qty,
+                daily_velocity=round(row.daily_velocity, 4),
+                on_hand=row.on_hand,
+                days_of_cover=None if np.isnan(row.days_of_cover) else round(row.days_of_cover, 1),
+                suggested_qty=row.suggested_qty,
+                snapshot_date=snapshot_date,
+            ))
+
+    with transaction.atomic():
+        ReplenishmentSuggestion.objects.filter(company=company).delete()
+        ReplenishmentSuggestion.objects.bulk_create(to_create, batch_size=1000)
+
+    logger.info(f"Replenishment refreshed for company {company.id}: {len(to_create)} rows")
+    return len(to_create)
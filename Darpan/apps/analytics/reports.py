@@ -5,7 +5,12 @@ Provides intelligent reports with filters: Sales, Products, Customers, Stock, Se
 
 import logging
 from decimal import Decimal
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, ListView
+from django.views import View
+from django.http import HttpResponse, JsonResponse, Http404
+from django.shortcuts import redirect
+from django.urls import resolve, reverse
+from django.core.exceptions import PermissionDenied
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Sum, Count, Avg, Max, Min, F, Q
 from django.db.models.functions import TruncMonth, TruncDate, ExtractMonth, ExtractDay
@@ -14,7 +19,20 @@ from datetime import timedelta, datetime
 from collections import defaultdict
 import json
 
-from .models import SalesRecord, StockSnapshot, CRMContact, ImportLog
+from .models import (
+    SalesRecord, StockSnapshot, CRMContact, ImportLog, StockAgeIndex, ReplenishmentSuggestion, CustomerRFM,
+    DailySalesRollup, CustomerProfile,
+)
+from .stock_ageing import ageing_report
+from .store_reports import store_report
+from .cohorts import cohort_matrix
+from .scorecards import salesperson_scorecard, salesperson_detail
+from .comparisons import COMPARISONS, BREAKDOWNS, current_window, comparison_window, compare_periods
+from .pivot import SOURCES as PIVOT_SOURCES, cached_pivot
+from .exports import EXPORT_CHUNK, export_response, queryset_rows
+from .sketches import wants_exact, estimate_distinct, stock_styles
+from apps.core.models import Store
+from apps.core.pagination import KeysetPaginationMixin
 from apps.core.utils import safe_decimal, safe_divide, safe_float
 
 logger = logging.getLogger(__name__)
@@ -30,9 +48,35 @@ def safe_json(data, default='[]'):
         return default
 
 
+def is_store_scoped(user):
+    """Store managers assigned to a store see their own store's slice rather than the company."""
+    return bool(user.store_id) and not user.is_superuser and not user.has_any_role(['admin', 'platform_admin'])
+
+
 class ReportAccessMixin(UserPassesTestMixin):
+    """
+    Report access for admins and store managers. Store-scoped users only get the views marked
+    store_scoped, with ?store= pinned to their own store; the company-wide ones send them to
+    their store report.
+    """
+    store_scoped = False
+    
     def test_func(self):
         return self.request.user.is_superuser or self.request.user.has_any_role(['admin', 'platform_admin', 'store_manager'])
+    
+    def allows_store_scope(self, **kwargs):
+        return self.store_scoped
+    
+    def store_scope_denied(self):
+        return redirect('analytics:report_store')
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated and is_store_scoped(request.user):
+            if not self.allows_store_scope(**kwargs):
+                return self.store_scope_denied()
+            request.GET = request.GET.copy()
+            request.GET.setlist('store', [str(request.user.store_id)])
+        return super().dispatch(request, *args, **kwargs)
 
 
 def get_company(user):
@@ -58,11 +102,11 @@ def get_filter_options(company):
     }
 
 
-def apply_filters(queryset, request, is_stock=False):
-    """Apply common filters to queryset"""
+def apply_filters(queryset, request, is_stock=False, with_dates=True):
+    """Apply common filters to queryset (with_dates=False leaves the date range to the caller)"""
     # Date filters
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
+    date_from = request.GET.get('date_from') if with_dates else None
+    date_to = request.GET.get('date_to') if with_dates else None
     
     if date_from:
         try:
@@ -117,6 +161,11 @@ def apply_filters(queryset, request, is_stock=False):
             else:
                 queryset = queryset.filter(region__in=locations)
     
+    # Store filter uses the store_id resolved at import time (see apps.analytics.locations)
+    stores = [s for s in request.GET.getlist('store') if s.isdigit()]
+    if stores:
+        queryset = queryset.filter(store_id__in=[int(s) for s in stores])
+    
     metals = request.GET.getlist('metal')
     if metals:
         metals = [m for m in metals if m]
@@ -132,9 +181,82 @@ def apply_filters(queryset, request, is_stock=False):
     return queryset
 
 
+# Report filter parameter -> DailySalesRollup field (the rollup has no subcategory)
+ROLLUP_FILTERS = {
+    'category': 'category',
+    'collection': 'collection',
+    'location': 'region',
+    'metal': 'base_metal',
+    'salesperson': 'sales_person',
+}
+
+
+def apply_rollup_filters(queryset, request, with_dates=True):
+    """apply_filters for DailySalesRollup querysets - same GET parameters, rollup field names"""
+    for param, field in (('date_from', 'date__gte'), ('date_to', 'date__lte')):
+        value = request.GET.get(param)
+        if value and with_dates:
+            try:
+                queryset = queryset.filter(**{field: datetime.strptime(value, '%Y-%m-%d').date()})
+            except ValueError:
+                pass
+    
+    for param, field in ROLLUP_FILTERS.items():
+        values = [v for v in request.GET.getlist(param) if v]
+        if values:
+            queryset = queryset.filter(**{f'{field}__in': values})
+    
+    stores = [s for s in request.GET.getlist('store') if s.isdigit()]
+    if stores:
+        queryset = queryset.filter(store_id__in=[int(s) for s in stores])
+    
+    return queryset
+
+
+def distinct_sales(request, company, sales_qs):
+    """
+    (unique customers, unique styles, approximate) of the filtered sales. Merged from the rollup
+    sketches; counted exactly on sales_qs with ?exact=1, a subcategory filter (not on the rollup)
+    or rollup rows written before the sketches.
+    """
+    if not wants_exact(request) and not [s for s in request.GET.getlist('subcategory') if s]:
+        rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), request)
+        customers = estimate_distinct(rollup, 'customer_sketch')
+        styles = estimate_distinct(rollup, 'style_sketch') if customers is not None else None
+        if styles is not None:
+            return customers, styles, True
+    return (
+        sales_qs.exclude(client_mobile='').values('client_mobile').distinct().count(),
+        sales_qs.exclude(style_code='').values('style_code').distinct().count(),
+        False,
+    )
+
+
+# Stock filters the StockSketch rows can answer
+STOCK_SKETCH_FILTERS = ('location', 'category')
+
+
+def distinct_stock_styles(request, company, snapshot_date, stock_qs):
+    """
+    (unique styles in stock_qs, approximate) at a snapshot. Merged from the stock sketches when at
+    most location / category filters apply; counted exactly on stock_qs otherwise or with ?exact=1.
+    """
+    other_filters = [
+        v for param in ('subcategory', 'store', 'metal') for v in request.GET.getlist(param) if v
+    ]
+    if snapshot_date and not wants_exact(request) and not other_filters:
+        styles = stock_styles(company, snapshot_date, *(
+            [v for v in request.GET.getlist(param) if v] for param in STOCK_SKETCH_FILTERS
+        ))
+        if styles is not None:
+            return styles, True
+    return stock_qs.values('style_code').distinct().count(), False
+
+
 class ReportsMenuView(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Reports menu with links to all reports"""
     template_name = 'analytics/reports/menu.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -144,16 +266,24 @@ class ReportsMenuView(LoginRequiredMixin, ReportAccessMixin, TemplateView):
             {'name': 'Sell-Through Analysis', 'url': 'analytics:report_sellthrough', 'icon': 'bar-chart-2', 'desc': 'Sales vs stock by style, category'},
             {'name': 'Customer Insights', 'url': 'analytics:report_customers', 'icon': 'users', 'desc': 'CRM data, birthdays, lead status'},
             {'name': 'Stock Summary', 'url': 'analytics:report_stock', 'icon': 'box', 'desc': 'Value by location, low stock alerts'},
+            {'name': 'Stock Ageing', 'url': 'analytics:report_stock_ageing', 'icon': 'clock', 'desc': 'Days in stock by location and category'},
+            {'name': 'Replenishment', 'url': 'analytics:report_replenishment', 'icon': 'refresh-cw', 'desc': 'Days of cover and reorder suggestions'},
             {'name': 'Combined Insights', 'url': 'analytics:report_combined', 'icon': 'layers', 'desc': 'CRM + Sales combined analysis'},
             {'name': 'Exhibition Report', 'url': 'analytics:report_exhibition', 'icon': 'calendar', 'desc': 'Exhibition sales analysis'},
             {'name': 'Salesperson Scorecard', 'url': 'analytics:report_salesperson', 'icon': 'user-check', 'desc': 'Individual performance metrics'},
+            {'name': 'Period Comparison', 'url': 'analytics:report_compare', 'icon': 'git-compare', 'desc': 'Vs previous period, last month or last year'},
+            {'name': 'Pivot Explorer', 'url': 'analytics:report_pivot', 'icon': 'grid', 'desc': 'Slice sales and stock by any dimension'},
         ]
+        if is_store_scoped(self.request.user):
+            context['reports'] = [r for r in context['reports'] if resolve(reverse(r['url'])).func.view_class.store_scoped]
+        context['own_store'] = self.request.user.store
         return context
 
 
 class SalesPerformanceReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Sales Performance Report - by store, salesperson, time period"""
     template_name = 'analytics/reports/sales_performance.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -171,6 +301,9 @@ class SalesPerformanceReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
             context['total_transactions'] = sales_qs.count() or 0
             context['avg_order_value'] = safe_float(safe_divide(context['total_revenue'], context['total_transactions']), 0)
             context['total_margin'] = safe_float(sales_qs.aggregate(total=Sum('gross_margin'))['total'], 0)
+            context['unique_customers'], context['unique_styles'], context['distinct_approximate'] = distinct_sales(
+                self.request, company, sales_qs
+            )
             
             # By Store/Location
             store_data = list(sales_qs.values('region').annotate(
@@ -195,19 +328,19 @@ class SalesPerformanceReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
                 salesperson_list.append(sp)
             context['salesperson_data'] = salesperson_list
             
-            # Daily Trend
-            daily_data = sales_qs.values('transaction_date').annotate(
-                total=Sum('revenue')
-            ).order_by('transaction_date')
-            
-            daily_totals = defaultdict(float)
-            for item in daily_data:
-                if item['transaction_date']:
-                    daily_totals[item['transaction_date']] = safe_float(item['total'], 0)
+            # Daily trend is fetched from apps.analytics.charts (report-sales-trend) after render
             
-            sorted_days = sorted(daily_totals.keys())[-60:]  # Last 60 days max
-            context['trend_labels'] = safe_json([d.strftime('%d %b') for d in sorted_days] if sorted_days else [])
-            context['trend_values'] = safe_json([daily_totals[d] for d in sorted_days] if sorted_days else [])
+            # Optional comparison of the KPI totals for a dated range (?compare=previous|month|year), from the rollup
+            compare = self.request.GET.get('compare')
+            context['comparisons'] = COMPARISONS
+            context['comparison_optional'] = True
+            context['compare'] = compare
+            if compare in COMPARISONS and self.request.GET.get('date_from'):
+                rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), self.request, with_dates=False)
+                window = current_window(rollup, self.request.GET.get('date_from'), self.request.GET.get('date_to'))
+                if window:
+                    context['comparison'] = compare_periods(rollup, window, comparison_window(window, compare))[1]
+                    context['comparison_label'] = COMPARISONS[compare]
             
         except Exception as e:
             logger.exception("SalesPerformanceReport failed")
@@ -220,8 +353,6 @@ class SalesPerformanceReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
             context.setdefault('store_labels', '[]')
             context.setdefault('store_values', '[]')
             context.setdefault('salesperson_data', [])
-            context.setdefault('trend_labels', '[]')
-            context.setdefault('trend_values', '[]')
             context.setdefault('filters', {})
             context.setdefault('current_filters', {})
             context['error'] = str(e)
@@ -232,6 +363,7 @@ class SalesPerformanceReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
 class ProductAnalysisReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Product Analysis Report - top sellers, slow movers, category performance"""
     template_name = 'analytics/reports/product_analysis.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -290,9 +422,31 @@ class ProductAnalysisReport(LoginRequiredMixin, ReportAccessMixin, TemplateView)
         return context
 
 
+def sellthrough_stock(company, request):
+    """Stock compared in the sell-through report: the ?stock_date= snapshot, else the latest, with the report filters"""
+    stock_qs = StockSnapshot.objects.filter(company=company) if company else StockSnapshot.objects.none()
+    
+    # Allow selecting stock snapshot date
+    stock_date = request.GET.get('stock_date')
+    if stock_date:
+        try:
+            d = datetime.strptime(stock_date, '%Y-%m-%d').date()
+            stock_qs = stock_qs.filter(snapshot_date=d)
+        except:
+            pass
+    
+    if not stock_qs.exists():
+        latest_date = StockSnapshot.objects.filter(company=company).aggregate(Max('snapshot_date'))['snapshot_date__max'] if company else None
+        if latest_date:
+            stock_qs = StockSnapshot.objects.filter(company=company, snapshot_date=latest_date)
+    
+    return apply_filters(stock_qs, request, is_stock=True)
+
+
 class SellThroughReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Sell-Through Report - Sales vs Stock analysis by style, category with date filters"""
     template_name = 'analytics/reports/sellthrough.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -302,24 +456,7 @@ class SellThroughReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
             context['filters'] = get_filter_options(company)
             context['current_filters'] = self.request.GET
             
-            # Get stock data (with optional date filter)
-            stock_qs = StockSnapshot.objects.filter(company=company) if company else StockSnapshot.objects.none()
-            
-            # Allow selecting stock snapshot date
-            stock_date = self.request.GET.get('stock_date')
-            if stock_date:
-                try:
-                    d = datetime.strptime(stock_date, '%Y-%m-%d').date()
-                    stock_qs = stock_qs.filter(snapshot_date=d)
-                except:
-                    pass
-            
-            if not stock_qs.exists():
-                latest_date = StockSnapshot.objects.filter(company=company).aggregate(Max('snapshot_date'))['snapshot_date__max'] if company else None
-                if latest_date:
-                    stock_qs = StockSnapshot.objects.filter(company=company, snapshot_date=latest_date)
-            
-            stock_qs = apply_filters(stock_qs, self.request, is_stock=True)
+            stock_qs = sellthrough_stock(company, self.request)
             
             # Get available stock dates for dropdown
             available_dates = StockSnapshot.objects.filter(company=company).values_list('snapshot_date', flat=True).distinct().order_by('-snapshot_date')[:30] if company else []
@@ -417,6 +554,9 @@ class CustomerInsightsReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
         
         crm_qs = CRMContact.objects.filter(company=company) if company else CRMContact.objects.none()
         
+        # Purchase behaviour from the nightly RFM scores
+        context['segment_data'] = rfm_segment_summary(company)
+        
         # Total contacts
         context['total_contacts'] = crm_qs.count()
         
@@ -520,9 +660,85 @@ class CustomerInsightsReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
         return context
 
 
+def rfm_segment_summary(company):
+    """Customer count and spend per RFM segment, in CustomerRFM.SEGMENT_CHOICES order."""
+    totals = {
+        r['segment']: r for r in CustomerRFM.objects.filter(company=company).values('segment').annotate(
+            customers=Count('id'), monetary=Sum('monetary'), computed_at=Max('computed_at')
+        ).order_by()
+    }
+    return [
+        {'segment': key, 'label': label, 'customers': totals[key]['customers'],
+         'monetary': safe_float(totals[key]['monetary'], 0), 'computed_at': totals[key]['computed_at']}
+        for key, label in CustomerRFM.SEGMENT_CHOICES if key in totals
+    ]
+
+
+def segment_queryset(request):
+    """(segment key or '', CustomerRFM rows for the requested ?segment=)"""
+    segment = request.GET.get('segment', '')
+    segment = segment if segment in dict(CustomerRFM.SEGMENT_CHOICES) else ''
+    qs = CustomerRFM.objects.filter(company=get_company(request.user))
+    return segment, qs.filter(segment=segment) if segment else qs
+
+
+class CustomerSegmentReport(LoginRequiredMixin, ReportAccessMixin, KeysetPaginationMixin, ListView):
+    """Customer Segments - drill into one RFM segment, read from CustomerRFM"""
+    template_name = 'analytics/reports/customer_segments.html'
+    context_object_name = 'customers'
+    paginate_by = 50
+    keyset_ordering = ('-monetary', '-id')
+    
+    def get_queryset(self):
+        self.segment, qs = segment_queryset(self.request)
+        return qs
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['segment_data'] = rfm_segment_summary(get_company(self.request.user))
+        context['segment'] = self.segment
+        context['segment_label'] = dict(CustomerRFM.SEGMENT_CHOICES).get(context['segment'], 'All Customers')
+        return context
+
+
+class CustomerSegmentExport(LoginRequiredMixin, ReportAccessMixin, View):
+    """CSV / XLSX of the stored RFM scores, optionally for one segment"""
+    
+    def store_scope_denied(self):
+        raise PermissionDenied("This export covers the whole company")
+    
+    COLUMNS = ['mobile', 'name', 'segment', 'r_score', 'f_score', 'm_score',
+               'recency_days', 'frequency', 'monetary', 'last_purchase']
+    
+    def get(self, request):
+        segment, qs = segment_queryset(request)
+        rows = queryset_rows(qs.order_by('-monetary', 'id'), self.COLUMNS)
+        return export_response(request, f'customer_segments_{segment or "all"}', self.COLUMNS, rows, 'Customer Segments')
+
+
+class CohortReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Cohort Retention - month-of-first-purchase cohorts and repeat rates, read from CohortRetention"""
+    template_name = 'analytics/reports/cohorts.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        matrix = cohort_matrix(get_company(self.request.user))
+        rows = matrix['rows']
+        customers = sum(r['size'] for r in rows)
+        
+        context['periods'] = matrix['periods']
+        context['cohorts'] = rows
+        context['total_customers'] = customers
+        context['repeat_rate'] = round(
+            sum(r['size'] * r['repeat_rate'] for r in rows) / customers, 1
+        ) if customers else 0
+        return context
+
+
 class StockSummaryReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Stock Summary Report - value by location, category, low stock alerts"""
     template_name = 'analytics/reports/stock_summary.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -543,6 +759,7 @@ class StockSummaryReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
         
         if not stock_qs.exists():
             context['total_skus'] = 0
+            context['skus_approximate'] = False
             context['total_qty'] = 0
             context['total_value'] = 0
             context['total_weight'] = 0
@@ -554,7 +771,9 @@ class StockSummaryReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
             return context
         
         # Overall KPIs
-        context['total_skus'] = stock_qs.values('style_code').distinct().count()
+        context['total_skus'], context['skus_approximate'] = distinct_stock_styles(
+            self.request, company, latest_date, stock_qs
+        )
         context['total_qty'] = stock_qs.aggregate(total=Sum('quantity'))['total'] or 0
         context['total_value'] = stock_qs.aggregate(total=Sum(F('quantity') * F('sale_price')))['total'] or 0
         context['total_weight'] = stock_qs.aggregate(total=Sum('gross_weight'))['total'] or 0
@@ -596,6 +815,138 @@ class StockSummaryReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
         return context
 
 
+class StockAgeingReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Stock Ageing Report - age buckets by location and category, read from StockAgeIndex"""
+    template_name = 'analytics/reports/stock_ageing.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        company = get_company(self.request.user)
+        
+        locations = [l for l in self.request.GET.getlist('location') if l]
+        categories = [c for c in self.request.GET.getlist('category') if c]
+        context['selected_locations'] = locations
+        context['selected_categories'] = categories
+        
+        index = StockAgeIndex.objects.filter(company=company) if company else StockAgeIndex.objects.none()
+        context['filters'] = {
+            'locations': list(index.exclude(location='').values_list('location', flat=True).distinct().order_by('location')[:30]),
+            'categories': list(index.exclude(category='').values_list('category', flat=True).distinct().order_by('category')[:50]),
+        }
+        
+        report = ageing_report(company, locations, categories)
+        context.update(report)
+        context['total_qty'] = sum(cell['qty'] for cell in report['totals'])
+        context['bucket_labels'] = json.dumps(report['buckets'])
+        context['bucket_values'] = json.dumps([cell['value'] for cell in report['totals']])
+        return context
+
+
+REPLENISHMENT_SORT_OPTIONS = ['-suggested_qty', 'days_of_cover', '-daily_velocity', 'location', 'key']
+
+
+def replenishment_queryset(request):
+    """(level, sort, suggestions) for the replenishment report's level, location / category filters and sort"""
+    company = get_company(request.user)
+    params = request.GET
+    
+    level = params.get('level') if params.get('level') in ('style', 'category') else 'style'
+    qs = ReplenishmentSuggestion.objects.filter(company=company, level=level)
+    
+    locations = [l for l in params.getlist('location') if l]
+    if locations:
+        qs = qs.filter(location__in=locations)
+    categories = [c for c in params.getlist('category') if c]
+    if categories:
+        qs = qs.filter(category__in=categories)
+    if params.get('reorder_only'):
+        qs = qs.filter(suggested_qty__gt=0)
+    
+    sort = params.get('sort', '-suggested_qty')
+    sort = sort if sort in REPLENISHMENT_SORT_OPTIONS else '-suggested_qty'
+    return level, sort, qs.order_by(sort, 'location', 'key')
+
+
+class ReplenishmentReport(LoginRequiredMixin, ReportAccessMixin, ListView):
+    """Replenishment Report - days of cover and reorder quantities, read from ReplenishmentSuggestion"""
+    template_name = 'analytics/reports/replenishment.html'
+    context_object_name = 'suggestions'
+    paginate_by = 50
+    
+    def get_queryset(self):
+        self.level, self.sort, qs = replenishment_queryset(self.request)
+        return qs
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        company = get_company(self.request.user)
+        
+        table = ReplenishmentSuggestion.objects.filter(company=company, level='category')
+        context['filters'] = {
+            'locations': list(table.values_list('location', flat=True).distinct().order_by('location')[:50]),
+            'categories': list(table.values_list('key', flat=True).distinct().order_by('key')[:50]),
+        }
+        context['selected_locations'] = self.request.GET.getlist('location')
+        context['selected_categories'] = self.request.GET.getlist('category')
+        context['level'] = self.level
+        context['sort'] = self.sort
+        context['summary'] = self.object_list.aggregate(
+            rows=Count('id'),
+            reorder_qty=Sum('suggested_qty'),
+            on_hand=Sum('on_hand'),
+        )
+        context['computed_at'] = table.aggregate(latest=Max('computed_at'))['latest']
+        
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        context['querystring'] = query.urlencode()
+        return context
+
+
+def report_store(request, company):
+    """The user's own store; admins may pick any store of the company with ?store=<id>."""
+    user = request.user
+    store_id = request.GET.get('store', '')
+    if store_id.isdigit() and not is_store_scoped(user):
+        return Store.objects.filter(company=company, id=int(store_id)).first()
+    return user.store
+
+
+class StoreReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Store Report - one store's sales, stock, ageing and reorders from the rollup and summary tables"""
+    template_name = 'analytics/reports/store.html'
+    store_scoped = True
+    
+    def get_store(self, company):
+        return report_store(self.request, company)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        company = get_company(self.request.user)
+        store = self.get_store(company)
+        
+        context['store'] = store
+        if not is_store_scoped(self.request.user):
+            context['stores'] = Store.objects.filter(company=company, is_active=True) if company else []
+        if not store:
+            return context
+        
+        dates = {}
+        for param in ('date_from', 'date_to'):
+            try:
+                dates[param] = datetime.strptime(self.request.GET.get(param, ''), '%Y-%m-%d').date()
+            except ValueError:
+                dates[param] = None
+        
+        data = store_report(store, dates['date_from'], dates['date_to'])
+        context.update(data)
+        context['trend_labels'] = safe_json(data['trend_labels'])
+        context['trend_values'] = safe_json(data['trend_values'])
+        context['category_labels'] = safe_json([c['name'] for c in data['category_data']])
+        context['category_values'] = safe_json([c['revenue'] for c in data['category_data']])
+        return context
+
+
 class CombinedInsightsReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Combined Insights Report - CRM + Sales data analysis"""
     template_name = 'analytics/reports/combined_insights.html'
@@ -607,37 +958,34 @@ class CombinedInsightsReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
         crm_qs = CRMContact.objects.filter(company=company) if company else CRMContact.objects.none()
         sales_qs = SalesRecord.objects.filter(company=company, transaction_type='sale') if company else SalesRecord.objects.none()
         
-        # Match customers between CRM and Sales by mobile
-        crm_mobiles = set(crm_qs.values_list('mobile', flat=True))
-        sales_mobiles = set(sales_qs.exclude(client_mobile='').values_list('client_mobile', flat=True))
+        # Match customers between CRM and Sales by mobile, counted in the database
+        # Blank mobiles are left out on both sides: Oracle stores '' as NULL, and one NULL in a
+        # NOT IN subquery would make it match nothing
+        sales_mobiles = sales_qs.exclude(client_mobile='').exclude(client_mobile__isnull=True).values('client_mobile')
+        crm_mobiles = crm_qs.exclude(mobile='').exclude(mobile__isnull=True).values('mobile')
+        purchased_contacts = crm_qs.filter(mobile__in=sales_mobiles)
         
-        matched_mobiles = crm_mobiles.intersection(sales_mobiles)
-        context['crm_total'] = len(crm_mobiles)
-        context['sales_customers'] = len(sales_mobiles)
-        context['matched_customers'] = len(matched_mobiles)
-        context['crm_not_purchased'] = len(crm_mobiles - sales_mobiles)
-        context['sales_not_in_crm'] = len(sales_mobiles - crm_mobiles)
+        context['crm_total'] = crm_mobiles.distinct().count()
+        context['matched_customers'] = purchased_contacts.values('mobile').distinct().count()
+        context['sales_not_in_crm'] = sales_mobiles.exclude(client_mobile__in=crm_mobiles).distinct().count()
+        context['sales_customers'] = context['matched_customers'] + context['sales_not_in_crm']
+        context['crm_not_purchased'] = context['crm_total'] - context['matched_customers']
         
         # Top customers from CRM who purchased
-        if matched_mobiles:
-            top_buyers = list(sales_qs.filter(client_mobile__in=list(matched_mobiles)[:100]).values(
-                'client_name', 'client_mobile'
-            ).annotate(
-                total_spent=Sum('revenue'),
-                total_qty=Sum('quantity'),
-                order_count=Count('id')
-            ).order_by('-total_spent')[:20])
-            context['top_buyers'] = top_buyers
-        else:
-            context['top_buyers'] = []
+        context['top_buyers'] = list(sales_qs.filter(client_mobile__in=crm_mobiles).values(
+            'client_name', 'client_mobile'
+        ).annotate(
+            total_spent=Sum('revenue'),
+            total_qty=Sum('quantity'),
+            order_count=Count('id')
+        ).order_by('-total_spent')[:20])
         
         # Lead source conversion
         lead_conversion = []
         lead_sources = list(crm_qs.exclude(lead_source='').values_list('lead_source', flat=True).distinct()[:10])
         for source in lead_sources:
             source_contacts = crm_qs.filter(lead_source=source)
-            source_mobiles = set(source_contacts.values_list('mobile', flat=True))
-            purchased = len(source_mobiles.intersection(sales_mobiles))
+            purchased = purchased_contacts.filter(lead_source=source).values('mobile').distinct().count()
             count = source_contacts.count()
             lead_conversion.append({
                 'source': source,
@@ -655,9 +1003,14 @@ class CombinedInsightsReport(LoginRequiredMixin, ReportAccessMixin, TemplateView
         return context
 
 
+# Exhibition sales: salesperson or location mentions an exhibition
+EXHIBITION_SALES = Q(sales_person__icontains='exhibition') | Q(region__icontains='exhibition')
+
+
 class ExhibitionReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
     """Exhibition Sales Report - Analysis of exhibition-specific sales"""
     template_name = 'analytics/reports/exhibition.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -666,14 +1019,11 @@ class ExhibitionReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
         context['filters'] = get_filter_options(company)
         context['current_filters'] = self.request.GET
         
-        # Get exhibition sales (salesperson contains 'EXHIBITION' or location contains exhibition-like terms)
+        # Get exhibition sales
         sales_qs = SalesRecord.objects.filter(company=company, transaction_type='sale') if company else SalesRecord.objects.none()
         sales_qs = apply_filters(sales_qs, self.request)
         
-        exhibition_qs = sales_qs.filter(
-            Q(sales_person__icontains='exhibition') | 
-            Q(region__icontains='exhibition')
-        )
+        exhibition_qs = sales_qs.filter(EXHIBITION_SALES)
         
         context['exhibition_revenue'] = exhibition_qs.aggregate(total=Sum('revenue'))['total'] or 0
         context['exhibition_transactions'] = exhibition_qs.count()
@@ -681,10 +1031,7 @@ class ExhibitionReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
         context['exhibition_items'] = exhibition_qs.aggregate(total=Sum('quantity'))['total'] or 0
         
         # Regular sales for comparison
-        regular_qs = sales_qs.exclude(
-            Q(sales_person__icontains='exhibition') | 
-            Q(region__icontains='exhibition')
-        )
+        regular_qs = sales_qs.exclude(EXHIBITION_SALES)
         context['regular_revenue'] = regular_qs.aggregate(total=Sum('revenue'))['total'] or 0
         context['regular_transactions'] = regular_qs.count()
         
@@ -700,19 +1047,15 @@ class ExhibitionReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
             items=Sum('quantity')
         ).order_by('-revenue')[:10])
         
-        # Exhibition daily trend
-        daily = exhibition_qs.values('transaction_date').annotate(total=Sum('revenue')).order_by('transaction_date')
-        daily_dict = {d['transaction_date']: float(d['total'] or 0) for d in daily if d['transaction_date']}
-        sorted_days = sorted(daily_dict.keys())[-30:]
-        context['trend_labels'] = json.dumps([d.strftime('%d %b') for d in sorted_days])
-        context['trend_values'] = json.dumps([daily_dict[d] for d in sorted_days])
+        # Exhibition daily trend is fetched from apps.analytics.charts (exhibition-trend) after render
         
         return context
 
 
 class SalespersonScorecardReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
-    """Salesperson Scorecard - Individual performance metrics"""
+    """Salesperson Scorecard - ranks, percentiles and month-over-month change from DailySalesRollup"""
     template_name = 'analytics/reports/salesperson_scorecard.html'
+    store_scoped = True
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -722,49 +1065,17 @@ class SalespersonScorecardReport(LoginRequiredMixin, ReportAccessMixin, Template
             context['filters'] = get_filter_options(company)
             context['current_filters'] = self.request.GET
             
-            sales_qs = SalesRecord.objects.filter(company=company, transaction_type='sale') if company else SalesRecord.objects.none()
-            sales_qs = apply_filters(sales_qs, self.request)
-            
-            # All salespersons ranked
-            salesperson_stats = list(sales_qs.exclude(sales_person='').values('sales_person').annotate(
-                revenue=Sum('revenue'),
-                transactions=Count('id'),
-                items=Sum('quantity'),
-                margin=Sum('gross_margin'),
-                avg_discount=Avg('discount_percentage')
-            ).order_by('-revenue'))
-            
-            # Calculate ranks and contribution % with safe handling
-            total_revenue = sum(safe_float(s.get('revenue'), 0) for s in salesperson_stats)
-            for i, s in enumerate(salesperson_stats):
-                s['rank'] = i + 1
-                # Safe contribution calculation
-                revenue = safe_float(s.get('revenue'), 0)
-                transactions = s.get('transactions') or 0
-                s['contribution'] = round(revenue / max(total_revenue, 1) * 100, 1)
-                s['avg_value'] = revenue / max(transactions, 1) if transactions > 0 else 0
-                # Ensure all values are not None
-                s['revenue'] = revenue
-                s['margin'] = safe_float(s.get('margin'), 0)
-                s['items'] = s.get('items') or 0
-                s['avg_discount'] = safe_float(s.get('avg_discount'), 0)
+            rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), self.request)
+            salesperson_stats = salesperson_scorecard(rollup)
             
             context['salesperson_stats'] = salesperson_stats
             context['total_salespersons'] = len(salesperson_stats)
-            context['total_revenue'] = total_revenue
-            
-            # Top performer details
-            if salesperson_stats:
-                top = salesperson_stats[0]['sales_person']
-                top_qs = sales_qs.filter(sales_person=top)
-                context['top_performer'] = {
-                    'name': top,
-                    'revenue': salesperson_stats[0]['revenue'],
-                    'top_categories': list(top_qs.values('product_category').annotate(rev=Sum('revenue')).order_by('-rev')[:5]),
-                    'top_products': list(top_qs.values('style_code').annotate(rev=Sum('revenue')).order_by('-rev')[:5])
-                }
-            else:
-                context['top_performer'] = None
+            context['total_revenue'] = sum(s['revenue'] for s in salesperson_stats)
+            context['top_performer'] = salesperson_stats[0] if salesperson_stats else None
+            
+            query = self.request.GET.copy()
+            query.pop('name', None)
+            context['querystring'] = query.urlencode()
                 
         except Exception as e:
             logger.exception("SalespersonScorecardReport failed")
@@ -777,3 +1088,285 @@ class SalespersonScorecardReport(LoginRequiredMixin, ReportAccessMixin, Template
             context['error'] = str(e)
         
         return context
+
+
+class SalespersonDetailReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Salesperson drill-down - monthly trend, category mix and locations from DailySalesRollup"""
+    template_name = 'analytics/reports/salesperson_detail.html'
+    store_scoped = True
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        company = get_company(self.request.user)
+        name = self.request.GET.get('name', '')
+        
+        rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), self.request)
+        context.update(salesperson_detail(rollup, name))
+        context['name'] = name
+        
+        query = self.request.GET.copy()
+        query.pop('name', None)
+        context['querystring'] = query.urlencode()
+        return context
+
+
+def period_comparison(request, company, by, compare, limit=None):
+    """(window, comparison window, rows, totals) for the report filters; (None, None, [], None) without sales"""
+    rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), request, with_dates=False)
+    window = current_window(rollup, request.GET.get('date_from'), request.GET.get('date_to'))
+    if not window:
+        return None, None, [], None
+    previous = comparison_window(window, compare)
+    if by == 'style':
+        queryset = apply_filters(
+            SalesRecord.objects.filter(company=company, transaction_type='sale'), request, with_dates=False
+        )
+    else:
+        queryset = rollup
+    rows, totals = compare_periods(queryset, window, previous, by=by, limit=limit)
+    return window, previous, rows, totals
+
+
+class PeriodComparisonReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Period Comparison - current vs previous period, last month or last year for one breakdown, from DailySalesRollup"""
+    template_name = 'analytics/reports/period_comparison.html'
+    store_scoped = True
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        company = get_company(self.request.user)
+        by = self.request.GET.get('by') if self.request.GET.get('by') in BREAKDOWNS else 'location'
+        compare = self.request.GET.get('compare') if self.request.GET.get('compare') in COMPARISONS else 'previous'
+        
+        context['filters'] = get_filter_options(company)
+        context['current_filters'] = self.request.GET
+        context['by'] = by
+        context['by_label'] = BREAKDOWNS[by][0]
+        context['compare'] = compare
+        context['compare_label'] = COMPARISONS[compare]
+        context['breakdowns'] = {key: label for key, (label, _) in BREAKDOWNS.items()}
+        context['comparisons'] = COMPARISONS
+        
+        window, previous, context['rows'], context['totals'] = period_comparison(
+            self.request, company, by, compare, limit=100
+        )
+        if window:
+            context['window'] = window
+            context['comparison_window'] = previous
+        
+        query = self.request.GET.copy()
+        query.pop('by', None)
+        query.pop('compare', None)
+        context['querystring'] = query.urlencode()
+        return context
+
+
+class PivotReport(LoginRequiredMixin, ReportAccessMixin, TemplateView):
+    """Pivot Explorer - interactive pivot table over PivotAPIView"""
+    template_name = 'analytics/reports/pivot.html'
+    store_scoped = True
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filters'] = get_filter_options(get_company(self.request.user))
+        context['current_filters'] = self.request.GET
+        context['pivot_sources'] = json.dumps({
+            source: {'dimensions': list(spec['dimensions']), 'measures': list(spec['measures'])}
+            for source, spec in PIVOT_SOURCES.items()
+        })
+        return context
+
+
+class PivotAPIView(LoginRequiredMixin, ReportAccessMixin, View):
+    """
+    Ad-hoc pivot queries: ?source=sales|stock&dimensions=month,region&measures=revenue,margin
+    plus the report filter parameters. Answered from the rollups (apps.analytics.pivot).
+    """
+    
+    store_scoped = True
+    
+    def get(self, request):
+        try:
+            return JsonResponse(cached_pivot(get_company(request.user), request.GET))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+
+# Report exports: each builder takes (request, company) and returns (header, rows) for the
+# report's filters, rows being an iterable that fetches EXPORT_CHUNK records at a time.
+
+def _export_sales(request, company):
+    qs = apply_filters(SalesRecord.objects.filter(company=company, transaction_type='sale'), request)
+    grouped = qs.values('transaction_date', 'region', 'sales_person').annotate(
+        revenue=Sum('revenue'), transactions=Count('id'), items=Sum('quantity'), margin=Sum('gross_margin')
+    ).order_by('transaction_date', 'region', 'sales_person')
+    header = ['Date', 'Location', 'Salesperson', 'Revenue', 'Transactions', 'Items', 'Margin']
+    return header, queryset_rows(grouped, ['transaction_date', 'region', 'sales_person', 'revenue', 'transactions', 'items', 'margin'])
+
+
+def _export_products(request, company):
+    qs = apply_filters(SalesRecord.objects.filter(company=company, transaction_type='sale'), request)
+    grouped = qs.values('style_code', 'product_category', 'collection').annotate(
+        revenue=Sum('revenue'), qty=Sum('quantity'), margin=Sum('gross_margin'), avg_discount=Avg('discount_percentage')
+    ).order_by('-revenue', 'style_code')
+    header = ['Style Code', 'Category', 'Collection', 'Revenue', 'Qty', 'Margin', 'Avg Discount %']
+    return header, queryset_rows(grouped, ['style_code', 'product_category', 'collection', 'revenue', 'qty', 'margin', 'avg_discount'])
+
+
+def _export_sellthrough(request, company):
+    stock = {
+        s['style_code']: s for s in sellthrough_stock(company, request).values('style_code').annotate(
+            stock_qty=Sum('quantity'), stock_value=Sum(F('quantity') * F('sale_price'))
+        ).order_by()
+    }
+    sales = apply_filters(SalesRecord.objects.filter(company=company, transaction_type='sale'), request)
+    style_sales = sales.values('style_code').annotate(sold_qty=Sum('quantity'), sold_value=Sum('revenue')).order_by('style_code')
+
+    def rows():
+        for s in style_sales.iterator(chunk_size=EXPORT_CHUNK):
+            info = stock.get(s['style_code'], {})
+            sold_qty = safe_float(s['sold_qty'], 0)
+            stock_qty = safe_float(info.get('stock_qty'), 0)
+            total_qty = sold_qty + stock_qty
+            yield (
+                s['style_code'], sold_qty, safe_float(s['sold_value'], 0), stock_qty,
+                safe_float(info.get('stock_value'), 0), round(sold_qty / total_qty * 100, 1) if total_qty > 0 else 0,
+            )
+
+    return ['Style Code', 'Sold Qty', 'Sold Value', 'Stock Qty', 'Stock Value', 'Sell-Through %'], rows()
+
+
+def _export_customers(request, company):
+    fields = ['mobile', 'name', 'first_purchase', 'last_purchase', 'visit_count', 'items_bought',
+              'lifetime_spend', 'return_amount', 'favourite_category', 'lead_status', 'loyalty_points']
+    return fields, queryset_rows(CustomerProfile.objects.filter(company=company).order_by('-lifetime_spend', 'id'), fields)
+
+
+def _export_cohorts(request, company):
+    matrix = cohort_matrix(company)
+    header = ['Cohort', 'Customers', 'Repeat %', 'Revenue'] + [f'Month {p}' for p in matrix['periods']]
+    rows = (
+        [r['cohort_month'], r['size'], r['repeat_rate'], r['revenue']] + [cell['count'] for cell in r['cells']]
+        for r in matrix['rows']
+    )
+    return header, rows
+
+
+def _export_stock(request, company):
+    qs = StockSnapshot.objects.filter(company=company)
+    latest_date = qs.aggregate(Max('snapshot_date'))['snapshot_date__max']
+    qs = apply_filters(qs.filter(snapshot_date=latest_date), request, is_stock=True)
+    fields = ['snapshot_date', 'jewel_code', 'style_code', 'location', 'category', 'sub_category',
+              'base_metal', 'quantity', 'gross_weight', 'net_weight', 'sale_price']
+    return fields, queryset_rows(qs.order_by('location', 'style_code', 'id'), fields)
+
+
+def _export_stock_ageing(request, company):
+    index = StockAgeIndex.objects.filter(company=company)
+    as_of = index.aggregate(latest=Max('last_seen'))['latest']
+    current = index.filter(last_seen=as_of, quantity__gt=0)
+    locations = [l for l in request.GET.getlist('location') if l]
+    if locations:
+        current = current.filter(location__in=locations)
+    categories = [c for c in request.GET.getlist('category') if c]
+    if categories:
+        current = current.filter(category__in=categories)
+    fields = ['jewel_code', 'style_code', 'location', 'category', 'first_seen', 'quantity', 'sale_price']
+    rows = (
+        row + ((as_of - row[4]).days,)
+        for row in queryset_rows(current.order_by('first_seen', 'id'), fields)
+    )
+    return fields + ['age_days'], rows
+
+
+def _export_replenishment(request, company):
+    level, sort, qs = replenishment_queryset(request)
+    fields = ['location', 'key', 'category', 'sold_qty', 'daily_velocity', 'on_hand', 'days_of_cover', 'suggested_qty']
+    return fields, queryset_rows(qs, fields)
+
+
+def _export_store(request, company):
+    store = report_store(request, company)
+    qs = DailySalesRollup.objects.filter(company=company, store=store) if store else DailySalesRollup.objects.none()
+    qs = apply_rollup_filters(qs, request)
+    grouped = qs.values('date', 'category').annotate(
+        revenue=Sum('revenue'), transactions=Sum('sale_count'), items=Sum('quantity'),
+        margin=Sum('gross_margin'), returns=Sum('return_amount'),
+    ).order_by('date', 'category')
+    header = ['Date', 'Category', 'Revenue', 'Transactions', 'Items', 'Margin', 'Returns']
+    return header, queryset_rows(grouped, ['date', 'category', 'revenue', 'transactions', 'items', 'margin', 'returns'])
+
+
+def _export_combined(request, company):
+    fields = ['full_name', 'mobile', 'email', 'store_name', 'lead_source', 'lead_status',
+              'dob', 'anniversary', 'loyalty_points', 'loyalty_redeemed']
+    return fields, queryset_rows(CRMContact.objects.filter(company=company).order_by('id'), fields)
+
+
+def _export_exhibition(request, company):
+    qs = apply_filters(SalesRecord.objects.filter(company=company, transaction_type='sale'), request).filter(EXHIBITION_SALES)
+    fields = ['transaction_date', 'transaction_no', 'region', 'sales_person', 'style_code',
+              'product_category', 'quantity', 'revenue', 'gross_margin']
+    return fields, queryset_rows(qs.order_by('transaction_date', 'id'), fields)
+
+
+def _export_salesperson(request, company):
+    rollup = apply_rollup_filters(DailySalesRollup.objects.filter(company=company), request)
+    fields = ['rank', 'sales_person', 'revenue', 'transactions', 'items', 'margin', 'avg_value',
+              'avg_discount', 'contribution', 'month_revenue', 'previous_month_revenue', 'mom_change']
+    return fields, ([s[f] for f in fields] for s in salesperson_scorecard(rollup))
+
+
+def _export_compare(request, company):
+    by = request.GET.get('by') if request.GET.get('by') in BREAKDOWNS else 'location'
+    compare = request.GET.get('compare') if request.GET.get('compare') in COMPARISONS else 'previous'
+    window, previous, comparison, totals = period_comparison(request, company, by, compare)
+    header = [BREAKDOWNS[by][0]]
+    for metric in ('revenue', 'transactions', 'quantity', 'margin'):
+        header += [metric.title(), f'{metric.title()} (comparison)', f'{metric.title()} growth %']
+    rows = (
+        [r['key']] + [v for m in ('revenue', 'transactions', 'quantity', 'margin')
+                      for v in (r['current'][m], r['previous'][m], r['growth'][m])]
+        for r in comparison
+    )
+    return header, rows
+
+
+REPORT_EXPORTS = {
+    'sales': ('Sales Performance', _export_sales),
+    'products': ('Product Analysis', _export_products),
+    'sellthrough': ('Sell-Through', _export_sellthrough),
+    'customers': ('Customer Profiles', _export_customers),
+    'cohorts': ('Cohort Retention', _export_cohorts),
+    'stock': ('Stock Summary', _export_stock),
+    'stock_ageing': ('Stock Ageing', _export_stock_ageing),
+    'replenishment': ('Replenishment', _export_replenishment),
+    'store': ('Store Report', _export_store),
+    'combined': ('CRM Contacts', _export_combined),
+    'exhibition': ('Exhibition Sales', _export_exhibition),
+    'salesperson': ('Salesperson Scorecard', _export_salesperson),
+    'compare': ('Period Comparison', _export_compare),
+}
+
+# Exports whose builders honour ?store=, open to store-scoped users
+STORE_SCOPED_EXPORTS = {'sales', 'products', 'sellthrough', 'stock', 'store', 'exhibition', 'salesperson', 'compare'}
+
+
+class ReportExportView(LoginRequiredMixin, ReportAccessMixin, View):
+    """
+    Streaming CSV / XLSX download of a report for its current filters:
+    reports/export/<report>/?<report filters>&format=csv|xlsx
+    """
+    
+    def allows_store_scope(self, report=None, **kwargs):
+        return report in STORE_SCOPED_EXPORTS
+    
+    def store_scope_denied(self):
+        raise PermissionDenied("This export covers the whole company")
+    
+    def get(self, request, report):
+        if report not in REPORT_EXPORTS:
+            raise Http404(f"No export for report '{report}'")
+        title, builder = REPORT_EXPORTS[report]
+        header, rows = builder(request, get_company(request.user))
+        return export_response(request, f'{report}_{timezone.localdate():%Y%m%d}', header, rows, title)
@@ -0,0 +1,119 @@
+"""
+Daily sales rollups for Darpan analytics.
+Keeps DailySalesRollup in step with SalesRecord, one day at a time, so reports can
+aggregate a few thousand rollup rows instead of the full sales history. Each row also
+carries HyperLogLog sketches of its customers and styles for distinct counts.
+"""
+
+import logging
+from django.db import transaction
+from django.db.models import Sum, Count
+
+from .models import SalesRecord, DailySalesRollup
+from .sketches import build_sketch, MERGE_CHUNK
+
+logger = logging.getLogger(__name__)
+
+# DailySalesRollup field -> SalesRecord field
+DIMENSIONS = {
+    'date': 'transaction_date',
+    'store_id': 'store_id',
+    'region': 'region',
+    'category': 'product_category',
+    'collection': 'collection',
+    'base_metal': 'base_metal',
+    'sales_person': 'sales_person',
+}
+
+TEXT_DIMENSIONS = ['region', 'category', 'collection', 'base_metal', 'sales_person']
+
+# Days refreshed per grouped query
+DATE_CHUNK = 200
+
+
+def _rollup_rows(company, dates):
+    """Aggregate SalesRecord for the given days into unsaved DailySalesRollup rows."""
+    grouped = SalesRecord.objects.filter(
+        company=company,
+        transaction_date__in=dates,
+        transaction_type__in=['sale', 'return'],
+    ).values(*DIMENSIONS.values(), 'transaction_type').annotate(
+        count=Count('id'),
+        qty=Sum('quantity'),
+        revenue=Sum('revenue'),
+        gross=Sum('gross_amount'),
+        discount=Sum('discount_amount'),
+        final=Sum('final_amount'),
+        margin=Sum('gross_margin'),
+    ).order_by()
+
+    rows = {}
+    customers, styles = {}, {}
+    for g in grouped:
+        key = tuple(g[source] for source in DIMENSIONS.values())
+        row = rows.get(key)
+        if row is None:
+            values = {field: g[source] for field, source in DIMENSIONS.items()}
+            for field in TEXT_DIMENSIONS:
+                values[field] = values[field] or ''
+            row = DailySalesRollup(company=company, **values)
+            rows[key] = row
+
+        if g['transaction_type'] == 'sale':
+            row.sale_count = g['count']
+            row.quantity = g['qty'] or 0
+            row.revenue = g['revenue'] or 0
+            row.gross_amount = g['gross'] or 0
+            row.discount_amount = g['discount'] or 0
+            row.final_amount = g['final'] or 0
+            row.gross_margin = g['margin'] or 0
+        else:
+            row.return_count = g['count']
+            row.return_quantity = g['qty'] or 0
+            row.return_amount = g['final'] or 0
+
+    # Second pass over the sale lines for the distinct customers / styles of each row
+    lines = SalesRecord.objects.filter(
+        company=company, transaction_date__in=dates, transaction_type='sale'
+    ).values_list(*DIMENSIONS.values(), 'client_mobile', 'style_code')
+    for line in lines.iterator(chunk_size=MERGE_CHUNK):
+        key = line[:-2]
+        customers.setdefault(key, set()).add(line[-2])
+        styles.setdefault(key, set()).add(line[-1])
+
+    for key, row in rows.items():
+        row.customer_sketch = build_sketch(customers.get(key, ()))
+        row.style_sketch = build_sketch(styles.get(key, ()))
+
+    return list(rows.values())
+
+
+def refresh_sales_rollup(company, dates):
+    """
+    Recompute rollup rows for the given days of a company.
+
+    Returns:
+        Number of rollup rows written
+    """
+    dates = sorted(set(d for d in dates if d))
+    written = 0
+    for i in range(0, len(dates), DATE_CHUNK):
+        chunk = dates[i:i + DATE_CHUNK]
+        with transaction.atomic():
+            DailySalesRollup.objects.filter(company=company, date__in=chunk).delete()
+            rows = _rollup_rows(company, chunk)
+            DailySalesRollup.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+    return written
+
+
+def rebuild_sales_rollup(company):
+    """
+    Recompute every day of a company's sales history. Days are replaced chunk by chunk, so the
+    reports keep their rows while it runs; rollup days without sales any more are cleared too.
+    """
+    dates = set(SalesRecord.objects.filter(company=company).values_list('transaction_date', flat=True).distinct())
+    dates |= set(DailySalesRollup.objects.filter(company=company).values_list('date', flat=True).distinct())
+    written = refresh_sales_rollup(company, dates)
+    logger.info(f"Sales rollup rebuilt for company {company.id}: {written} rows")
+    return written
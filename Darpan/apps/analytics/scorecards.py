@@ -0,0 +1,151 @@
+"""
+Salesperson scorecards for Darpan analytics.
+Ranks every salesperson in one windowed query over DailySalesRollup (rank, percentile,
+this month vs last month) and builds per-person drill-downs from the same rollup rows.
+"""
+
+from datetime import date
+from django.db.models import Sum, Max, Q, Window, FloatField
+from django.db.models.functions import Rank, PercentRank, Cast, TruncMonth
+
+from apps.core.utils import safe_divide, safe_float
+
+# Categories listed per salesperson in the scorecard
+CATEGORY_MIX_SIZE = 3
+
+
+def _previous_month(month):
+    return date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _pct_change(current, previous):
+    return round((current - previous) / previous * 100, 1) if previous else None
+
+
+def reference_month(rollup):
+    """First day of the latest month with sales in the rollup rows, or None."""
+    latest = rollup.aggregate(latest=Max('date'))['latest']
+    return latest.replace(day=1) if latest else None
+
+
+def category_mix(rollup, limit=CATEGORY_MIX_SIZE):
+    """Salesperson -> top categories by revenue with their share of that person's revenue."""
+    rows = rollup.exclude(sales_person='').values('sales_person', 'category').annotate(
+        revenue=Sum('revenue')
+    ).order_by('sales_person', '-revenue')
+
+    mix, totals = {}, {}
+    for r in rows:
+        revenue = safe_float(r['revenue'], 0)
+        totals[r['sales_person']] = totals.get(r['sales_person'], 0) + revenue
+        mix.setdefault(r['sales_person'], []).append({'category': r['category'] or 'Unknown', 'revenue': revenue})
+
+    for person, categories in mix.items():
+        for c in categories:
+            c['share'] = round(safe_float(safe_divide(c['revenue'], totals[person]), 0) * 100, 1)
+        mix[person] = categories[:limit] if limit else categories
+    return mix
+
+
+def salesperson_scorecard(rollup, month=None, with_categories=True):
+    """
+    Rank all salespeople over a filtered DailySalesRollup queryset.
+
+    Args:
+        rollup: DailySalesRollup queryset (already filtered by company, dates, etc.)
+        month: First day of the month compared with the month before (defaults to reference_month)
+        with_categories: Attach each person's top categories (one extra grouped query)
+
+    Returns:
+        List of dicts ordered by rank, with revenue, transactions, items, margin, avg_value,
+        avg_discount, contribution, percentile, month_revenue, previous_month_revenue,
+        mom_change and categories
+    """
+    month = month or reference_month(rollup)
+    if month is None:
+        return []
+    previous = _previous_month(month)
+
+    # Order windows by a float - Django's SQLite backend wraps a Decimal ORDER BY in an invalid CAST
+    revenue_key = Cast(Sum('revenue'), FloatField())
+    rows = list(rollup.exclude(sales_person='').values('sales_person').annotate(
+        total_revenue=Sum('revenue'),
+        transactions=Sum('sale_count'),
+        items=Sum('quantity'),
+        margin=Sum('gross_margin'),
+        gross=Sum('gross_amount'),
+        discount=Sum('discount_amount'),
+        month_revenue=Sum('revenue', filter=Q(date__gte=month, date__lt=_next_month(month))),
+        previous_month_revenue=Sum('revenue', filter=Q(date__gte=previous, date__lt=month)),
+        rank=Window(Rank(), order_by=revenue_key.desc()),
+        percentile=Window(PercentRank(), order_by=revenue_key.asc()),
+    ).order_by('rank', 'sales_person'))
+
+    total_revenue = sum(safe_float(r['total_revenue'], 0) for r in rows)
+    mix = category_mix(rollup) if with_categories else {}
+
+    scorecard = []
+    for r in rows:
+        revenue = safe_float(r['total_revenue'], 0)
+        transactions = r['transactions'] or 0
+        month_revenue = safe_float(r['month_revenue'], 0)
+        previous_revenue = safe_float(r['previous_month_revenue'], 0)
+        scorecard.append({
+            'sales_person': r['sales_person'],
+            'rank': r['rank'],
+            'percentile': round((r['percentile'] or 0) * 100),
+            'revenue': revenue,
+            'transactions': transactions,
+            'items': r['items'] or 0,
+            'margin': safe_float(r['margin'], 0),
+            'avg_value': safe_float(safe_divide(revenue, transactions), 0),
+            'avg_discount': round(safe_float(safe_divide(r['discount'], r['gross']), 0) * 100, 1),
+            'contribution': round(revenue / max(total_revenue, 1) * 100, 1),
+            'month_revenue': month_revenue,
+            'previous_month_revenue': previous_revenue,
+            'mom_change': _pct_change(month_revenue, previous_revenue),
+            'categories': mix.get(r['sales_person'], []),
+        })
+    return scorecard
+
+
+def salesperson_detail(rollup, sales_person):
+    """
+    Drill-down for one salesperson, read from the rollup only.
+
+    Returns:
+        dict with the person's scorecard row (None if no sales), monthly trend,
+        full category mix and location breakdown
+    """
+    row = next((s for s in salesperson_scorecard(rollup, with_categories=False) if s['sales_person'] == sales_person), None)
+    own = rollup.filter(sales_person=sales_person)
+
+    monthly = own.annotate(month=TruncMonth('date')).values('month').annotate(
+        revenue=Sum('revenue'), transactions=Sum('sale_count'), margin=Sum('gross_margin')
+    ).order_by('month')
+    trend = []
+    for m in monthly:
+        revenue = safe_float(m['revenue'], 0)
+        trend.append({
+            'month': m['month'],
+            'revenue': revenue,
+            'transactions': m['transactions'] or 0,
+            'margin': safe_float(m['margin'], 0),
+            'change': _pct_change(revenue, trend[-1]['revenue']) if trend else None,
+        })
+
+    locations = [
+        {'location': r['region'] or 'Unknown', 'revenue': safe_float(r['revenue'], 0), 'transactions': r['transactions'] or 0}
+        for r in own.values('region').annotate(revenue=Sum('revenue'), transactions=Sum('sale_count')).order_by('-revenue')
+    ]
+
+    return {
+        'scorecard': row,
+        'trend': trend,
+        'categories': category_mix(own, limit=None).get(sales_person, []),
+        'locations': locations,
+    }
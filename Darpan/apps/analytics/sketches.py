@@ -0,0 +1,136 @@
+"""
+HyperLogLog distinct-count sketches for Darpan analytics.
+Each DailySalesRollup row carries sketches of the customers (client mobiles) and styles it
+covers, and each StockSketch row one of the styles on hand, built when the rows are refreshed
+after an import. Distinct counts for any date range and filter combination merge the matching
+sketches (register-wise max) instead of running COUNT(DISTINCT ...) over the raw rows.
+
+Error bound: with PRECISION = 12 (4096 registers) the standard error is 1.04 / sqrt(4096),
+about 1.6%; roughly 95% of estimates land within 3.3% of the exact count. Counts below about
+ten thousand use linear counting, which is tighter still for small sets. Pages offer ?exact=1
+to count on the raw rows instead.
+"""
+
+import hashlib
+import math
+import zlib
+from functools import lru_cache
+import numpy as np
+from django.db import transaction
+
+from .models import StockSnapshot, StockSketch
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+STANDARD_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_REST_BITS = 64 - PRECISION
+
+# Sketches decompressed per database round trip when merging
+MERGE_CHUNK = 2000
+
+
+@lru_cache(maxsize=1 << 16)
+def _position(value):
+    """(register, rank) of a value: the first PRECISION bits of a 64-bit hash pick the register,
+    the rank is the position of the first 1 bit in the rest."""
+    h = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+    rest = h & ((1 << _REST_BITS) - 1)
+    return h >> _REST_BITS, _REST_BITS - rest.bit_length() + 1
+
+
+def build_sketch(values):
+    """Packed sketch of the distinct non-blank values (an all-zero sketch when there are none)."""
+    registers = np.zeros(REGISTERS, dtype=np.uint8)
+    positions = [_position(v) for v in set(values) if v]
+    if positions:
+        index, rank = np.array(positions, dtype=np.int64).T
+        np.maximum.at(registers, index, rank.astype(np.uint8))
+    return zlib.compress(registers.tobytes())
+
+
+def _unpack(blob):
+    return np.frombuffer(zlib.decompress(bytes(blob)), dtype=np.uint8)
+
+
+def merge(blobs):
+    """Register-wise max of packed sketches."""
+    registers = np.zeros(REGISTERS, dtype=np.uint8)
+    for blob in blobs:
+        np.maximum(registers, _unpack(blob), out=registers)
+    return registers
+
+
+def estimate(registers):
+    """Distinct count estimated from merged registers."""
+    zeros = int(np.count_nonzero(registers == 0))
+    if zeros == REGISTERS:
+        return 0
+    raw = _ALPHA * REGISTERS * REGISTERS / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+    if raw <= 2.5 * REGISTERS and zeros:
+        return round(REGISTERS * math.log(REGISTERS / zeros))
+    return round(raw)
+
+
+def estimate_distinct(queryset, field):
+    """
+    Estimated distinct count over the sketches in field of the queryset's rows.
+
+    Returns:
+        int, or None when some rows have no sketch yet (written before sketches existed),
+        in which case the caller should count exactly
+    """
+    if queryset.filter(**{f'{field}__isnull': True}).exists():
+        return None
+    return estimate(merge(queryset.values_list(field, flat=True).iterator(chunk_size=MERGE_CHUNK)))
+
+
+def wants_exact(request):
+    """?exact=1 asks for exact distinct counts instead of sketch estimates"""
+    return request.GET.get('exact') == '1'
+
+
+def stock_styles(company, snapshot_date, locations=None, categories=None):
+    """
+    Estimated distinct styles on hand at a snapshot, optionally for some locations / categories.
+
+    Returns:
+        int, or None when the snapshot has no sketches yet (imported before them)
+    """
+    sketches = StockSketch.objects.filter(company=company, snapshot_date=snapshot_date)
+    if not sketches.exists():
+        return None
+    if locations:
+        sketches = sketches.filter(location__in=locations)
+    if categories:
+        sketches = sketches.filter(category__in=categories)
+    return estimate(merge(sketches.values_list('style_sketch', flat=True).iterator(chunk_size=MERGE_CHUNK)))
+
+
+def refresh_stock_sketches(company, dates):
+    """
+    Rebuild the StockSketch rows (styles per location and category) of the given snapshot dates.
+
+    Returns:
+        Number of sketch rows written
+    """
+    written = 0
+    for snapshot_date in sorted(set(d for d in dates if d)):
+        styles = {}
+        lines = StockSnapshot.objects.filter(company=company, snapshot_date=snapshot_date).values_list(
+            'location', 'category', 'style_code'
+        )
+        for location, category, style_code in lines.iterator(chunk_size=MERGE_CHUNK):
+            styles.setdefault((location or '', category or ''), set()).add(style_code)
+
+        rows = [
+            StockSketch(company=company, snapshot_date=snapshot_date, location=location, category=category,
+                        style_sketch=build_sketch(codes))
+            for (location, category), codes in styles.items()
+        ]
+        with transaction.atomic():
+            StockSketch.objects.filter(company=company, snapshot_date=snapshot_date).delete()
+            StockSketch.objects.bulk_create(rows, batch_size=500)
+        written += len(rows)
+    return written
@@ -0,0 +1,257 @@
+"""
+Stock ageing for Darpan analytics.
+Maintains StockAgeIndex (first/last seen date per piece and location) from stock imports
+and builds the ageing report from that index alone.
+"""
+
+import logging
+import pandas as pd
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Case, When, Value, CharField, Sum, Min, Max, F, Q
+
+from .models import StockSnapshot, StockAgeIndex
+
+logger = logging.getLogger(__name__)
+
+# (label, lower bound in days) - a piece falls in the last bucket whose bound it reaches
+AGE_BUCKETS = [
+    ('0-30', 0),
+    ('31-90', 31),
+    ('91-180', 91),
+    ('180+', 181),
+]
+
+# Jewel codes per IN list (Oracle allows at most 1000)
+CODE_CHUNK = 1000
+
+
+def _recompute_snapshot_dates(company, dates, imported):
+    """
+    Recompute index rows first or last seen on one of the given snapshot dates where the
+    imported rows no longer hold the piece on that date. A re-import replacing a snapshot can
+    drop pieces; folding alone would leave them last seen on that date, i.e. still in stock.
+    Pieces still in the file need no recompute, the fold sets them right.
+
+    Args:
+        dates: Snapshot dates being imported
+        imported: Set of (jewel_code, location, date) in the imported rows
+
+    Returns:
+        (updated, deleted) row counts
+    """
+    stale = {
+        (row.jewel_code, row.location): row
+        for row in StockAgeIndex.objects.filter(company=company).filter(Q(first_seen__in=dates) | Q(last_seen__in=dates))
+        if any(day in dates and (row.jewel_code, row.location, day) not in imported for day in (row.first_seen, row.last_seen))
+    }
+    if not stale:
+        return 0, 0
+
+    # First and last snapshot date of each dropped piece, aggregated in the database
+    codes = sorted({code for code, _ in stale})
+    spans = {}
+    for i in range(0, len(codes), CODE_CHUNK):
+        for span in StockSnapshot.objects.filter(company=company, jewel_code__in=codes[i:i + CODE_CHUNK]).values(
+            'jewel_code', 'location'
+        ).annotate(first=Min('snapshot_date'), last=Max('snapshot_date')).order_by():
+            key = (span['jewel_code'], span['location'])
+            if key in stale:
+                spans[key] = (span['first'], span['last'])
+
+    # Attributes are read from the new last date only, for rows whose last date moved
+    moved = {key: last for key, (_, last) in spans.items() if last != stale[key].last_seen}
+    attributes = {}
+    moved_codes = sorted({code for code, _ in moved})
+    for i in range(0, len(moved_codes), CODE_CHUNK):
+        for code, location, style_code, category, quantity, sale_price, day in StockSnapshot.objects.filter(
+            company=company, jewel_code__in=moved_codes[i:i + CODE_CHUNK], snapshot_date__in=set(moved.values())
+        ).values_list('jewel_code', 'location', 'style_code', 'category', 'quantity', 'sale_price', 'snapshot_date'):
+            if moved.get((code, location)) == day:
+                attributes[code, location] = (style_code, category, quantity, sale_price)
+
+    to_update, to_delete = [], []
+    for key, row in stale.items():
+        if key not in spans:
+            to_delete.append(row.pk)
+            continue
+        row.first_seen, row.last_seen = spans[key]
+        if key in attributes:
+            row.style_code, row.category, row.quantity, row.sale_price = attributes[key]
+        to_update.append(row)
+
+    for i in range(0, len(to_delete), CODE_CHUNK):
+        StockAgeIndex.objects.filter(pk__in=to_delete[i:i + CODE_CHUNK]).delete()
+    StockAgeIndex.objects.bulk_update(
+        to_update,
+        ['first_seen', 'last_seen', 'style_code', 'category', 'quantity', 'sale_price'],
+        batch_size=500,
+    )
+    return len(to_update), len(to_delete)
+
+
+def update_stock_age_index(company, records):
+    """
+    Fold imported stock rows into the age index. Index rows first or last seen on the imported
+    snapshot dates are recomputed first, so a re-import replacing a snapshot drops the pieces
+    missing from the corrected file.
+
+    Args:
+        company: Company object
+        records: Iterable of StockSnapshot objects (saved or just bulk-created)
+
+    Returns:
+        Number of index rows created or updated
+    """
+    df = pd.DataFrame.from_records(
+        [(r.jewel_code, r.location, r.style_code, r.category, r.quantity, r.sale_price, r.snapshot_date)
+         for r in records],
+        columns=['jewel_code', 'location', 'style_code', 'category', 'quantity', 'sale_price', 'date'],
+    )
+    df = df[~df['jewel_code'].isin(['', 'nan'])]
+    if df.empty:
+        return 0
+
+    # One row per piece and location: earliest date plus attributes as of the latest date
+    df = df.sort_values('date')
+    keyed = df.groupby(['jewel_code', 'location'])
+    latest = keyed.last()
+    latest['first_seen'] = keyed['date'].min()
+
+    with transaction.atomic():
+        _recompute_snapshot_dates(
+            company, set(df['date']), set(df[['jewel_code', 'location', 'date']].itertuples(index=False, name=None))
+        )
+
+        codes = sorted(latest.index.get_level_values(0).unique())
+        existing = {}
+        for i in range(0, len(codes), CODE_CHUNK):
+            for row in StockAgeIndex.objects.filter(company=company, jewel_code__in=codes[i:i + CODE_CHUNK]):
+                existing[row.jewel_code, row.location] = row
+
+        to_create, to_update = [], []
+        for (jewel_code, location), item in latest.iterrows():
+            row = existing.get((jewel_code, location))
+            if row is None:
+                to_create.append(StockAgeIndex(
+                    company=company,
+                    jewel_code=jewel_code,
+                    location=location,
+                    style_code=item['style_code'],
+                    category=item['category'],
+                    first_seen=item['first_seen'],
+                    last_seen=item['date'],
+                    quantity=item['quantity'],
+                    sale_price=item['sale_price'],
+                ))
+                continue
+
+            row.first_seen = min(row.first_seen, item['first_seen'])
+            if item['date'] >= row.last_seen:
+                row.last_seen = item['date']
+                row.style_code = item['style_code']
+                row.category = item['category']
+                row.quantity = item['quantity']
+                row.sale_price = item['sale_price']
+            to_update.append(row)
+
+        StockAgeIndex.objects.bulk_create(to_create, batch_size=500)
+        StockAgeIndex.objects.bulk_update(
+            to_update,
+            ['first_seen', 'last_seen', 'style_code', 'category', 'quantity', 'sale_price'],
+            batch_size=500,
+        )
+
+    return len(to_create) + len(to_update)
+
+
+def rebuild_stock_age_index(company):
+    """
+    Rebuild the age index from all historical snapshots, one snapshot date at a time.
+    Only needed once for data imported before the index existed.
+    """
+    StockAgeIndex.objects.filter(company=company).delete()
+
+    snapshots = StockSnapshot.objects.filter(company=company)
+    dates = snapshots.values_list('snapshot_date', flat=True).distinct().order_by('snapshot_date')
+    total = 0
+    for snapshot_date in dates:
+        rows = snapshots.filter(snapshot_date=snapshot_date).only(
+            'jewel_code', 'location', 'style_code', 'category', 'quantity', 'sale_price', 'snapshot_date'
+        )
+        total += update_stock_age_index(company, rows.iterator(chunk_size=2000))
+    return total
+
+
+def ageing_report(company, locations=None, categories=None):
+    """
+    Age buckets of pieces currently in stock, by location and category.
+
+    Age is measured from first_seen to the latest snapshot date in the index.
+
+    Returns:
+        dict with as_of, buckets, by_location, by_category, totals and oldest_items
+    """
+    index = StockAgeIndex.objects.filter(company=company)
+    as_of = index.aggregate(latest=Max('last_seen'))['latest']
+    buckets = [label for label, _ in AGE_BUCKETS]
+    if not as_of:
+        return {'as_of': None, 'buckets': buckets, 'by_location': [], 'by_category': [], 'totals': [], 'oldest_items': []}
+
+    current = index.filter(last_seen=as_of, quantity__gt=0)
+    if locations:
+        current = current.filter(location__in=locations)
+    if categories:
+        current = current.filter(category__in=categories)
+
+    # Newest bucket first so each piece lands in the youngest bucket it qualifies for
+    bucket = Case(
+        *[When(first_seen__gt=as_of - timedelta(days=lower), then=Value(prev_label))
+          for (prev_label, _), (_, lower) in zip(AGE_BUCKETS, AGE_BUCKETS[1:])],
+        default=Value(AGE_BUCKETS[-1][0]),
+        output_field=CharField(),
+    )
+    rows = current.annotate(bucket=bucket).values('location', 'category', 'bucket').annotate(
+        qty=Sum('quantity'),
+        value=Sum(F('quantity') * F('sale_price')),
+    ).order_by()
+
+    def empty():
+        return {label: {'qty': 0, 'value': 0.0} for label in buckets}
+
+    by_location, by_category, totals = {}, {}, empty()
+    for row in rows:
+        qty = row['qty'] or 0
+        value = float(row['value'] or 0)
+        for target in (
+            by_location.setdefault(row['location'] or 'Unknown', empty()),
+            by_category.setdefault(row['category'] or 'Unknown', empty()),
+            totals,
+        ):
+            target[row['bucket']]['qty'] += qty
+            target[row['bucket']]['value'] += value
+
+    def as_rows(grouped, key):
+        result = []
+        for name, cells in sorted(grouped.items()):
+            result.append({
+                key: name,
+                'cells': [cells[label] for label in buckets],
+                'total_qty': sum(c['qty'] for c in cells.values()),
+            })
+        return result
+
+    oldest_items = list(current.order_by('first_seen')[:20].values(
+        'jewel_code', 'style_code', 'location', 'category', 'first_seen', 'quantity', 'sale_price'
+    ))
+    for item in oldest_items:
+        item['age_days'] = (as_of - item['first_seen']).days
+
+    return {
+        'as_of': as_of,
+        'buckets': buckets,
+        'by_location': as_rows(by_location, 'location'),
+        'by_category': as_rows(by_category, 'category'),
+        'totals': [totals[label] for label in buckets],
+        'oldest_items': oldest_items,
+    }
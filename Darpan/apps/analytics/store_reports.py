@@ -0,0 +1,128 @@
+"""
+Store-scoped report data for store managers.
+Reads one store's slice of the rollup and summary tables (DailySalesRollup, latest
+StockSnapshot, StockAgeIndex, ReplenishmentSuggestion) and caches it per store.
+"""
+
+import logging
+from datetime import timedelta
+from django.core.cache import cache
+from django.db.models import Sum, Max, F
+from django.utils import timezone
+
+from apps.core.utils import safe_divide, safe_float
+from .models import (
+    ImportLog, DailySalesRollup, StockSnapshot, StockAgeIndex, ReplenishmentSuggestion, LocationAlias
+)
+from .stock_ageing import AGE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+# Data only changes on import, and the cache key carries the latest import id
+CACHE_TIMEOUT = 60 * 60
+
+DEFAULT_RANGE_DAYS = 90
+
+
+def data_version(company):
+    """Id of the latest import - changes whenever the underlying data does."""
+    return ImportLog.objects.filter(company=company).aggregate(latest=Max('id'))['latest'] or 0
+
+
+def store_report(store, date_from=None, date_to=None):
+    """
+    Cached report data for one store.
+
+    Args:
+        store: Store object
+        date_from, date_to: Sales date range (defaults to the last DEFAULT_RANGE_DAYS days)
+
+    Returns:
+        dict of report data, see build_store_report
+    """
+    date_to = date_to or timezone.localdate()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_RANGE_DAYS)
+    key = f"store_report_{store.id}_{data_version(store.company)}_{date_from}_{date_to}"
+
+    data = cache.get(key)
+    if data is None:
+        data = build_store_report(store, date_from, date_to)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def build_store_report(store, date_from, date_to):
+    """Uncached store report data."""
+    company = store.company
+    rollup = DailySalesRollup.objects.filter(company=company, store=store, date__gte=date_from, date__lte=date_to)
+
+    totals = rollup.aggregate(
+        revenue=Sum('revenue'),
+        transactions=Sum('sale_count'),
+        margin=Sum('gross_margin'),
+        discount=Sum('discount_amount'),
+        returns=Sum('return_amount'),
+    )
+    revenue = safe_float(totals['revenue'], 0)
+    transactions = totals['transactions'] or 0
+
+    def breakdown(field, limit=10):
+        rows = rollup.exclude(**{field: ''}).values(field).annotate(
+            revenue=Sum('revenue'), count=Sum('sale_count'), margin=Sum('gross_margin')
+        ).order_by('-revenue')[:limit]
+        return [
+            {'name': r[field], 'revenue': safe_float(r['revenue'], 0), 'count': r['count'] or 0,
+             'margin': safe_float(r['margin'], 0)}
+            for r in rows
+        ]
+
+    daily = rollup.values('date').annotate(total=Sum('revenue')).order_by('date')
+    trend = [(r['date'], safe_float(r['total'], 0)) for r in daily][-60:]
+
+    # Stock: latest snapshot rows stamped with this store
+    stock_qs = StockSnapshot.objects.filter(company=company, store=store)
+    snapshot_date = stock_qs.aggregate(latest=Max('snapshot_date'))['latest']
+    stock_qs = stock_qs.filter(snapshot_date=snapshot_date) if snapshot_date else stock_qs.none()
+    stock_by_category = [
+        {'name': r['category'] or 'Unknown', 'qty': r['qty'] or 0, 'value': safe_float(r['value'], 0)}
+        for r in stock_qs.values('category').annotate(
+            qty=Sum('quantity'), value=Sum(F('quantity') * F('sale_price'))
+        ).order_by('-value')[:10]
+    ]
+
+    # Ageing and replenishment tables are keyed by location string - use this store's aliases
+    aliases = list(LocationAlias.objects.filter(company=company, store=store).values_list('alias', flat=True))
+    ageing = [{'label': label, 'qty': 0} for label, _ in AGE_BUCKETS]
+    reorder = []
+    if aliases:
+        index = StockAgeIndex.objects.filter(company=company)
+        as_of = index.aggregate(latest=Max('last_seen'))['latest']
+        if as_of:
+            for row in index.filter(last_seen=as_of, location__in=aliases, quantity__gt=0).values_list('first_seen', 'quantity'):
+                age = (as_of - row[0]).days
+                bucket = max(i for i, (_, lower) in enumerate(AGE_BUCKETS) if age >= lower)
+                ageing[bucket]['qty'] += row[1]
+
+        reorder = list(ReplenishmentSuggestion.objects.filter(
+            company=company, level='style', location__in=aliases, suggested_qty__gt=0
+        ).order_by('-suggested_qty').values('key', 'category', 'on_hand', 'days_of_cover', 'suggested_qty')[:10])
+
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'total_revenue': revenue,
+        'total_transactions': transactions,
+        'avg_order_value': safe_float(safe_divide(revenue, transactions), 0),
+        'total_margin': safe_float(totals['margin'], 0),
+        'total_discount': safe_float(totals['discount'], 0),
+        'total_returns': safe_float(totals['returns'], 0),
+        'category_data': breakdown('category'),
+        'collection_data': breakdown('collection'),
+        'salesperson_data': breakdown('sales_person', limit=15),
+        'trend_labels': [d.strftime('%d %b') for d, _ in trend],
+        'trend_values': [v for _, v in trend],
+        'snapshot_date': snapshot_date,
+        'stock_by_category': stock_by_category,
+        'ageing': ageing,
+        'reorder': reorder,
+    }
@@ -10,10 +10,10 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def process_large_import(self, file_path, file_type, company_id, user_id):
+def process_large_import(self, file_path, file_type, company_id, user_id, force=False):
     """
     Process large CSV imports asynchronously.
-    For files > 10MB or > 50,000 rows.
+    For files > 10MB or > 50,000 rows. A file already imported is skipped unless force.
     """
     try:
         from apps.analytics.flexible_importer import FlexibleImporter
@@ -26,9 +26,9 @@ def process_large_import(self, file_path, file_type, company_id, user_id):
         
         with open(file_path, 'rb') as f:
             if file_type == 'sales':
-                result = importer.import_sales(f)
+                result = importer.import_sales(f, force=force)
             elif file_type == 'stock':
-                result = importer.import_stock(f)
+                result = importer.import_stock(f, force=force)
             else:
                 result = {'error': f'Unknown file type: {file_type}'}
         
@@ -54,6 +54,7 @@ def refresh_kpi_cache(company_id):
     try:
         from apps.core.models import Company
         from apps.analytics.models import SalesRecord, StockSnapshot
+        from apps.analytics.sketches import stock_styles
         from django.db.models import Sum, Count, Max, F
         
         company = Company.objects.get(id=company_id)
@@ -73,9 +74,10 @@ def refresh_kpi_cache(company_id):
         latest_date = stock_qs.aggregate(Max('snapshot_date'))['snapshot_date__max']
         if latest_date:
             stock_qs = stock_qs.filter(snapshot_date=latest_date)
+        total_skus = stock_styles(company, latest_date) if latest_date else None
         
         stock_kpis = {
-            'total_skus': stock_qs.values('style_code').distinct().count(),
+            'total_skus': total_skus if total_skus is not None else stock_qs.values('style_code').distinct().count(),
             'stock_qty': stock_qs.aggregate(t=Sum('quantity'))['t'] or 0,
             'stock_value': float(stock_qs.aggregate(t=Sum(F('quantity') * F('sale_price')))['t'] or 0),
         }
@@ -106,3 +108,218 @@ def cleanup_old_imports():
     
     logger.info(f"Cleaned up {deleted} old import logs")
     return {'deleted_logs': deleted}
+
+
+@shared_task
+def rebuild_recommendations(company_id=None):
+    """
+    Full rebuild of the co-purchase matrix.
+    Imports keep it current incrementally; run weekly via Celery Beat to repair drift
+    (e.g. after records are deleted).
+    """
+    from apps.core.models import Company
+    from apps.analytics.recommendations import rebuild_co_purchases
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    styles = {}
+    for company in companies:
+        try:
+            styles[company.id] = rebuild_co_purchases(company)
+        except Exception as e:
+            logger.error(f"Recommendation rebuild failed for company {company.id}: {e}")
+    
+    return {'styles': styles}
+
+
+@shared_task
+def rebuild_stock_age_index(company_id=None):
+    """
+    Rebuild the stock age index from snapshot history.
+    Imports keep it current incrementally; run once to backfill data imported earlier,
+    or after snapshots are deleted.
+    """
+    from apps.core.models import Company
+    from apps.analytics import stock_ageing
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    rows = {}
+    for company in companies:
+        try:
+            rows[company.id] = stock_ageing.rebuild_stock_age_index(company)
+        except Exception as e:
+            logger.error(f"Stock age index rebuild failed for company {company.id}: {e}")
+    
+    return {'rows': rows}
+
+
+@shared_task
+def refresh_replenishment(company_id=None):
+    """
+    Recompute replenishment suggestions from sales velocity and latest stock.
+    Run nightly via Celery Beat.
+    """
+    from apps.core.models import Company
+    from apps.analytics import replenishment
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    rows = {}
+    for company in companies:
+        try:
+            rows[company.id] = replenishment.refresh_replenishment(company)
+        except Exception as e:
+            logger.error(f"Replenishment refresh failed for company {company.id}: {e}")
+    
+    return {'rows': rows}
+
+
+@shared_task
+def backfill_location_aliases(company_id=None):
+    """
+    Register location strings imported before the alias table existed and
+    link their sales and stock rows to stores. Migration 0021 runs this on
+    deploy; the task is kept for re-running it by hand.
+    """
+    from apps.core.models import Company
+    from apps.analytics.locations import relink_locations
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    relinked = {}
+    for company in companies:
+        try:
+            relinked[company.id] = relink_locations(company, backfill=True)
+        except Exception as e:
+            logger.error(f"Location backfill failed for company {company.id}: {e}")
+    
+    return {'relinked': relinked}
+
+
+@shared_task
+def rebuild_sales_rollups(company_id=None):
+    """
+    Full rebuild of the daily sales rollup, then re-scores sales anomalies from it.
+    Imports refresh the days they touch; run weekly via Celery Beat to pick up
+    deleted or purged sales records.
+    """
+    from apps.core.models import Company
+    from apps.analytics.rollups import rebuild_sales_rollup
+    from apps.analytics.anomalies import detect_anomalies
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    rows = {}
+    for company in companies:
+        try:
+            rows[company.id] = rebuild_sales_rollup(company)
+            detect_anomalies(company)
+        except Exception as e:
+            logger.error(f"Sales rollup rebuild failed for company {company.id}: {e}")
+    
+    return {'rows': rows}
+
+
+@shared_task
+def rebuild_customer_profiles(company_id=None):
+    """
+    Full rebuild of customer profiles.
+    Imports refresh the customers they touch; run weekly via Celery Beat to pick up
+    referrals, old gold purchases and purged sales.
+    """
+    from apps.core.models import Company
+    from apps.analytics.customers import rebuild_customer_profiles as rebuild
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    profiles = {}
+    for company in companies:
+        try:
+            profiles[company.id] = rebuild(company)
+        except Exception as e:
+            logger.error(f"Customer profile rebuild failed for company {company.id}: {e}")
+    
+    return {'profiles': profiles}
+
+
+@shared_task
+def refresh_rfm_segments(company_id=None):
+    """
+    Nightly RFM scoring of every customer.
+    Run via Celery Beat; segment reports and exports read the stored scores.
+    """
+    from apps.core.models import Company
+    from apps.analytics.rfm import refresh_rfm
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    customers = {}
+    for company in companies:
+        try:
+            customers[company.id] = refresh_rfm(company)
+        except Exception as e:
+            logger.error(f"RFM refresh failed for company {company.id}: {e}")
+    
+    return {'customers': customers}
+
+
+@shared_task
+def rebuild_cohorts(company_id=None):
+    """
+    Full rebuild of the cohort retention matrix.
+    Imports recompute the cohorts they touch; run weekly via Celery Beat to pick up
+    purged sales records.
+    """
+    from apps.core.models import Company
+    from apps.analytics.cohorts import rebuild_cohorts as rebuild
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    cohorts = {}
+    for company in companies:
+        try:
+            cohorts[company.id] = rebuild(company)
+        except Exception as e:
+            logger.error(f"Cohort rebuild failed for company {company.id}: {e}")
+    
+    return {'cohorts': cohorts}
+
+
+@shared_task
+def refresh_sales_forecasts(company_id=None):
+    """
+    Nightly refit of the location x category sales forecasts.
+    Run via Celery Beat after the day's imports; the sales dashboard reads the stored rows.
+    """
+    from apps.core.models import Company
+    from apps.analytics.forecasting import refresh_forecasts
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    series = {}
+    for company in companies:
+        try:
+            series[company.id] = refresh_forecasts(company)
+        except Exception as e:
+            logger.error(f"Forecast refresh failed for company {company.id}: {e}")
+    
+    return {'series': series}
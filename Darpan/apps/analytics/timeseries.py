@@ -0,0 +1,93 @@
+"""
+Downsampled time series for Darpan trend charts.
+Picks the finest grain (day, week, month, quarter, year) whose bucket count over the requested
+range fits a point budget, then aggregates at that grain in the database - so a multi-year
+trend is a few dozen grouped rows rather than every day fetched and trimmed in Python.
+"""
+
+from django.db.models import Sum, Min, Max, F
+from django.db.models.functions import TruncWeek, TruncMonth, TruncQuarter, TruncYear
+
+# Points returned when the caller does not ask for a budget, and the most it may ask for
+DEFAULT_POINTS = 60
+MAX_POINTS = 366
+
+# Grains from finest to coarsest -> truncation (None groups by the date itself)
+GRAINS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+
+def bucket_count(start, end, grain):
+    """Buckets of the grain that the inclusive range start..end touches."""
+    if grain == 'day':
+        return (end - start).days + 1
+    if grain == 'week':
+        return ((end - start).days + start.weekday()) // 7 + 1
+    months = (end.year - start.year) * 12 + end.month - start.month
+    if grain == 'month':
+        return months + 1
+    if grain == 'quarter':
+        return (end.year - start.year) * 4 + (end.month - 1) // 3 - (start.month - 1) // 3 + 1
+    return end.year - start.year + 1
+
+
+def pick_grain(start, end, max_points=DEFAULT_POINTS):
+    """Finest grain with at most max_points buckets over start..end (year when nothing fits)."""
+    for grain in GRAINS:
+        if bucket_count(start, end, grain) <= max_points:
+            return grain
+    return 'year'
+
+
+def _label(day, grain, multi_year):
+    if grain in ('day', 'week'):
+        return day.strftime('%d %b %Y' if multi_year else '%d %b')
+    if grain == 'month':
+        return day.strftime('%b %Y')
+    if grain == 'quarter':
+        return f'Q{(day.month - 1) // 3 + 1} {day.year}'
+    return str(day.year)
+
+
+def trend_series(queryset, date_field, value_field, date_from=None, date_to=None, max_points=DEFAULT_POINTS):
+    """
+    Sum of value_field per bucket, at the finest grain that fits max_points.
+
+    Args:
+        queryset: rows to aggregate (DailySalesRollup, SalesRecord ...), already filtered
+        date_field, value_field: field names on those rows
+        date_from, date_to: date range; either end defaults to the data's first / last day
+        max_points: most points returned
+
+    Returns:
+        dict with labels, values and the grain used
+    """
+    max_points = min(max(max_points, 1), MAX_POINTS)
+    if not (date_from and date_to):
+        bounds = queryset.aggregate(first=Min(date_field), last=Max(date_field))
+        date_from = date_from or bounds['first']
+        date_to = date_to or bounds['last']
+    if not date_from or not date_to or date_from > date_to:
+        return {'labels': [], 'values': [], 'grain': 'day'}
+
+    grain = pick_grain(date_from, date_to, max_points)
+    truncate = GRAINS[grain]
+    bucket = truncate(date_field) if truncate else F(date_field)
+    rows = queryset.filter(**{f'{date_field}__gte': date_from, f'{date_field}__lte': date_to}).values(
+        bucket=bucket
+    ).annotate(total=Sum(value_field)).order_by('bucket')
+
+    multi_year = date_from.year != date_to.year
+    labels, values = [], []
+    for row in rows:
+        if row['bucket'] is None:
+            continue
+        day = row['bucket'].date() if hasattr(row['bucket'], 'date') else row['bucket']
+        labels.append(_label(day, grain, multi_year))
+        values.append(float(row['total'] or 0))
+    return {'labels': labels, 'values': values, 'grain': grain}
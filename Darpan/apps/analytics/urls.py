@@ -5,6 +5,7 @@ URL configuration for Analytics module.
 from django.urls import path
 from . import views
 from . import reports
+from . import charts
 
 app_name = 'analytics'
 
@@ -15,6 +16,10 @@ urlpatterns = [
     
     # Data Management
     path('records/', views.SalesRecordListView.as_view(), name='list'),
+    path('records/export/', views.SalesRecordExportView.as_view(), name='records_export'),
+    path('records/lookup/', views.SalesLookupView.as_view(), name='sales_lookup'),
+    path('api/sales-lookup/', views.SalesLookupAPIView.as_view(), name='sales_lookup_api'),
+    path('customers/<str:mobile>/', views.CustomerProfileView.as_view(), name='customer_profile'),
     path('import/', views.SalesImportView.as_view(), name='import'),
     path('import/history/', views.ImportLogListView.as_view(), name='import_history'),
     path('gold-rate/', views.GoldRateUpdateView.as_view(), name='gold_rate_update'),
@@ -23,15 +28,29 @@ urlpatterns = [
     path('sales-kpis/', views.SalesKPIView.as_view(), name='sales_kpis'),
     path('stock-kpis/', views.StockKPIView.as_view(), name='stock_kpis'),
     
+    # Chart data (fetched by the pages after render)
+    path('api/charts/<str:chart>/', charts.ChartDataView.as_view(), name='chart_data'),
+    
     # Reports
     path('reports/', reports.ReportsMenuView.as_view(), name='reports_menu'),
     path('reports/sales/', reports.SalesPerformanceReport.as_view(), name='report_sales'),
     path('reports/products/', reports.ProductAnalysisReport.as_view(), name='report_products'),
     path('reports/sellthrough/', reports.SellThroughReport.as_view(), name='report_sellthrough'),
     path('reports/customers/', reports.CustomerInsightsReport.as_view(), name='report_customers'),
+    path('reports/customers/segments/', reports.CustomerSegmentReport.as_view(), name='report_customer_segments'),
+    path('reports/customers/segments/export/', reports.CustomerSegmentExport.as_view(), name='report_customer_segments_export'),
+    path('reports/cohorts/', reports.CohortReport.as_view(), name='report_cohorts'),
     path('reports/stock/', reports.StockSummaryReport.as_view(), name='report_stock'),
+    path('reports/stock-ageing/', reports.StockAgeingReport.as_view(), name='report_stock_ageing'),
+    path('reports/store/', reports.StoreReport.as_view(), name='report_store'),
+    path('reports/replenishment/', reports.ReplenishmentReport.as_view(), name='report_replenishment'),
     path('reports/combined/', reports.CombinedInsightsReport.as_view(), name='report_combined'),
     path('reports/exhibition/', reports.ExhibitionReport.as_view(), name='report_exhibition'),
     path('reports/salesperson/', reports.SalespersonScorecardReport.as_view(), name='report_salesperson'),
+    path('reports/salesperson/detail/', reports.SalespersonDetailReport.as_view(), name='report_salesperson_detail'),
+    path('reports/compare/', reports.PeriodComparisonReport.as_view(), name='report_compare'),
+    path('reports/export/<str:report>/', reports.ReportExportView.as_view(), name='report_export'),
+    path('reports/pivot/', reports.PivotReport.as_view(), name='report_pivot'),
+    path('api/pivot/', reports.PivotAPIView.as_view(), name='pivot_api'),
 ]
 
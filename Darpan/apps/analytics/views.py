@@ -7,12 +7,22 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.http import JsonResponse
+from django.views import View
 from django.db import transaction
+from django.utils import timezone
 from django.db.models import Sum, Max, Count, Avg, F, Q
 from django.db.models.functions import TruncMonth, TruncDate
 
-from .models import SalesRecord, GoldRate, CollectionMaster, ImportLog, StockSnapshot
+from .models import (
+    SalesRecord, GoldRate, CollectionMaster, ImportLog, StockSnapshot, CustomerProfile, SalesAnomaly, DailySalesRollup,
+)
 from .forms import SalesRecordForm, CSVImportForm, GoldRateForm
+from apps.core.pagination import KeysetPaginationMixin
+from .exports import export_response, queryset_rows
+from .timeseries import trend_series
+from .reports import ReportAccessMixin, distinct_stock_styles, is_store_scoped
+from .lookup import lookup_sales, normalise_mobile, mobile_variants, LOOKUP_FIELDS, MIN_PREFIX_LENGTH
 
 
 class DataAdminRequiredMixin(UserPassesTestMixin):
@@ -24,6 +34,12 @@ class DashboardAccessMixin(UserPassesTestMixin):
     def test_func(self):
         return self.request.user.is_superuser or self.request.user.has_any_role(['admin', 'platform_admin', 'store_manager'])
 
+    def dispatch(self, request, *args, **kwargs):
+        # The dashboards are company-wide; store-scoped users get their store report instead
+        if request.user.is_authenticated and is_store_scoped(request.user):
+            return redirect('analytics:report_store')
+        return super().dispatch(request, *args, **kwargs)
+
 
 class AnalyticsDashboardView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
     """Comprehensive MIS Dashboard combining Sales, Stock, and CRM data"""
@@ -79,7 +95,7 @@ class AnalyticsDashboardView(LoginRequiredMixin, DashboardAccessMixin, TemplateV
         if latest_date:
             stock_qs = stock_qs.filter(snapshot_date=latest_date)
         
-        total_skus = stock_qs.values('style_code').distinct().count()
+        total_skus, skus_approximate = distinct_stock_styles(self.request, company, latest_date, stock_qs)
         stock_qty = stock_qs.aggregate(total=Sum('quantity'))['total'] or 0
         stock_value = stock_qs.aggregate(total=Sum(F('quantity') * F('sale_price')))['total'] or 0
         total_weight = stock_qs.aggregate(total=Sum('gross_weight'))['total'] or 0
@@ -87,53 +103,14 @@ class AnalyticsDashboardView(LoginRequiredMixin, DashboardAccessMixin, TemplateV
         
         context.update({
             'total_skus': total_skus,
+            'skus_approximate': skus_approximate,
             'stock_qty': stock_qty,
             'stock_value': stock_value,
             'total_weight': total_weight,
             'low_stock_count': low_stock_count,
         })
         
-        # ============== SALES TREND (Last 30 days) ==============
-        from django.utils import timezone
-        from datetime import timedelta
-        from collections import defaultdict
-        import json
-        
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        recent_sales = sales_only.filter(transaction_date__gte=thirty_days_ago).values('transaction_date', 'final_amount')
-        
-        daily_totals = defaultdict(float)
-        for sale in recent_sales:
-            if sale['transaction_date'] and sale['final_amount']:
-                daily_totals[sale['transaction_date']] += float(sale['final_amount'])
-        
-        sorted_days = sorted(daily_totals.keys())
-        context['trend_labels'] = json.dumps([day.strftime('%d %b') for day in sorted_days])
-        context['trend_values'] = json.dumps([daily_totals[day] for day in sorted_days])
-        
-        # ============== SALES BY CATEGORY ==============
-        category_data = sales_only.values('product_category').annotate(
-            total=Sum('revenue')
-        ).order_by('-total')[:8]
-        
-        context['category_labels'] = json.dumps([item['product_category'] or 'Other' for item in category_data])
-        context['category_values'] = json.dumps([float(item['total'] or 0) for item in category_data])
-        
-        # ============== SALES BY LOCATION ==============
-        location_data = sales_only.values('region').annotate(
-            total=Sum('revenue')
-        ).order_by('-total')[:8]
-        
-        context['location_labels'] = json.dumps([item['region'] or 'Unknown' for item in location_data])
-        context['location_values'] = json.dumps([float(item['total'] or 0) for item in location_data])
-        
-        # ============== STOCK BY LOCATION ==============
-        stock_location_data = stock_qs.values('location').annotate(
-            value=Sum(F('quantity') * F('sale_price'))
-        ).order_by('-value')[:8]
-        
-        context['stock_location_labels'] = json.dumps([item['location'] or 'Unknown' for item in stock_location_data])
-        context['stock_location_values'] = json.dumps([float(item['value'] or 0) for item in stock_location_data])
+        # Trend, category and location charts are fetched from apps.analytics.charts after render
         
         # ============== TOP PRODUCTS ==============
         top_products = sales_only.values('style_code', 'product_category').annotate(
@@ -155,6 +132,12 @@ class AnalyticsDashboardView(LoginRequiredMixin, DashboardAccessMixin, TemplateV
         else:
             context['recent_imports'] = []
         
+        # ============== SALES ANOMALIES (flagged after each sales import) ==============
+        if company:
+            context['sales_anomalies'] = SalesAnomaly.objects.filter(company=company).order_by('-date', 'location')[:8]
+        else:
+            context['sales_anomalies'] = []
+        
         return context
 
 
@@ -192,9 +175,10 @@ class AdvancedAnalyticsView(LoginRequiredMixin, DashboardAccessMixin, TemplateVi
         context['product_labels'] = [item['product_name'] or 'Unknown' for item in top_products]
         context['product_values'] = [float(item['total'] or 0) for item in top_products]
 
-        monthly_data = qs.annotate(month=TruncMonth('transaction_date')).values('month').annotate(total=Sum('revenue')).order_by('month')
-        context['trend_labels'] = [item['month'].strftime('%b %Y') for item in monthly_data if item['month']]
-        context['trend_values'] = [float(item['total'] or 0) for item in monthly_data if item['month'] and item['total']]
+        # Revenue trend from the rollup, at the finest grain that fits the chart
+        trend = trend_series(DailySalesRollup.objects.filter(company=company), 'date', 'revenue', max_points=36)
+        context['trend_labels'] = trend['labels']
+        context['trend_values'] = trend['values']
 
         context['recent_transactions'] = qs.order_by('-revenue')[:10]
 
@@ -243,8 +227,6 @@ class SalesKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
             count=Count('id')
         ).order_by('-total')[:10]
         context['location_data'] = list(location_data)
-        context['location_labels'] = [item['region'] or 'Unknown' for item in location_data]
-        context['location_values'] = [float(item['total'] or 0) for item in location_data]
         
         # Sales by Category
         category_data = sales_qs.values('product_category').annotate(
@@ -252,8 +234,6 @@ class SalesKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
             count=Count('id')
         ).order_by('-total')[:10]
         context['category_data'] = list(category_data)
-        context['category_labels'] = [item['product_category'] or 'Unknown' for item in category_data]
-        context['category_values'] = [float(item['total'] or 0) for item in category_data]
         
         # Top Selling Products (by style code)
         top_products = sales_qs.values('style_code', 'product_category').annotate(
@@ -270,23 +250,7 @@ class SalesKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
         ).order_by('-total')[:10]
         context['top_sales_people'] = list(top_sales_people)
         
-        # Daily Trend (last 30 days) - Oracle compatible version
-        from django.utils import timezone
-        from datetime import timedelta
-        from collections import defaultdict
-        
-        thirty_days_ago = timezone.now().date() - timedelta(days=30)
-        recent_sales = sales_qs.filter(transaction_date__gte=thirty_days_ago).values('transaction_date', 'final_amount')
-        
-        # Group by date in Python (Oracle TruncDate has compatibility issues)
-        daily_totals = defaultdict(float)
-        for sale in recent_sales:
-            if sale['transaction_date'] and sale['final_amount']:
-                daily_totals[sale['transaction_date']] += float(sale['final_amount'])
-        
-        sorted_days = sorted(daily_totals.keys())
-        context['trend_labels'] = [day.strftime('%d %b') for day in sorted_days]
-        context['trend_values'] = [daily_totals[day] for day in sorted_days]
+        # Trend, forecast and the location / category charts are fetched from apps.analytics.charts after render
         
         return context
 
@@ -306,13 +270,14 @@ class StockKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
             qs = qs.filter(snapshot_date=latest_date)
         
         # KPI Calculations
-        total_skus = qs.values('style_code').distinct().count()
+        total_skus, skus_approximate = distinct_stock_styles(self.request, company, latest_date, qs)
         total_quantity = qs.aggregate(total=Sum('quantity'))['total'] or 0
         total_value = qs.aggregate(total=Sum(F('quantity') * F('sale_price')))['total'] or 0
         total_weight = qs.aggregate(total=Sum('gross_weight'))['total'] or 0
         
         context.update({
             'total_skus': total_skus,
+            'skus_approximate': skus_approximate,
             'total_quantity': total_quantity,
             'total_value': total_value,
             'total_weight': total_weight,
@@ -325,8 +290,6 @@ class StockKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
             value=Sum(F('quantity') * F('sale_price'))
         ).order_by('-value')[:10]
         context['location_data'] = list(location_data)
-        context['location_labels'] = [item['location'] or 'Unknown' for item in location_data]
-        context['location_values'] = [float(item['value'] or 0) for item in location_data]
         
         # Stock by Category
         category_data = qs.values('category').annotate(
@@ -334,8 +297,6 @@ class StockKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
             value=Sum(F('quantity') * F('sale_price'))
         ).order_by('-value')[:10]
         context['category_data'] = list(category_data)
-        context['category_labels'] = [item['category'] or 'Unknown' for item in category_data]
-        context['category_values'] = [float(item['value'] or 0) for item in category_data]
         
         # Low Stock Items (qty < 2)
         low_stock = qs.filter(quantity__lt=2, quantity__gt=0).order_by('quantity')[:20]
@@ -348,16 +309,98 @@ class StockKPIView(LoginRequiredMixin, DashboardAccessMixin, TemplateView):
         return context
 
 
-class SalesRecordListView(LoginRequiredMixin, ListView):
+class SalesRecordListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = SalesRecord
     template_name = 'analytics/list.html'
     context_object_name = 'records'
     paginate_by = 50
+    keyset_ordering = ('-transaction_date', '-id')
 
     def get_queryset(self):
         return SalesRecord.objects.filter(company=self.request.user.company)
 
 
+class SalesRecordExportView(LoginRequiredMixin, ReportAccessMixin, View):
+    """Every sales record of the company (of their store for store-scoped users) as a streaming CSV / XLSX (?format=xlsx)"""
+    store_scoped = True
+    COLUMNS = ['transaction_no', 'transaction_date', 'transaction_type', 'region', 'sales_person',
+               'client_name', 'client_mobile', 'style_code', 'jewel_code', 'product_category', 'collection',
+               'base_metal', 'quantity', 'gross_amount', 'discount_amount', 'revenue', 'gross_margin']
+
+    def get(self, request):
+        records = SalesRecord.objects.filter(company=request.user.company)
+        if is_store_scoped(request.user):
+            records = records.filter(store_id=request.user.store_id)
+        records = records.order_by('-transaction_date', '-id')
+        return export_response(request, 'sales_records', self.COLUMNS, queryset_rows(records, self.COLUMNS), 'Sales Records')
+
+
+class SalesLookupView(LoginRequiredMixin, TemplateView):
+    """Find sales by transaction number, jewel code, customer mobile or PAN"""
+    template_name = 'analytics/sales_lookup.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        kind = self.request.GET.get('kind', 'auto')
+        matched, rows = lookup_sales(self.request.user.company, query, kind)
+
+        # Group lines under their bill
+        transactions = {}
+        for row in rows:
+            bill = transactions.setdefault(row['transaction_no'], {
+                'transaction_no': row['transaction_no'],
+                'transaction_date': row['transaction_date'],
+                'client_name': row['client_name'],
+                'client_mobile': row['client_mobile'],
+                'region': row['region'],
+                'lines': [],
+                'total': 0,
+            })
+            bill['lines'].append(row)
+            bill['total'] += float(row['final_amount'] or 0)
+
+        context.update({
+            'query': query,
+            'kind': kind,
+            'kinds': list(LOOKUP_FIELDS),
+            'matched_kind': matched,
+            'transactions': list(transactions.values()),
+            'min_length': MIN_PREFIX_LENGTH,
+        })
+        return context
+
+
+class CustomerProfileView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """Customer 360: the precomputed profile row plus paginated purchase history"""
+    template_name = 'analytics/customer_profile.html'
+    context_object_name = 'records'
+    paginate_by = 25
+    keyset_ordering = ('-transaction_date', '-id')
+
+    def get_queryset(self):
+        self.mobile = normalise_mobile(self.kwargs['mobile'])
+        return SalesRecord.objects.filter(
+            company=self.request.user.company, client_mobile__in=mobile_variants(self.mobile)
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['mobile'] = self.mobile
+        context['profile'] = CustomerProfile.objects.filter(
+            company=self.request.user.company, mobile=self.mobile
+        ).first()
+        return context
+
+
+class SalesLookupAPIView(LoginRequiredMixin, View):
+    """JSON variant of SalesLookupView for the billing desk"""
+
+    def get(self, request):
+        kind, rows = lookup_sales(request.user.company, request.GET.get('q', ''), request.GET.get('kind', 'auto'))
+        return JsonResponse({'kind': kind, 'results': rows})
+
+
 class SalesImportView(LoginRequiredMixin, DataAdminRequiredMixin, FormView):
     template_name = 'analytics/import.html'
     form_class = CSVImportForm
@@ -379,34 +422,43 @@ class SalesImportView(LoginRequiredMixin, DataAdminRequiredMixin, FormView):
         file_type = form.cleaned_data['file_type']
         uploaded_file = form.cleaned_data['data_file']
         stock_date = form.cleaned_data.get('stock_date')  # Optional date for stock imports
+        force = form.cleaned_data.get('force', False)
         
         if file_type == 'sales':
-            return self.process_flexible_import(uploaded_file, 'sales')
+            return self.process_flexible_import(uploaded_file, 'sales', force=force)
         elif file_type == 'stock':
-            return self.process_flexible_import(uploaded_file, 'stock', stock_date=stock_date)
+            return self.process_flexible_import(uploaded_file, 'stock', stock_date=stock_date, force=force)
         elif file_type == 'crm':
-            return self.process_flexible_import(uploaded_file, 'crm')
+            return self.process_flexible_import(uploaded_file, 'crm', force=force)
         elif file_type == 'collection':
             return self.process_collection_csv(uploaded_file)
         
         messages.warning(self.request, "This file type is not yet implemented.")
         return redirect('analytics:import')
 
-    def process_flexible_import(self, uploaded_file, import_type, stock_date=None):
-        """Use the new FlexibleImporter"""
+    def process_flexible_import(self, uploaded_file, import_type, stock_date=None, force=False):
+        """Use the new FlexibleImporter (force re-imports a file already imported)"""
         from .flexible_importer import FlexibleImporter
         
         # FlexibleImporter handles company fallback internally
         importer = FlexibleImporter(self.request.user.company, self.request.user)
         
         if import_type == 'sales':
-            result = importer.import_sales(uploaded_file)
+            result = importer.import_sales(uploaded_file, force=force)
         elif import_type == 'crm':
-            result = importer.import_crm(uploaded_file)
+            result = importer.import_crm(uploaded_file, force=force)
         else:
-            result = importer.import_stock(uploaded_file, stock_date=stock_date)
-        
-        if result['success']:
+            result = importer.import_stock(uploaded_file, stock_date=stock_date, force=force)
+        
+        if result.get('already_imported'):
+            previous = result['previous_import']
+            messages.info(
+                self.request,
+                f"This file was already imported as {previous['file_name']} on "
+                f"{timezone.localtime(previous['imported_at']):%d %b %Y %H:%M} ({previous['rows_imported']} rows) - "
+                f"nothing to do. Tick 're-import' to load it again."
+            )
+        elif result['success']:
             msg = f"Import successful: {result['rows_imported']} rows imported"
             if result.get('rows_skipped'):
                 msg += f", {result['rows_skipped']} skipped"
@@ -416,6 +468,8 @@ class SalesImportView(LoginRequiredMixin, DataAdminRequiredMixin, FormView):
                 msg += f", {result['rows_duplicate']} duplicates skipped"
             if result.get('rows_deleted'):
                 msg += f" (replaced {result['rows_deleted']} existing records)"
+            if result.get('anomalies'):
+                msg += f". {len(result['anomalies'])} unusual location-days flagged"
             
             if result.get('columns_unmapped'):
                 msg += f". Unmapped columns: {', '.join(result['columns_unmapped'][:5])}"
@@ -433,11 +487,12 @@ class SalesImportView(LoginRequiredMixin, DataAdminRequiredMixin, FormView):
         return redirect('analytics:list')
 
 
-class ImportLogListView(LoginRequiredMixin, DataAdminRequiredMixin, ListView):
+class ImportLogListView(LoginRequiredMixin, DataAdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = ImportLog
     template_name = 'analytics/import_history.html'
     context_object_name = 'imports'
     paginate_by = 20
+    keyset_ordering = ('-imported_at', '-id')
 
     def get_queryset(self):
         return ImportLog.objects.filter(company=self.request.user.company)
@@ -29,6 +29,11 @@ class StoreAdmin(admin.ModelAdmin):
     list_filter = ('company', 'is_active')
     search_fields = ('name', 'gati_location_name', 'address')
     ordering = ('company', 'name')
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        from apps.analytics.locations import relink_locations
+        relink_locations(obj.company)
 
 
 @admin.register(User)
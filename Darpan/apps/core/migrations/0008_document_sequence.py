@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_create_default_roles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(help_text="e.g., 'ISO', 'PO', 'BOS/STORE1'", max_length=255)),
+                ('period', models.CharField(blank=True, help_text="e.g., '20250114' or '2025'", max_length=20)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='document_sequences', to='core.company')),
+            ],
+            options={
+                'db_table': 'document_sequences',
+                'unique_together': {('company', 'prefix', 'period')},
+            },
+        ),
+    ]
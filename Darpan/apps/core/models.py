@@ -382,3 +382,25 @@ class BackupTask(models.Model):
         module_name = self.module.name if self.module else "All Modules"
         return f"Backup {module_name} - {self.status}"
 
+
+
+class DocumentSequence(models.Model):
+    """
+    Per-company counter for human-readable document numbers.
+    One row per (company, prefix, period), e.g. ISO numbers for a given day
+    or BOS numbers for a store and year. Numbers are handed out by
+    apps.core.sequences with a single atomic increment.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='document_sequences',
+                                null=True, blank=True)
+    prefix = models.CharField(max_length=255, help_text="e.g., 'ISO', 'PO', 'BOS/STORE1'")
+    period = models.CharField(max_length=20, blank=True, help_text="e.g., '20250114' or '2025'")
+    last_value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        unique_together = ['company', 'prefix', 'period']
+    
+    def __str__(self):
+        return f"{self.prefix}/{self.period}: {self.last_value}"
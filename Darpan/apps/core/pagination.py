@@ -0,0 +1,169 @@
+"""
+Keyset (seek) pagination for large list views.
+Pages are addressed by an opaque cursor holding the sort key of a boundary row, so
+page 5,000 costs the same index seek as page 1, and totals come from a cached COUNT.
+"""
+
+import base64
+import hashlib
+import json
+from decimal import Decimal
+from django.core.cache import cache
+from django.db.models import Q
+
+# Seconds a list's total count is reused before being recounted
+COUNT_CACHE_TIMEOUT = 10 * 60
+
+
+def _encode(values):
+    raw = json.dumps([
+        v.isoformat() if hasattr(v, 'isoformat') else str(v) if isinstance(v, Decimal) else v for v in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+class KeysetPage:
+    """One page of a KeysetPaginator - exposes the parts of Django's Page that list templates use."""
+
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        return self.paginator.cursor_for(self.object_list[-1]) if self._has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        return self.paginator.cursor_for(self.object_list[0]) if self._has_previous and self.object_list else None
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over a queryset.
+
+    Args:
+        queryset: Unordered or ordered queryset - it is re-ordered by ordering
+        per_page: Rows per page
+        ordering: Sort key, most significant first, e.g. ('-transaction_date', '-id').
+                  Must end with a unique field so every row has a distinct position.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-id',)):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.fields = [o.lstrip('-') for o in self.ordering]
+        self.descending = [o.startswith('-') for o in self.ordering]
+
+    def cursor_for(self, obj):
+        return _encode([getattr(obj, f) for f in self.fields])
+
+    def _parse(self, cursor):
+        """Cursor -> typed key values, or None if the cursor is malformed."""
+        try:
+            raw = _decode(cursor)
+            if len(raw) != len(self.fields):
+                return None
+            model = self.queryset.model
+            return [model._meta.get_field(f).to_python(v) for f, v in zip(self.fields, raw)]
+        except Exception:
+            return None
+
+    def _after(self, values, reverse=False):
+        """Rows strictly after the key values in sort order (before them if reverse)."""
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            forward = self.descending[i] != reverse
+            step = Q(**{f'{field}__{"lt" if forward else "gt"}': values[i]})
+            for prev in range(i):
+                step &= Q(**{self.fields[prev]: values[prev]})
+            condition |= step
+        return condition
+
+    def page(self, cursor=None, direction='next'):
+        """
+        Fetch the page after the cursor (or before it when direction is 'prev').
+        Without a cursor, returns the first page.
+        """
+        values = self._parse(cursor) if cursor else None
+        backwards = values is not None and direction == 'prev'
+
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._after(values, reverse=backwards))
+        if backwards:
+            qs = qs.order_by(*[f if desc else f'-{f}' for f, desc in zip(self.fields, self.descending)])
+        else:
+            qs = qs.order_by(*self.ordering)
+
+        rows = list(qs[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            if not rows:
+                # Nothing before the cursor (first-row or stale cursor, earlier rows deleted)
+                return self.page()
+            rows.reverse()
+            return KeysetPage(self, rows, has_next=True, has_previous=more)
+        return KeysetPage(self, rows, has_next=more, has_previous=values is not None)
+
+    @property
+    def count(self):
+        """Total rows, cached for COUNT_CACHE_TIMEOUT - approximate for a few minutes after writes."""
+        sql, params = self.queryset.order_by().query.sql_with_params()
+        key = 'keyset_count_' + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        total = cache.get(key)
+        if total is None:
+            total = self.queryset.order_by().count()
+            cache.set(key, total, COUNT_CACHE_TIMEOUT)
+        return total
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin swapping OFFSET pagination for KeysetPaginator.
+    Templates get page_obj (with next_cursor / previous_cursor), total_count and
+    pagination_query (the current query string without cursor parameters);
+    include base/keyset_pagination.html to render the controls.
+    """
+    keyset_ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_ordering)
+        page = paginator.page(self.request.GET.get('cursor'), self.request.GET.get('dir', 'next'))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if context.get('paginator'):
+            context['total_count'] = context['paginator'].count
+        query = self.request.GET.copy()
+        query.pop('cursor', None)
+        query.pop('dir', None)
+        query.pop('page', None)
+        context['pagination_query'] = query.urlencode()
+        return context
@@ -0,0 +1,96 @@
+"""
+Document number allocation for the Darpan application.
+Hands out collision-free sequence numbers for ISO, PO, BOS and certificate numbers.
+"""
+
+import logging
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import DocumentSequence
+
+logger = logging.getLogger(__name__)
+
+
+def allocate_block(company, prefix, period='', size=1, seed=None):
+    """
+    Reserve a contiguous block of sequence numbers.
+
+    The counter row is bumped with a single UPDATE ... SET last_value = last_value + size,
+    so concurrent callers are serialised by the row lock and never receive the same number.
+
+    Args:
+        company: Company object (None for platform-level documents)
+        prefix: Counter prefix, e.g. 'ISO' or 'BOS/STORE1'
+        period: Counter period, e.g. '20250114' for daily or '2025' for yearly numbering
+        size: Number of values to reserve
+        seed: Optional callable returning the highest number already issued.
+              Only called once, when the counter row for this period is first created,
+              so numbers issued before the counter existed are never handed out again.
+
+    Returns:
+        range of reserved sequence numbers
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+
+    with transaction.atomic():
+        counters = DocumentSequence.objects.filter(company=company, prefix=prefix, period=period)
+
+        if not counters.update(last_value=F('last_value') + size):
+            start = int(seed() or 0) if seed else 0
+            try:
+                with transaction.atomic():
+                    DocumentSequence.objects.create(
+                        company=company,
+                        prefix=prefix,
+                        period=period,
+                        last_value=start + size,
+                    )
+            except IntegrityError:
+                # Another request created the counter first - increment theirs instead
+                counters.update(last_value=F('last_value') + size)
+
+        last_value = counters.values_list('last_value', flat=True).get()
+
+    return range(last_value - size + 1, last_value + 1)
+
+
+def next_number(company, prefix, period='', seed=None):
+    """
+    Reserve a single sequence number.
+
+    Args:
+        company: Company object (None for platform-level documents)
+        prefix: Counter prefix
+        period: Counter period
+        seed: Optional callable, see allocate_block
+
+    Returns:
+        Integer sequence number
+    """
+    return allocate_block(company, prefix, period, size=1, seed=seed)[0]
+
+
+def max_existing_suffix(queryset, field, number_prefix, separator='-'):
+    """
+    Find the highest numeric suffix already issued under a document number prefix.
+    Used as a seed so counters continue after numbers issued by older code.
+
+    Args:
+        queryset: QuerySet of the document model
+        field: Name of the document number field
+        number_prefix: Leading part of the number, e.g. 'ISO-ACME-20250114-'
+        separator: Separator before the numeric suffix
+
+    Returns:
+        Highest suffix as integer, or 0 if none exist
+    """
+    highest = 0
+    values = queryset.filter(**{f'{field}__startswith': number_prefix}).values_list(field, flat=True)
+    for value in values.iterator():
+        try:
+            highest = max(highest, int(value.rsplit(separator, 1)[-1]))
+        except (ValueError, AttributeError):
+            continue
+    return highest
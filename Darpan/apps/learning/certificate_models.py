@@ -6,8 +6,6 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from apps.core.models import User
 from .models import Course
-import uuid
-from datetime import datetime
 
 
 class CourseCertificate(models.Model):
@@ -29,8 +27,11 @@ class CourseCertificate(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.certificate_number:
-            # Generate unique certificate number
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_id = str(uuid.uuid4())[:8].upper()
-            self.certificate_number = f"CERT-{self.course.id}-{self.user.id}-{timestamp}-{unique_id}"
+            # Generate certificate number: CERT-COMPANY-YYYY-NNNNN (per-company yearly sequence)
+            from django.utils import timezone
+            from apps.core.sequences import next_number
+            company = self.course.company
+            year = str(timezone.localdate().year)
+            seq = next_number(company, 'CERT', year)
+            self.certificate_number = f"CERT-{company.company_code}-{year}-{seq:05d}"
         super().save(*args, **kwargs)
@@ -209,10 +209,11 @@ class CourseCertificate(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.certificate_number:
-            # Generate unique certificate number
-            from datetime import datetime
-            import uuid
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            unique_id = str(uuid.uuid4())[:8].upper()
-            self.certificate_number = f"CERT-{self.course.id}-{self.user.id}-{timestamp}-{unique_id}"
+            # Generate certificate number: CERT-COMPANY-YYYY-NNNNN (per-company yearly sequence)
+            from django.utils import timezone
+            from apps.core.sequences import next_number
+            company = self.course.company
+            year = str(timezone.localdate().year)
+            seq = next_number(company, 'CERT', year)
+            self.certificate_number = f"CERT-{company.company_code}-{year}-{seq:05d}"
         super().save(*args, **kwargs)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('old_gold', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='oldgoldtransaction',
+            index=models.Index(fields=['company', 'transaction_date'], name='old_gold_ol_company_91a22c_idx'),
+        ),
+    ]
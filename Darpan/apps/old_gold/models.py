@@ -37,6 +37,9 @@ class OldGoldTransaction(models.Model):
 
     class Meta:
         ordering = ['-transaction_date', '-created_at']
+        indexes = [
+            models.Index(fields=['company', 'transaction_date']),
+        ]
 
     def __str__(self):
         return f"{self.bill_of_supply_no} - {self.customer_name}"
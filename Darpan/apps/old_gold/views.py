@@ -9,6 +9,8 @@ from django.shortcuts import redirect
 from .models import OldGoldTransaction
 from .forms import OldGoldForm
 from apps.core.utils import log_audit_action
+from apps.core.sequences import next_number, max_existing_suffix
+from apps.core.pagination import KeysetPaginationMixin
 
 class OldGoldCreateView(LoginRequiredMixin, CreateView):
     model = OldGoldTransaction
@@ -39,20 +41,16 @@ class OldGoldCreateView(LoginRequiredMixin, CreateView):
             year = timezone.now().year
             prefix = f"BOS/{store_code}/{year}/"
             
-            # Find last sequence
-            last_tx = OldGoldTransaction.objects.filter(
-                company=self.request.user.company,
-                bill_of_supply_no__startswith=prefix
-            ).order_by('-id').first()
-            
-            if last_tx:
-                try:
-                    last_seq = int(last_tx.bill_of_supply_no.split('/')[-1])
-                    new_seq = last_seq + 1
-                except ValueError:
-                    new_seq = 1
-            else:
-                new_seq = 1
+            # Next sequence from the per-company, per-store, per-year counter.
+            # Seeded once from existing BOS numbers so older entries are never reused.
+            company = self.request.user.company
+            new_seq = next_number(
+                company, f"BOS/{store_code}", str(year),
+                seed=lambda: max_existing_suffix(
+                    OldGoldTransaction.objects.filter(company=company),
+                    'bill_of_supply_no', prefix, separator='/'
+                ),
+            )
             
             form.instance.bill_of_supply_no = f"{prefix}{new_seq:04d}"
             
@@ -80,11 +78,12 @@ class OldGoldCreateView(LoginRequiredMixin, CreateView):
             messages.success(self.request, f"Transaction saved. BOS: {form.instance.bill_of_supply_no}")
             return response
 
-class OldGoldListView(LoginRequiredMixin, ListView):
+class OldGoldListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = OldGoldTransaction
     template_name = 'old_gold/list.html'
     context_object_name = 'transactions'
     paginate_by = 20
+    keyset_ordering = ('-transaction_date', '-id')
 
     def get_queryset(self):
         return OldGoldTransaction.objects.filter(company=self.request.user.company)
@@ -72,12 +72,12 @@ class PurchaseOrder(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.po_number:
-            # Generate PO Number: PO-YYYYMMDD-XXXX
+            # Generate PO Number: PO-COMPANY-YYYYMMDD-NNNN (per-company daily sequence)
             from django.utils import timezone
-            import random
-            today = timezone.now().strftime('%Y%m%d')
-            rand = random.randint(1000, 9999)
-            self.po_number = f"PO-{today}-{rand}"
+            from apps.core.sequences import next_number
+            today = timezone.localdate().strftime('%Y%m%d')
+            seq = next_number(self.company, 'PO', today)
+            self.po_number = f"PO-{self.company.company_code}-{today}-{seq:04d}"
         super().save(*args, **kwargs)
         
     def calculate_total(self):
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_product_tags(apps, schema_editor):
+    """Copy existing Product.tags JSON lists into the ProductTag side table."""
+    Product = apps.get_model('stock', 'Product')
+    ProductTag = apps.get_model('stock', 'ProductTag')
+    
+    batch = []
+    for product in Product.objects.only('id', 'company_id', 'tags').iterator(chunk_size=2000):
+        tags = {str(t).strip().lower()[:50] for t in (product.tags or []) if str(t).strip()}
+        batch.extend(ProductTag(company_id=product.company_id, product_id=product.id, tag=tag) for tag in tags)
+        if len(batch) >= 2000:
+            ProductTag.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ProductTag.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_document_sequence'),
+        ('stock', '0004_productattribute_productimage_alter_product_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=50)),
+            ],
+            options={
+                'db_table': 'stock_product_tags',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['store', 'product'], name='stock_inven_store_i_ad7f0f_idx'),
+        ),
+        migrations.AddField(
+            model_name='producttag',
+            name='company',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_tags', to='core.company'),
+        ),
+        migrations.AddField(
+            model_name='producttag',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='stock.product'),
+        ),
+        migrations.AddIndex(
+            model_name='producttag',
+            index=models.Index(fields=['company', 'tag'], name='stock_produ_company_468d61_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='producttag',
+            unique_together={('product', 'tag')},
+        ),
+        migrations.RunPython(backfill_product_tags, migrations.RunPython.noop),
+    ]
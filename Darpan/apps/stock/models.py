@@ -49,6 +49,55 @@ class Product(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.sku})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'tags' in instance.__dict__:
+            instance._saved_tags = list(instance.tags or [])
+        return instance
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        super().save(*args, **kwargs)
+        # Stock and price edits leave ProductTag alone; it is only synced when the tags changed
+        if 'tags' not in self.__dict__ or (update_fields is not None and 'tags' not in update_fields):
+            return
+        if self.tags != getattr(self, '_saved_tags', []):
+            self.sync_tags()
+        self._saved_tags = list(self.tags or [])
+    
+    def sync_tags(self):
+        """Mirror the tags JSON list into the indexed ProductTag side table."""
+        tags = {str(t).strip().lower()[:50] for t in (self.tags or []) if str(t).strip()}
+        existing = set(self.tag_links.values_list('tag', flat=True))
+        if existing - tags:
+            self.tag_links.filter(tag__in=existing - tags).delete()
+        if tags - existing:
+            ProductTag.objects.bulk_create([
+                ProductTag(company_id=self.company_id, product=self, tag=tag)
+                for tag in tags - existing
+            ])
+
+
+class ProductTag(models.Model):
+    """
+    Normalized product tags (lowercase), one row per product/tag.
+    Lets tag filtering use an indexed join instead of scanning the tags JSON.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='product_tags')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='tag_links')
+    tag = models.CharField(max_length=50)
+    
+    class Meta:
+        db_table = 'stock_product_tags'
+        unique_together = ['product', 'tag']
+        indexes = [
+            models.Index(fields=['company', 'tag']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name}: {self.tag}"
 
 
 class ProductImage(models.Model):
@@ -132,12 +181,12 @@ class StockTransfer(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.iso_number:
-            # Generate ISO Number: ISO-YYYYMMDD-XXXX
+            # Generate ISO Number: ISO-COMPANY-YYYYMMDD-NNNN (per-company daily sequence)
             from django.utils import timezone
-            import random
-            today = timezone.now().strftime('%Y%m%d')
-            rand = random.randint(1000, 9999)
-            self.iso_number = f"ISO-{today}-{rand}"
+            from apps.core.sequences import next_number
+            today = timezone.localdate().strftime('%Y%m%d')
+            seq = next_number(self.company, 'ISO', today)
+            self.iso_number = f"ISO-{self.company.company_code}-{today}-{seq:04d}"
         super().save(*args, **kwargs)
 
 class TransferItem(models.Model):
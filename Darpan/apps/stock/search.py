@@ -0,0 +1,125 @@
+"""
+Product search backend for the Advanced Product Finder.
+Builds the filtered queryset, filter-aware facet counts and page-scoped prefetches.
+"""
+
+from collections import defaultdict
+from django.db.models import Q, Count, Prefetch, prefetch_related_objects
+
+from apps.analytics.recommendations import frequently_bought_together
+from .models import Product, ProductImage, ProductTag
+
+
+SORT_OPTIONS = ['-trending_score', 'name', '-sale_price', 'sale_price', '-created_at']
+
+PRICE_RANGES = [
+    {'label': 'Under ₹10k', 'min': 0, 'max': 10000},
+    {'label': '₹10k - ₹50k', 'min': 10000, 'max': 50000},
+    {'label': '₹50k - ₹1L', 'min': 50000, 'max': 100000},
+    {'label': 'Above ₹1L', 'min': 100000, 'max': None},
+]
+
+
+class ProductSearch:
+    """
+    Search active products for a company from request GET parameters.
+
+    Supported parameters: q, tag, category, metal, price_min, price_max, sort.
+    """
+
+    def __init__(self, company, params):
+        self.company = company
+        self.query = (params.get('q') or '').strip()
+        self.tag = (params.get('tag') or '').strip().lower()
+        self.category = params.get('category') or ''
+        self.metal = params.get('metal') or ''
+        self.price_min = self._parse_price(params.get('price_min'))
+        self.price_max = self._parse_price(params.get('price_max'))
+        sort = params.get('sort', '-trending_score')
+        self.sort = sort if sort in SORT_OPTIONS else '-trending_score'
+
+    @staticmethod
+    def _parse_price(value):
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    def _tagged(self, tag):
+        """Product ids carrying a tag, via the (company, tag) index."""
+        return ProductTag.objects.filter(company=self.company, tag=tag).values('product_id')
+
+    def base_queryset(self):
+        """Active products matching everything except the category/metal facets."""
+        qs = Product.objects.filter(company=self.company, is_active=True)
+
+        if self.query:
+            qs = qs.filter(
+                Q(name__icontains=self.query) |
+                Q(description__icontains=self.query) |
+                Q(style_code__icontains=self.query) |
+                Q(sku__icontains=self.query) |
+                Q(id__in=self._tagged(self.query.lower()))
+            )
+
+        if self.tag:
+            qs = qs.filter(id__in=self._tagged(self.tag))
+
+        if self.price_min is not None:
+            qs = qs.filter(sale_price__gte=self.price_min)
+        if self.price_max is not None:
+            qs = qs.filter(sale_price__lte=self.price_max)
+
+        return qs
+
+    def queryset(self):
+        """Fully filtered and sorted products (no prefetches - see prefetch_page)."""
+        qs = self.base_queryset()
+        if self.category:
+            qs = qs.filter(category=self.category)
+        if self.metal:
+            qs = qs.filter(base_metal=self.metal)
+        return qs.order_by(self.sort)
+
+    def facets(self):
+        """
+        Filter-aware category and metal counts from one grouped query.
+
+        Each facet is counted with every other active filter applied, so the
+        category counts respect the selected metal and vice versa.
+        """
+        rows = self.base_queryset().order_by().values('category', 'base_metal').annotate(count=Count('id'))
+
+        categories = defaultdict(int)
+        metals = defaultdict(int)
+        for row in rows:
+            if not self.metal or row['base_metal'] == self.metal:
+                categories[row['category']] += row['count']
+            if not self.category or row['category'] == self.category:
+                metals[row['base_metal']] += row['count']
+
+        return {
+            'categories': [{'category': k, 'count': v} for k, v in sorted(categories.items())],
+            'metals': [{'base_metal': k, 'count': v} for k, v in sorted(metals.items())],
+            'price_ranges': PRICE_RANGES,
+        }
+
+    def prefetch_page(self, products):
+        """
+        Prefetch images, attributes and stock locations for the rendered page only,
+        and attach "frequently bought together" styles as product.bought_together.
+        """
+        products = list(products)
+        prefetch_related_objects(
+            products,
+            Prefetch('images', queryset=ProductImage.objects.filter(is_primary=True).order_by('display_order')),
+            'attributes',
+            'inventory_entries__store',
+        )
+
+        recommendations = frequently_bought_together(self.company, [p.style_code for p in products])
+        for product in products:
+            product.bought_together = recommendations.get(product.style_code, [])
+        return products
@@ -0,0 +1,31 @@
+"""
+Celery tasks for stock module.
+Handles scheduled batch jobs over product data.
+"""
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_trending_scores(company_id=None):
+    """
+    Recompute Product.trending_score from recent sales velocity.
+    Run nightly via Celery Beat; pass company_id to refresh a single company.
+    """
+    from apps.core.models import Company
+    from apps.stock.trending import update_trending_scores
+    
+    companies = Company.objects.filter(is_active=True, is_deleted=False)
+    if company_id:
+        companies = companies.filter(id=company_id)
+    
+    updated = {}
+    for company in companies:
+        try:
+            updated[company.id] = update_trending_scores(company)
+        except Exception as e:
+            logger.error(f"Trending score refresh failed for company {company.id}: {e}")
+    
+    return {'updated': updated}
@@ -0,0 +1,203 @@
+"""
+Inter-store transfer planning.
+Matches overstocked locations with understocked ones for the same style, using the
+precomputed ReplenishmentSuggestion table, and emits draft StockTransfer batches.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from apps.analytics.models import ReplenishmentSuggestion, LocationAlias
+from apps.analytics.replenishment import TARGET_COVER_DAYS
+from apps.core.models import Company
+from apps.core.sequences import allocate_block
+from .models import Product, StockTransfer, TransferItem
+
+logger = logging.getLogger(__name__)
+
+# A location holding more than this many days of sales can give stock away
+OVERSTOCK_COVER_DAYS = 120
+
+PLAN_NOTE = "Proposed by transfer planner"
+
+
+def plan_moves(suggestions, keep_cover_days=TARGET_COVER_DAYS, overstock_cover_days=OVERSTOCK_COVER_DAYS):
+    """
+    Greedy matching of surplus to need, per style, for the whole network at once.
+
+    Donors keep keep_cover_days of their own sales and give away the rest when their
+    cover exceeds overstock_cover_days (or nothing sells there). Receivers ask for their
+    suggested reorder quantity. Within each style the largest surpluses fill the most
+    urgent needs first; the matching is done by overlapping cumulative quantity ranges
+    instead of a Python loop.
+
+    Args:
+        suggestions: DataFrame with location, style, daily_velocity, on_hand,
+                     days_of_cover (NaN when nothing sells) and suggested_qty
+
+    Returns:
+        DataFrame with style, source, destination, quantity
+    """
+    columns = ['style', 'source', 'destination', 'quantity']
+    if suggestions.empty:
+        return pd.DataFrame(columns=columns)
+
+    df = suggestions.copy()
+    keep = np.ceil(df['daily_velocity'].to_numpy(dtype=float) * keep_cover_days)
+    cover = df['days_of_cover'].to_numpy(dtype=float)
+    overstocked = np.isnan(cover) | (cover > overstock_cover_days)
+    df['surplus'] = np.where(overstocked, np.clip(df['on_hand'].to_numpy() - keep, 0, None), 0).astype(int)
+
+    donors = df[df['surplus'] > 0].sort_values(['style', 'surplus'], ascending=[True, False])
+    receivers = df[df['suggested_qty'] > 0].sort_values(['style', 'days_of_cover'])
+    if donors.empty or receivers.empty:
+        return pd.DataFrame(columns=columns)
+
+    donors = donors.assign(end=donors.groupby('style')['surplus'].cumsum())
+    donors['start'] = donors['end'] - donors['surplus']
+    receivers = receivers.assign(end=receivers.groupby('style')['suggested_qty'].cumsum())
+    receivers['start'] = receivers['end'] - receivers['suggested_qty']
+
+    pairs = donors[['style', 'location', 'start', 'end']].merge(
+        receivers[['style', 'location', 'start', 'end']], on='style', suffixes=('_d', '_r')
+    )
+    pairs['quantity'] = (
+        np.minimum(pairs['end_d'], pairs['end_r']) - np.maximum(pairs['start_d'], pairs['start_r'])
+    ).clip(lower=0)
+    pairs = pairs[pairs['quantity'] > 0].rename(columns={'location_d': 'source', 'location_r': 'destination'})
+
+    return pairs[columns].reset_index(drop=True)
+
+
+def _linked_stores(company):
+    """Location alias -> active Store it is linked to"""
+    return {
+        alias.alias: alias.store
+        for alias in LocationAlias.objects.filter(company=company, store__is_active=True).select_related('store')
+    }
+
+
+def _style_products(company, styles):
+    """Style code -> active Product"""
+    products = {}
+    for product in Product.objects.filter(company=company, is_active=True, style_code__in=styles).order_by('-id'):
+        products[product.style_code] = product
+    return products
+
+
+def load_suggestions(company):
+    """
+    Style-level rows of the precomputed replenishment table as a DataFrame.
+    Only locations linked to an active store and styles with a product are kept, so the
+    matching never allocates stock to moves that cannot become transfers.
+    """
+    rows = ReplenishmentSuggestion.objects.filter(company=company, level='style').values_list(
+        'location', 'key', 'daily_velocity', 'on_hand', 'days_of_cover', 'suggested_qty'
+    )
+    df = pd.DataFrame.from_records(
+        list(rows), columns=['location', 'style', 'daily_velocity', 'on_hand', 'days_of_cover', 'suggested_qty']
+    )
+    df = df[df['location'].isin(_linked_stores(company).keys())]
+    df = df[df['style'].isin(_style_products(company, df['style'].unique().tolist()).keys())]
+    df['daily_velocity'] = df['daily_velocity'].astype(float)
+    df['days_of_cover'] = df['days_of_cover'].astype(float)
+    return df.reset_index(drop=True)
+
+
+def resolve_moves(company, moves, store=None):
+    """
+    Attach source/destination stores (via LocationAlias) and products to planned moves.
+    Moves whose locations are not linked to stores, whose style has no product, or that stay
+    within one store are dropped; with store, only moves from or to that store are kept.
+    """
+    stores = _linked_stores(company)
+    products = _style_products(company, moves['style'].unique().tolist())
+
+    moves = moves.assign(
+        source_store=moves['source'].map(stores),
+        destination_store=moves['destination'].map(stores),
+        product=moves['style'].map(products),
+    ).dropna(subset=['source_store', 'destination_store', 'product'])
+
+    source_ids = moves['source_store'].map(lambda s: s.id)
+    destination_ids = moves['destination_store'].map(lambda s: s.id)
+    keep = source_ids != destination_ids
+    if store is not None:
+        keep &= (source_ids == store.id) | (destination_ids == store.id)
+    return moves[keep]
+
+
+def create_draft_transfers(company, user, moves, store=None):
+    """
+    Emit one draft StockTransfer per (source, destination) pair, in bulk.
+
+    A route that already has an open planner draft gets that draft's lines replaced rather than
+    a second draft, so re-running the planner (or a double submit) never duplicates transfers.
+    ISO numbers are reserved as one block from the document sequence, for new routes only.
+
+    Args:
+        store: Only create transfers from or to this store (a store manager's own)
+
+    Returns:
+        List of created or refreshed StockTransfer objects
+    """
+    moves = resolve_moves(company, moves, store)
+    if moves.empty:
+        return []
+
+    routes = [(key, lines) for key, lines in moves.groupby(
+        [moves['source_store'].map(lambda s: s.id), moves['destination_store'].map(lambda s: s.id)], sort=False
+    )]
+    today = timezone.localdate().strftime('%Y%m%d')
+
+    with transaction.atomic():
+        # Concurrent planner runs of a company wait here, so the second one sees the first one's drafts
+        list(Company.objects.select_for_update().filter(pk=company.pk).values_list('pk', flat=True))
+        open_drafts = {
+            (t.source_store_id, t.destination_store_id): t
+            for t in StockTransfer.objects.filter(company=company, status='draft', notes=PLAN_NOTE)
+        }
+        new_routes = [key for key, _ in routes if key not in open_drafts]
+        numbers = iter(allocate_block(company, 'ISO', today, size=len(new_routes)) if new_routes else [])
+
+        transfers, created, refreshed = [], [], []
+        for key, lines in routes:
+            transfer = open_drafts.get(key)
+            if transfer is not None:
+                refreshed.append(transfer.id)
+            else:
+                transfer = StockTransfer(
+                    company=company,
+                    iso_number=f"ISO-{company.company_code}-{today}-{next(numbers):04d}",
+                    source_store=lines['source_store'].iloc[0],
+                    destination_store=lines['destination_store'].iloc[0],
+                    requested_by=user,
+                    status='draft',
+                    notes=PLAN_NOTE,
+                )
+                created.append(transfer)
+            transfers.append(transfer)
+        StockTransfer.objects.bulk_create(created, batch_size=500)
+
+        # Not every backend returns primary keys from bulk inserts - look them up by ISO number
+        ids = dict(StockTransfer.objects.filter(
+            iso_number__in=[t.iso_number for t in created]
+        ).values_list('iso_number', 'id'))
+        for t in created:
+            t.id = ids[t.iso_number]
+
+        TransferItem.objects.filter(transfer_id__in=refreshed).delete()
+        items = []
+        for t, (_, lines) in zip(transfers, routes):
+            for line in lines.itertuples(index=False):
+                items.append(TransferItem(transfer_id=t.id, product=line.product, quantity_requested=int(line.quantity)))
+        TransferItem.objects.bulk_create(items, batch_size=500)
+
+    logger.info(
+        f"Transfer planner created {len(created)} and refreshed {len(refreshed)} drafts "
+        f"with {len(items)} lines for company {company.id}"
+    )
+    return transfers
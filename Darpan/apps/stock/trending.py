@@ -0,0 +1,89 @@
+"""
+Trending score computation for Products.
+Turns recent SalesRecord demand into Product.trending_score so the default
+"Trending" sort needs no work at query time.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from django.utils import timezone
+
+from apps.analytics.models import SalesRecord
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Sales older than this contribute nothing to the score
+LOOKBACK_DAYS = 180
+
+# A sale loses half its weight every HALF_LIFE_DAYS
+HALF_LIFE_DAYS = 14
+
+# trending_score is an integer - keep two decimals of decayed quantity
+SCORE_SCALE = 100
+
+
+def style_velocity(company, as_of=None, lookback_days=LOOKBACK_DAYS, half_life_days=HALF_LIFE_DAYS):
+    """
+    Time-decayed sales velocity per style code.
+
+    Each sold piece is weighted by 0.5 ** (age_days / half_life_days); return lines subtract
+    their weighted quantity, and a style's velocity never goes below zero.
+
+    Args:
+        company: Company object
+        as_of: Date the decay is measured from (defaults to today)
+        lookback_days: Window of sales history to read
+        half_life_days: Decay half-life in days
+
+    Returns:
+        pandas Series of decayed quantity indexed by style_code
+    """
+    as_of = as_of or timezone.localdate()
+    rows = SalesRecord.objects.filter(
+        company=company,
+        transaction_type__in=['sale', 'return'],
+        transaction_date__gt=as_of - timedelta(days=lookback_days),
+        transaction_date__lte=as_of,
+    ).exclude(style_code='').values_list('style_code', 'transaction_date', 'transaction_type', 'quantity')
+
+    df = pd.DataFrame.from_records(list(rows), columns=['style_code', 'date', 'type', 'qty'])
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    age_days = (pd.Timestamp(as_of) - pd.to_datetime(df['date'])).dt.days.to_numpy()
+    qty = df['qty'].to_numpy(dtype=float)
+    # Return quantities are stored as they appear in the file, with or without a minus sign
+    qty = np.where(df['type'].to_numpy() == 'return', -np.abs(qty), qty)
+    df['weight'] = qty * np.power(0.5, age_days / half_life_days)
+
+    return df.groupby('style_code')['weight'].sum().clip(lower=0)
+
+
+def update_trending_scores(company, as_of=None):
+    """
+    Recompute Product.trending_score for every product of a company.
+
+    Products are matched to sales by style_code; products without recent
+    sales drop to zero. Only changed rows are written, in one bulk update.
+
+    Returns:
+        Number of products updated
+    """
+    velocity = style_velocity(company, as_of=as_of)
+    scores = (velocity * SCORE_SCALE).round().astype(int).to_dict()
+
+    changed = []
+    for product in Product.objects.filter(company=company).only('id', 'style_code', 'trending_score'):
+        score = scores.get(product.style_code, 0) if product.style_code else 0
+        if product.trending_score != score:
+            product.trending_score = score
+            changed.append(product)
+
+    if changed:
+        Product.objects.bulk_update(changed, ['trending_score'], batch_size=500)
+
+    logger.info(f"Trending scores updated for company {company.id}: {len(changed)} products changed")
+    return len(changed)
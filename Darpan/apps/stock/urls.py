@@ -17,5 +17,6 @@ urlpatterns = [
     path('create/', views.TransferCreateView.as_view(), name='transfer_create'),
     path('<int:pk>/', views.TransferDetailView.as_view(), name='transfer_detail'),
     path('<int:pk>/action/', views.TransferActionView.as_view(), name='transfer_action'),
+    path('plan/', views.TransferPlanView.as_view(), name='transfer_plan'),
     path('quick-request/', views.QuickTransferRequestView.as_view(), name='quick_request'),
 ]
@@ -4,16 +4,17 @@ Views for Stock Transfer module.
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, DetailView, CreateView, View
 from django.urls import reverse_lazy
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count, Prefetch
 from django.db import transaction
 
-from .models import Product, StockTransfer, TransferItem, Inventory, ProductImage, ProductAttribute
+from .models import Product, StockTransfer, TransferItem, Inventory
 from .forms import ProductForm, StockTransferForm, TransferItemFormSet, ReceiveFormSet
+from .search import ProductSearch
+from . import transfer_planner
 from apps.core.utils import log_audit_action
 
 # --- Product Views ---
@@ -48,82 +49,27 @@ class AdvancedProductSearchView(LoginRequiredMixin, ListView):
     paginate_by = 24
 
     def get_queryset(self):
-        qs = Product.objects.filter(
-            company=self.request.user.company,
-            is_active=True
-        ).select_related('company').prefetch_related(
-            Prefetch('images', queryset=ProductImage.objects.filter(is_primary=True).order_by('display_order')),
-            'attributes',
-            'inventory_entries__store'
-        )
-
-        # Search query
-        query = self.request.GET.get('q', '').strip()
-        if query:
-            qs = qs.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query) |
-                Q(style_code__icontains=query) |
-                Q(sku__icontains=query) |
-                Q(tags__icontains=query)
-            )
+        self.search = ProductSearch(self.request.user.company, self.request.GET)
+        return self.search.queryset()
 
-        # Faceted filters
-        category = self.request.GET.get('category')
-        if category:
-            qs = qs.filter(category=category)
-
-        metal = self.request.GET.get('metal')
-        if metal:
-            qs = qs.filter(base_metal=metal)
-
-        # Price range filters
-        min_price = self.request.GET.get('price_min')
-        if min_price:
-            try:
-                qs = qs.filter(sale_price__gte=float(min_price))
-            except ValueError:
-                pass
-
-        max_price = self.request.GET.get('price_max')
-        if max_price:
-            try:
-                qs = qs.filter(sale_price__lte=float(max_price))
-            except ValueError:
-                pass
-
-        # Sorting
-        sort = self.request.GET.get('sort', '-trending_score')
-        if sort in ['-trending_score', 'name', '-sale_price', 'sale_price', '-created_at']:
-            qs = qs.order_by(sort)
-
-        return qs
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        # Prefetch related rows for the products on this page only
+        page.object_list = self.search.prefetch_page(page.object_list)
+        return paginator, page, page.object_list, is_paginated
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Facets for filters
-        all_products = Product.objects.filter(
-            company=self.request.user.company,
-            is_active=True
-        )
-
-        context['facets'] = {
-            'categories': all_products.values('category').annotate(count=Count('id')).order_by('category'),
-            'metals': all_products.values('base_metal').annotate(count=Count('id')).order_by('base_metal'),
-            'price_ranges': [
-                {'label': 'Under ₹10k', 'min': 0, 'max': 10000},
-                {'label': '₹10k - ₹50k', 'min': 10000, 'max': 50000},
-                {'label': '₹50k - ₹1L', 'min': 50000, 'max': 100000},
-                {'label': 'Above ₹1L', 'min': 100000, 'max': None},
-            ]
-        }
+        # Facet counts reflect the current search and filters
+        context['facets'] = self.search.facets()
 
         context['current_filters'] = {
             'q': self.request.GET.get('q', ''),
+            'tag': self.request.GET.get('tag', ''),
             'category': self.request.GET.get('category', ''),
             'metal': self.request.GET.get('metal', ''),
-            'sort': self.request.GET.get('sort', '-trending_score'),
+            'sort': self.search.sort,
         }
 
         return context
@@ -280,6 +226,66 @@ class TransferActionView(LoginRequiredMixin, View):
         log_audit_action(request, action, f"{action.title()} ISO {transfer.iso_number}", 'stock_transfer', transfer.id)
         return redirect('stock:transfer_detail', pk=pk)
 
+class TransferPlanView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Network-wide transfer proposals: overstocked locations to understocked ones, per style.
+    GET previews the plan, POST creates the draft ISOs in bulk. Store managers only see and
+    create the transfers from or to their own store.
+    """
+    template_name = 'stock/transfer_plan.html'
+    
+    def test_func(self):
+        user = self.request.user
+        return user.is_superuser or user.has_any_role(['admin', 'platform_admin']) or (
+            bool(user.store_id) and user.has_any_role(['store_manager'])
+        )
+    
+    def get_store(self):
+        """None for admins (the whole network), else the store manager's own store"""
+        user = self.request.user
+        if user.is_superuser or user.has_any_role(['admin', 'platform_admin']):
+            return None
+        return user.store
+    
+    def get_moves(self):
+        company = self.request.user.company
+        moves = transfer_planner.plan_moves(transfer_planner.load_suggestions(company))
+        return transfer_planner.resolve_moves(company, moves, self.get_store())
+    
+    def get(self, request):
+        moves = self.get_moves()
+        routes = []
+        for _, lines in moves.groupby(
+            [moves['source_store'].map(lambda s: s.id), moves['destination_store'].map(lambda s: s.id)], sort=False
+        ):
+            routes.append({
+                'source': lines['source_store'].iloc[0],
+                'destination': lines['destination_store'].iloc[0],
+                'lines': [
+                    {'style': l.style, 'product': l.product, 'quantity': int(l.quantity)}
+                    for l in lines.itertuples(index=False)
+                ],
+                'total_qty': int(lines['quantity'].sum()),
+            })
+        return render(request, self.template_name, {
+            'routes': routes,
+            'total_qty': sum(r['total_qty'] for r in routes),
+            'overstock_days': transfer_planner.OVERSTOCK_COVER_DAYS,
+        })
+    
+    def post(self, request):
+        company = request.user.company
+        moves = transfer_planner.plan_moves(transfer_planner.load_suggestions(company))
+        transfers = transfer_planner.create_draft_transfers(company, request.user, moves, self.get_store())
+        
+        if transfers:
+            log_audit_action(request, 'create', f"Created or refreshed {len(transfers)} planned transfer drafts", 'stock_transfer')
+            messages.success(request, f"{len(transfers)} draft transfers created or refreshed. Review and submit them from My Requests.")
+        else:
+            messages.info(request, "No transfers to propose right now.")
+        return redirect('stock:transfer_list')
+
+
 class QuickTransferRequestView(LoginRequiredMixin, View):
     def post(self, request):
         inventory_id = request.POST.get('inventory_id')
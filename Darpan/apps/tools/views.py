@@ -7,6 +7,7 @@ from django.views.generic import TemplateView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Q, Max
 from apps.analytics.models import StockSnapshot
+from apps.analytics.recommendations import frequently_bought_together
 
 logger = logging.getLogger(__name__)
 
@@ -211,6 +212,11 @@ class StockLookupView(LoginRequiredMixin, StockAccessRequiredMixin, ListView):
                     'diamond_pieces': item.diamond_pieces or 0,
                 })
             
+            # Frequently bought together, read from the precomputed co-purchase table
+            recommendations = frequently_bought_together(company, list(grouped.keys()))
+            for style, group in grouped.items():
+                group['bought_together'] = recommendations.get(style, [])
+            
             context['grouped_items'] = list(grouped.values())
             
         except Exception as e:
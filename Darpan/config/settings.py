@@ -308,6 +308,47 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# Scheduled batch jobs (requires a running `celery beat`)
+try:
+    from celery.schedules import crontab
+    CELERY_BEAT_SCHEDULE = {
+        'refresh-trending-scores': {
+            'task': 'apps.stock.tasks.refresh_trending_scores',
+            'schedule': crontab(hour=2, minute=0),
+        },
+        'rebuild-recommendations': {
+            'task': 'apps.analytics.tasks.rebuild_recommendations',
+            'schedule': crontab(hour=3, minute=0, day_of_week='sunday'),
+        },
+        'refresh-replenishment': {
+            'task': 'apps.analytics.tasks.refresh_replenishment',
+            'schedule': crontab(hour=2, minute=30),
+        },
+        'refresh-sales-forecasts': {
+            'task': 'apps.analytics.tasks.refresh_sales_forecasts',
+            'schedule': crontab(hour=3, minute=15),
+        },
+        'refresh-rfm-segments': {
+            'task': 'apps.analytics.tasks.refresh_rfm_segments',
+            'schedule': crontab(hour=3, minute=30),
+        },
+        'rebuild-sales-rollups': {
+            'task': 'apps.analytics.tasks.rebuild_sales_rollups',
+            'schedule': crontab(hour=4, minute=0, day_of_week='sunday'),
+        },
+        'rebuild-customer-profiles': {
+            'task': 'apps.analytics.tasks.rebuild_customer_profiles',
+            'schedule': crontab(hour=4, minute=30, day_of_week='sunday'),
+        },
+        'rebuild-cohorts': {
+            'task': 'apps.analytics.tasks.rebuild_cohorts',
+            'schedule': crontab(hour=5, minute=0, day_of_week='sunday'),
+        },
+    }
+except ImportError:
+    # Celery not installed - scheduled jobs are unavailable
+    CELERY_BEAT_SCHEDULE = {}
+
 
 # ============================================
 # GROQ AI CONFIGURATION
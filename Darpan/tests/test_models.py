@@ -46,3 +46,626 @@ class CompanyModelTest(TestCase):
         )
         self.assertEqual(company.name, 'Test Company')
         self.assertEqual(company.code, 'TEST')
+
+
+class DocumentSequenceTest(TestCase):
+    """Test cases for the document number allocator."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.company = Company.objects.create(
+            name='Test Company',
+            company_code='TEST'
+        )
+    
+    def test_numbers_increment_per_period(self):
+        """Test numbers are sequential within a period and restart in a new one."""
+        from apps.core.sequences import next_number
+        self.assertEqual(next_number(self.company, 'ISO', '20250101'), 1)
+        self.assertEqual(next_number(self.company, 'ISO', '20250101'), 2)
+        self.assertEqual(next_number(self.company, 'ISO', '20250102'), 1)
+    
+    def test_block_allocation(self):
+        """Test a block reserves contiguous numbers."""
+        from apps.core.sequences import allocate_block, next_number
+        self.assertEqual(list(allocate_block(self.company, 'PO', '2025', size=3)), [1, 2, 3])
+        self.assertEqual(next_number(self.company, 'PO', '2025'), 4)
+    
+    def test_seed_used_only_on_first_allocation(self):
+        """Test the seed callable continues numbering after existing documents."""
+        from apps.core.sequences import next_number
+        self.assertEqual(next_number(self.company, 'BOS/S1', '2025', seed=lambda: 41), 42)
+        self.assertEqual(next_number(self.company, 'BOS/S1', '2025', seed=lambda: 99), 43)
+
+
+class KeysetPaginatorTest(TestCase):
+    """Test cases for keyset pagination."""
+    
+    def setUp(self):
+        """Set up test data: 7 sales over 3 days."""
+        from datetime import date
+        from apps.analytics.models import SalesRecord
+        self.company = Company.objects.create(
+            name='Test Company',
+            company_code='TEST'
+        )
+        for i in range(7):
+            SalesRecord.objects.create(company=self.company, transaction_date=date(2025, 1, 1 + i % 3))
+        self.queryset = SalesRecord.objects.filter(company=self.company)
+        self.expected = list(self.queryset.order_by('-transaction_date', '-id').values_list('id', flat=True))
+    
+    def test_pages_walk_forward_and_back(self):
+        """Test next pages cover every row once and prev returns the same page."""
+        from apps.core.pagination import KeysetPaginator
+        paginator = KeysetPaginator(self.queryset, 3, ('-transaction_date', '-id'))
+        
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        third = paginator.page(second.next_cursor)
+        seen = [r.id for page in (first, second, third) for r in page]
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+        
+        back = paginator.page(third.previous_cursor, 'prev')
+        self.assertEqual([r.id for r in back], [r.id for r in second])
+        self.assertEqual(paginator.count, 7)
+    
+    def test_bad_cursor_returns_first_page(self):
+        """Test a malformed cursor falls back to the first page."""
+        from apps.core.pagination import KeysetPaginator
+        page = KeysetPaginator(self.queryset, 3, ('-transaction_date', '-id')).page('not-a-cursor')
+        self.assertEqual([r.id for r in page], self.expected[:3])
+    
+    def test_prev_from_first_row_returns_first_page(self):
+        """Test a backward page with nothing before the cursor falls back to the first page."""
+        from apps.core.pagination import KeysetPaginator
+        paginator = KeysetPaginator(self.queryset, 3, ('-transaction_date', '-id'))
+        page = paginator.page(paginator.cursor_for(paginator.page().object_list[0]), 'prev')
+        self.assertEqual([r.id for r in page], self.expected[:3])
+        self.assertFalse(page.has_previous())
+        self.assertIsNotNone(page.next_cursor)
+        
+        self.queryset.delete()
+        empty = paginator.page(page.next_cursor, 'prev')
+        self.assertEqual(len(empty), 0)
+        self.assertIsNone(empty.next_cursor)
+        self.assertIsNone(empty.previous_cursor)
+
+
+class PeriodComparisonTest(TestCase):
+    """Test cases for period-over-period comparisons."""
+    
+    def setUp(self):
+        """Set up test data: rollup rows in two Septembers."""
+        from datetime import date
+        from apps.analytics.models import DailySalesRollup
+        self.company = Company.objects.create(
+            name='Test Company',
+            company_code='TEST'
+        )
+        for day, region, revenue in [(date(2025, 9, 5), 'Pune', 100), (date(2026, 9, 5), 'Pune', 150), (date(2026, 9, 6), 'Delhi', 80)]:
+            DailySalesRollup.objects.create(company=self.company, date=day, region=region, revenue=revenue, sale_count=1)
+        self.rollup = DailySalesRollup.objects.filter(company=self.company)
+    
+    def test_comparison_windows(self):
+        """Test month and year shifts clamp to the month end and previous is the span just before."""
+        from datetime import date
+        from apps.analytics.comparisons import comparison_window
+        self.assertEqual(comparison_window((date(2026, 3, 31), date(2026, 3, 31)), 'month'), (date(2026, 2, 28), date(2026, 2, 28)))
+        self.assertEqual(comparison_window((date(2024, 2, 29), date(2024, 3, 1)), 'year'), (date(2023, 2, 28), date(2023, 3, 1)))
+        self.assertEqual(comparison_window((date(2026, 9, 1), date(2026, 9, 10)), 'previous'), (date(2026, 8, 22), date(2026, 8, 31)))
+    
+    def test_growth_by_location(self):
+        """Test deltas and growth per location, with no growth where the comparison window is empty."""
+        from datetime import date
+        from apps.analytics.comparisons import compare_periods
+        rows, totals = compare_periods(
+            self.rollup, (date(2026, 9, 1), date(2026, 9, 30)), (date(2025, 9, 1), date(2025, 9, 30)), by='location'
+        )
+        by_key = {r['key']: r for r in rows}
+        self.assertEqual(by_key['Pune']['delta']['revenue'], 50)
+        self.assertEqual(by_key['Pune']['growth']['revenue'], 50.0)
+        self.assertIsNone(by_key['Delhi']['growth']['revenue'])
+        self.assertEqual(totals['current']['revenue'], 230)
+        self.assertEqual(totals['previous']['revenue'], 100)
+
+
+class ExportTest(TestCase):
+    """Test cases for streaming CSV / XLSX exports."""
+    
+    def test_csv_streams_rows(self):
+        """Test the CSV response is streamed line by line with a UTF-8 BOM."""
+        from apps.analytics.exports import stream_csv
+        response = stream_csv('sales', ['style', 'qty'], iter([('S1', 2), ('S2', 3)]))
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content).decode('utf-8'), '\ufeffstyle,qty\r\nS1,2\r\nS2,3\r\n')
+    
+    def test_xlsx_rolls_over_to_new_sheet(self):
+        """Test long XLSX exports continue on a new sheet, each with the header row."""
+        import io
+        from unittest import mock
+        from openpyxl import load_workbook
+        from apps.analytics import exports
+        with mock.patch.object(exports, 'XLSX_SHEET_ROWS', 2):
+            response = exports.stream_xlsx('sales', ['style', 'qty'], iter([('S1', 1), ('S2', 2), ('S3', 3)]), 'Sales')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.sheetnames, ['Sales', 'Sales (2)'])
+        self.assertEqual([list(r) for r in workbook['Sales (2)'].values], [['style', 'qty'], ['S3', 3]])
+
+
+class TimeSeriesTest(TestCase):
+    """Test cases for trend downsampling."""
+    
+    def test_bucket_counts(self):
+        """Test buckets touched by a range at each grain."""
+        from datetime import date
+        from apps.analytics.timeseries import bucket_count
+        start, end = date(2025, 12, 28), date(2026, 1, 5)  # Sunday to the next Monday
+        self.assertEqual(bucket_count(start, end, 'day'), 9)
+        self.assertEqual(bucket_count(start, end, 'week'), 3)
+        self.assertEqual(bucket_count(start, end, 'month'), 2)
+        self.assertEqual(bucket_count(start, end, 'quarter'), 2)
+        self.assertEqual(bucket_count(start, end, 'year'), 2)
+    
+    def test_grain_fits_point_budget(self):
+        """Test the finest grain within the budget is picked."""
+        from datetime import date
+        from apps.analytics.timeseries import pick_grain
+        self.assertEqual(pick_grain(date(2026, 1, 1), date(2026, 2, 28), 60), 'day')
+        self.assertEqual(pick_grain(date(2026, 1, 1), date(2026, 6, 30), 60), 'week')
+        self.assertEqual(pick_grain(date(2022, 1, 1), date(2026, 6, 30), 60), 'month')
+        self.assertEqual(pick_grain(date(2016, 1, 1), date(2026, 6, 30), 60), 'quarter')
+        self.assertEqual(pick_grain(date(1900, 1, 1), date(2026, 6, 30), 60), 'year')
+
+
+class DistinctSketchTest(TestCase):
+    """Test cases for HyperLogLog distinct-count sketches."""
+    
+    def test_small_sets_are_exact(self):
+        """Test small sets count exactly and blanks are ignored."""
+        from apps.analytics.sketches import build_sketch, merge, estimate
+        self.assertEqual(estimate(merge([build_sketch(['a', 'b', 'b', 'c', ''])])), 3)
+        self.assertEqual(estimate(merge([build_sketch([])])), 0)
+    
+    def test_merge_estimates_union(self):
+        """Test merged sketches estimate the union within the error bound."""
+        from apps.analytics.sketches import build_sketch, merge, estimate, STANDARD_ERROR
+        first = build_sketch(f'9{i:09d}' for i in range(30000))
+        second = build_sketch(f'9{i:09d}' for i in range(20000, 50000))
+        self.assertLess(abs(estimate(merge([first, second])) - 50000), 50000 * STANDARD_ERROR * 3)
+
+
+class ImportProfileTest(TestCase):
+    """Test cases for import data-quality profiling."""
+    
+    def test_profile_flags_bad_values(self):
+        """Test the profile reports unparsed dates, bad amounts and weights, and outliers."""
+        import pandas as pd
+        from apps.analytics.profiling import profile_frame, profile_issues
+        df = pd.DataFrame({
+            'transaction_date': ['01-10-2026'] * 29 + ['31-31-2026'],
+            'revenue': ['1,000'] * 28 + ['0', '9,00,00,000'],
+            'gross_weight': [5] * 29 + [-2],
+            'region': ['Pune', 'Delhi'] * 14 + ['', None],
+        })
+        profile = profile_frame(df, 'sales')
+        self.assertEqual(profile['dates'], {'from': '2026-10-01', 'to': '2026-10-01', 'unparsed': 1})
+        self.assertEqual(profile['amounts']['revenue'], {'zero': 1, 'negative': 0})
+        self.assertEqual(profile['weights']['gross_weight']['rows'], [31])
+        self.assertEqual(profile['outliers']['revenue']['rows'], [31])
+        self.assertEqual(profile['distinct']['region'], 2)
+        self.assertAlmostEqual(profile['nulls']['region'], 6.7)
+        self.assertEqual(len(profile_issues(profile)), 4)
+    
+    def test_sales_import_profiles_imported_lines_only(self):
+        """Test ignored lines are left out of the profile and return lines out of its amount checks."""
+        import io
+        from apps.analytics.flexible_importer import FlexibleImporter
+        from apps.analytics.models import ImportLog
+        company = Company.objects.create(name='Profile Co', company_code='PROFILE')
+        user = User.objects.create_user(email='profile@example.com', password='x', company=company, full_name='Profile')
+        data = io.BytesIO(
+            b'TransactionNo,Transaction Date,JewelCode,Location,Gross Amount after discount\n'
+            b'FF/1,01-10-2026,J1,Pune,1000\n'
+            b'FF/2,01-10-2026,J2,Pune,1200\n'
+            b'7DE/3,01-10-2026,J1,Pune,-1000\n'
+            b'RI/4,not a date,J9,Warehouse,0\n'
+        )
+        data.name = 'sales.csv'
+        FlexibleImporter(company, user).import_sales(data)
+        profile = ImportLog.objects.get(company=company).profile
+        self.assertEqual(profile['rows'], 3)
+        self.assertEqual(profile['dates']['unparsed'], 0)
+        self.assertNotIn('amounts', profile)
+        self.assertEqual(profile['distinct']['region'], 1)
+
+
+class IdempotentImportTest(TestCase):
+    """Test cases for skipping identical re-uploads."""
+    
+    def setUp(self):
+        self.company = Company.objects.create(name='Hash Co', company_code='HASH')
+        self.user = User.objects.create_user(email='hash@example.com', password='x', company=self.company, full_name='Hash')
+    
+    def _upload(self, **kwargs):
+        import io
+        from apps.analytics.flexible_importer import FlexibleImporter
+        data = io.BytesIO(b'Jewel Code,Style Code,Location Name,Category,Qty,Sale Price\nJ1,S1,Pune,Ring,1,1000\n')
+        data.name = 'stock.csv'
+        return FlexibleImporter(self.company, self.user).import_stock(data, **kwargs)
+    
+    def test_identical_upload_skipped_unless_forced(self):
+        """Test a re-upload is short-circuited, while force or another stock date imports it."""
+        from datetime import date
+        self.assertEqual(self._upload(stock_date=date(2026, 10, 1))['rows_imported'], 1)
+        again = self._upload(stock_date=date(2026, 10, 1))
+        self.assertTrue(again['already_imported'])
+        self.assertEqual(again['previous_import']['rows_imported'], 1)
+        self.assertFalse(self._upload(stock_date=date(2026, 10, 1), force=True).get('already_imported'))
+        self.assertFalse(self._upload(stock_date=date(2026, 10, 2)).get('already_imported'))
+    
+    def test_undated_upload_on_a_later_day_is_imported(self):
+        """Test an unchanged stock file without a stock date is still taken as the next day's snapshot."""
+        from datetime import datetime, timezone as tz
+        from unittest import mock
+        from apps.analytics.models import StockSnapshot
+        for day in (1, 1, 2):
+            with mock.patch('django.utils.timezone.now', return_value=datetime(2026, 10, day, 12, tzinfo=tz.utc)):
+                self._upload()
+        self.assertEqual(sorted(StockSnapshot.objects.values_list('snapshot_date__day', flat=True)), [1, 2])
+
+
+class CombinedInsightsTest(TestCase):
+    """Test cases for CRM / sales customer matching."""
+    
+    def test_contact_without_mobile_does_not_hide_sales_customers(self):
+        """Test a CRM contact with no mobile is left out of the match counts."""
+        from datetime import date
+        from apps.analytics.models import CRMContact, SalesRecord
+        company = Company.objects.create(name='Insight Co', company_code='INSIGHT')
+        user = User.objects.create_user(email='insight@example.com', password='x', company=company, full_name='Insight', is_superuser=True)
+        CRMContact.objects.create(company=company, mobile='9800000001')
+        CRMContact.objects.create(company=company, mobile='')
+        for mobile in ['9800000001', '9800000002', '9800000003', '']:
+            SalesRecord.objects.create(company=company, transaction_date=date(2026, 10, 1), client_mobile=mobile, revenue=100)
+        self.client.force_login(user)
+        context = self.client.get('/analytics/reports/combined/').context
+        self.assertEqual(context['crm_total'], 1)
+        self.assertEqual(context['matched_customers'], 1)
+        self.assertEqual(context['sales_not_in_crm'], 2)
+        self.assertEqual(context['sales_customers'], 3)
+
+
+class ProductTagTest(TestCase):
+    """Test cases for the ProductTag side table and tag search."""
+    
+    def setUp(self):
+        from apps.stock.models import Product
+        self.company = Company.objects.create(name='Tag Co', company_code='TAG')
+        for sku, name, tags in [('A', 'Ring', ['Bridal']), ('B', 'Bridal set', []), ('C', 'Chain', ['bridalwear'])]:
+            Product.objects.create(company=self.company, sku=sku, name=name, tags=tags)
+    
+    def _skus(self, query):
+        from django.http import QueryDict
+        from apps.stock.search import ProductSearch
+        return sorted(ProductSearch(self.company, QueryDict(query)).queryset().values_list('sku', flat=True))
+    
+    def test_tags_sync_only_when_changed(self):
+        """Test tag edits reach ProductTag while a price edit issues just its own UPDATE."""
+        from apps.stock.models import Product
+        product = Product.objects.get(sku='A')
+        product.sale_price = 5000
+        with self.assertNumQueries(1):
+            product.save()
+        product.tags.append('Gold')
+        product.save()
+        self.assertEqual(sorted(product.tag_links.values_list('tag', flat=True)), ['bridal', 'gold'])
+    
+    def test_tag_filters_match_whole_tags(self):
+        """Test tag= matches whole tags only, and q= matches whole tags or text fields."""
+        self.assertEqual(self._skus('tag=Bridal'), ['A'])
+        self.assertEqual(self._skus('q=bridal'), ['A', 'B'])
+
+
+class TrendingVelocityTest(TestCase):
+    """Test cases for time-decayed style velocity."""
+    
+    def test_returns_subtract_whatever_their_sign(self):
+        """Test return lines reduce velocity whether the file stored their quantity as negative or positive."""
+        from datetime import date
+        from apps.analytics.models import SalesRecord
+        from apps.stock.trending import style_velocity
+        company = Company.objects.create(name='Trend Co', company_code='TREND')
+        for style, kind, qty in [('S1', 'sale', 4), ('S1', 'return', -1), ('S2', 'sale', 4), ('S2', 'return', 1)]:
+            SalesRecord.objects.create(company=company, transaction_date=date(2026, 10, 1), style_code=style,
+                                       transaction_type=kind, quantity=qty)
+        velocity = style_velocity(company, as_of=date(2026, 10, 1))
+        self.assertEqual(velocity.to_dict(), {'S1': 3.0, 'S2': 3.0})
+
+
+class ReplenishmentTest(TestCase):
+    """Test cases for velocity, days of cover and reorder quantities."""
+    
+    def test_sales_frame_nets_returns(self):
+        """Test return lines subtract from pieces sold whether stored negative or positive."""
+        from datetime import date
+        from apps.analytics.models import SalesRecord
+        from apps.analytics.replenishment import _sales_frame
+        company = Company.objects.create(name='Reorder Co', company_code='REORDER')
+        for kind, qty in [('sale', 10), ('return', -1), ('return', 1)]:
+            SalesRecord.objects.create(company=company, transaction_date=date(2026, 10, 1), region='Pune',
+                                       style_code='S1', transaction_type=kind, quantity=qty)
+        sales = _sales_frame(company, date(2026, 10, 1), 90)
+        self.assertEqual(sorted(sales['sold'].tolist()), [-1, -1, 10])
+    
+    def test_cover_and_suggested_quantity(self):
+        """Test days of cover and reorder quantities over a 90-day window with a 45-day target."""
+        import math
+        import pandas as pd
+        from apps.analytics.replenishment import compute_suggestions
+        sales = pd.DataFrame([('L1', 'S1', 'Ring', 9), ('L2', 'S1', 'Ring', 3)], columns=['location', 'style', 'category', 'sold'])
+        stock = pd.DataFrame([('L1', 'S1', 'Ring', 2), ('L1', 'S2', 'Chain', 5)], columns=['location', 'style', 'category', 'on_hand'])
+        rows = {(r.location, r.key): r for r in compute_suggestions(sales, stock, 90, 45).itertuples(index=False)}
+        self.assertAlmostEqual(rows['L1', 'S1'].days_of_cover, 20.0)
+        self.assertEqual(rows['L1', 'S1'].suggested_qty, 3)
+        self.assertTrue(math.isnan(rows['L1', 'S2'].days_of_cover))
+        self.assertEqual(rows['L1', 'S2'].suggested_qty, 0)
+        self.assertEqual(rows['L2', 'S1'].days_of_cover, 0)
+        self.assertEqual(rows['L2', 'S1'].suggested_qty, 2)
+
+
+class TransferPlannerTest(TestCase):
+    """Test cases for the inter-store transfer planner."""
+    
+    def setUp(self):
+        from apps.core.models import Store
+        from apps.analytics.models import LocationAlias, ReplenishmentSuggestion
+        from apps.stock.models import Product
+        self.company = Company.objects.create(name='Plan Co', company_code='PLAN')
+        self.user = User.objects.create_user(email='plan@example.com', password='x', company=self.company, full_name='Plan', is_superuser=True)
+        self.stores = {}
+        for name in ['A', 'B', 'C']:
+            self.stores[name] = Store.objects.create(company=self.company, name=name)
+            LocationAlias.objects.create(company=self.company, alias=f'{name}-LOC', store=self.stores[name])
+        LocationAlias.objects.create(company=self.company, alias='X-LOC')
+        Product.objects.create(company=self.company, name='Ring', sku='R1', style_code='S1')
+        # A has 10 spare pieces; the most urgent need is at a location not linked to a store
+        for location, on_hand, cover, suggested in [('A-LOC', 10, None, 0), ('X-LOC', 0, 1, 8), ('B-LOC', 0, 5, 5), ('C-LOC', 0, 10, 5)]:
+            ReplenishmentSuggestion.objects.create(
+                company=self.company, level='style', location=location, key='S1',
+                on_hand=on_hand, days_of_cover=cover, suggested_qty=suggested,
+            )
+    
+    def _routes(self):
+        from apps.stock.models import TransferItem
+        return sorted(TransferItem.objects.values_list(
+            'transfer__source_store__name', 'transfer__destination_store__name', 'quantity_requested'
+        ))
+    
+    def test_surplus_goes_to_linked_stores_only(self):
+        """Test unlinked locations are left out before matching, so their share goes to real stores."""
+        from apps.stock import transfer_planner
+        moves = transfer_planner.plan_moves(transfer_planner.load_suggestions(self.company))
+        self.assertEqual(sorted(map(tuple, moves.values.tolist())), [('S1', 'A-LOC', 'B-LOC', 5), ('S1', 'A-LOC', 'C-LOC', 5)])
+    
+    def test_replanning_refreshes_open_drafts(self):
+        """Test a second run reuses the open planner drafts and their ISO numbers."""
+        from apps.core.models import DocumentSequence
+        from apps.stock.models import StockTransfer
+        for _ in range(2):
+            self.client.force_login(self.user)
+            self.client.post('/stock/plan/')
+        self.assertEqual(StockTransfer.objects.count(), 2)
+        self.assertEqual(DocumentSequence.objects.get(prefix='ISO').last_value, 2)
+        self.assertEqual(self._routes(), [('A', 'B', 5), ('A', 'C', 5)])
+    
+    def test_store_manager_creates_own_store_transfers_only(self):
+        """Test a store manager's run only proposes transfers from or to their store."""
+        from apps.core.models import Role
+        manager = User.objects.create_user(email='c@example.com', password='x', company=self.company, full_name='C', store=self.stores['C'])
+        manager.roles.add(Role.objects.get_or_create(name='store_manager')[0])
+        self.client.force_login(manager)
+        self.assertEqual(len(self.client.get('/stock/plan/').context['routes']), 1)
+        self.client.post('/stock/plan/')
+        self.assertEqual(self._routes(), [('A', 'C', 5)])
+
+
+class PivotTest(TestCase):
+    """Test cases for whitelisted pivot queries."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.company = Company.objects.create(name='Pivot Co', company_code='PIVOT')
+    
+    def test_whitelist_errors(self):
+        """Test unknown sources, dimensions and measures and too many dimensions are refused."""
+        from django.http import QueryDict
+        from apps.analytics.pivot import parse_pivot
+        for query in ['source=orders', 'dimensions=month,colour', 'measures=revenue,profit',
+                      'source=stock&dimensions=month', 'dimensions=day,month,region,category']:
+            with self.assertRaises(ValueError):
+                parse_pivot(QueryDict(query))
+        self.assertEqual(parse_pivot(QueryDict('dimensions=month&dimensions=region,month')),
+                         {'source': 'sales', 'dimensions': ['month', 'region'], 'measures': ['revenue']})
+    
+    def test_cache_key_follows_params_and_imports(self):
+        """Test reordered parameters share a cached result, which a new import replaces."""
+        from datetime import date
+        from django.http import QueryDict
+        from apps.analytics.models import DailySalesRollup, ImportLog
+        from apps.analytics.pivot import cached_pivot
+        DailySalesRollup.objects.create(company=self.company, date=date(2026, 10, 1), category='Ring', revenue=100)
+        self.assertEqual(cached_pivot(self.company, QueryDict('measures=revenue&category=Ring'))['totals'], {'revenue': 100.0})
+        DailySalesRollup.objects.create(company=self.company, date=date(2026, 10, 2), category='Ring', revenue=50)
+        self.assertEqual(cached_pivot(self.company, QueryDict('category=Ring&measures=revenue'))['totals'], {'revenue': 100.0})
+        ImportLog.objects.create(company=self.company, file_type='sales', file_name='sales.csv')
+        self.assertEqual(cached_pivot(self.company, QueryDict('category=Ring&measures=revenue'))['totals'], {'revenue': 150.0})
+    
+    def test_stock_store_filter_uses_location_aliases(self):
+        """Test ?store= narrows the stock source to the locations linked to that store."""
+        from datetime import date
+        from django.http import QueryDict
+        from apps.core.models import Store
+        from apps.analytics.models import LocationAlias, StockAgeIndex
+        from apps.analytics.pivot import cached_pivot
+        store = Store.objects.create(company=self.company, name='Main')
+        LocationAlias.objects.create(company=self.company, alias='MAIN', store=store)
+        for code, location in [('J1', 'MAIN'), ('J2', 'MALL')]:
+            StockAgeIndex.objects.create(company=self.company, jewel_code=code, location=location, quantity=1,
+                                         first_seen=date(2026, 10, 1), last_seen=date(2026, 10, 1))
+        result = cached_pivot(self.company, QueryDict(f'source=stock&measures=qty&store={store.id}'))
+        self.assertEqual(result['totals'], {'qty': 1.0})
+
+
+class ChartCachingTest(TestCase):
+    """Test cases for conditional chart requests."""
+    
+    def test_etag_revalidates_until_next_import(self):
+        """Test a repeat request with the ETag gets 304, and a new import answers it afresh."""
+        from apps.analytics.models import ImportLog
+        company = Company.objects.create(name='Chart Co', company_code='CHART')
+        user = User.objects.create_user(email='chart@example.com', password='x', company=company, full_name='Chart', is_superuser=True)
+        self.client.force_login(user)
+        url = '/analytics/api/charts/sales-by-category/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ImportLog.objects.create(company=company, file_type='sales', file_name='sales.csv')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class StockAgeIndexTest(TestCase):
+    """Test cases for the stock age index."""
+    
+    def test_reimported_snapshot_drops_missing_pieces(self):
+        """Test pieces left out of a corrected snapshot no longer show as in stock."""
+        from datetime import date
+        from apps.analytics.models import StockSnapshot, StockAgeIndex
+        from apps.analytics.stock_ageing import update_stock_age_index
+        company = Company.objects.create(name='Age Co', company_code='AGE')
+        
+        def snapshot(day, codes):
+            StockSnapshot.objects.filter(company=company, snapshot_date=day).delete()
+            records = [StockSnapshot(company=company, jewel_code=code, style_code='S1', location='Main', quantity=day.month, snapshot_date=day)
+                       for code in codes]
+            StockSnapshot.objects.bulk_create(records)
+            update_stock_age_index(company, records)
+        
+        snapshot(date(2026, 9, 1), ['J1', 'J2'])
+        snapshot(date(2026, 10, 1), ['J1', 'J2', 'J3'])
+        snapshot(date(2026, 10, 1), ['J1'])
+        seen = {code: (last_seen, quantity) for code, last_seen, quantity in
+                StockAgeIndex.objects.filter(company=company).values_list('jewel_code', 'last_seen', 'quantity')}
+        self.assertEqual(seen, {'J1': (date(2026, 10, 1), 10), 'J2': (date(2026, 9, 1), 9)})
+
+
+class StoreScopedReportTest(TestCase):
+    """Test cases for store managers assigned to a store."""
+    
+    def setUp(self):
+        from apps.core.models import Role, Store
+        company = Company.objects.create(name='Scope Co', company_code='SCOPE')
+        self.store = Store.objects.create(company=company, name='Main Street')
+        self.other = Store.objects.create(company=company, name='Mall')
+        user = User.objects.create_user(email='manager@example.com', password='x', company=company, full_name='Manager', store=self.store)
+        user.roles.add(Role.objects.get_or_create(name='store_manager')[0])
+        self.client.force_login(user)
+    
+    def test_store_filter_is_pinned_to_own_store(self):
+        """Test a store-aware report always gets the manager's own store."""
+        response = self.client.get(f'/analytics/reports/sales/?store={self.other.id}')
+        self.assertEqual(response.context['current_filters'].getlist('store'), [str(self.store.id)])
+    
+    def test_company_wide_reports_are_closed(self):
+        """Test company-wide reports redirect to the store report and their downloads are refused."""
+        self.assertRedirects(self.client.get('/analytics/reports/combined/'), '/analytics/reports/store/')
+        self.assertEqual(self.client.get('/analytics/reports/export/customers/').status_code, 403)
+        self.assertEqual(self.client.get('/analytics/reports/export/stock/').status_code, 200)
+    
+    def test_sales_record_export_is_limited_to_own_store(self):
+        """Test the raw sales export holds only the manager's store and is closed to users without a report role."""
+        from datetime import date
+        from apps.analytics.models import SalesRecord
+        for store, mobile in [(self.store, '9800000001'), (self.other, '9800000002')]:
+            SalesRecord.objects.create(company=store.company, store=store, transaction_date=date(2026, 10, 1), client_mobile=mobile, revenue=100)
+        content = b''.join(self.client.get('/analytics/records/export/').streaming_content).decode()
+        self.assertIn('9800000001', content)
+        self.assertNotIn('9800000002', content)
+        
+        outsider = User.objects.create_user(email='staff@example.com', password='x', company=self.store.company, full_name='Staff')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get('/analytics/records/export/').status_code, 403)
+
+
+class ForecastingTest(TestCase):
+    """Test cases for the weekly-seasonal forecast models."""
+    
+    def test_model_choice_and_wape(self):
+        """Test the lower-error model is kept per series and WAPE is NaN for a holdout without sales."""
+        import numpy as np
+        from apps.analytics.forecasting import fit_forecasts, seasonal_smoothing
+        steady = np.tile([10.0, 20, 30, 40, 50, 60, 70], 10)
+        spike = steady.copy()
+        spike[-35:-28] *= 5  # The last training week is a one-off spike
+        quiet = steady.copy()
+        quiet[-28:] = 0
+        fit = fit_forecasts(np.stack([steady, spike, quiet]))
+        self.assertEqual(fit['model'], ['seasonal_naive', 'seasonal_smoothing', 'seasonal_naive'])
+        self.assertEqual(fit['wape'][0], 0)
+        self.assertTrue(np.isnan(fit['wape'][2]))
+        np.testing.assert_allclose(seasonal_smoothing(steady[None, :], 7)[0], steady[:7])
+    
+    def test_refresh_aligns_backtest_with_actual_days(self):
+        """Test each stored back-test row carries the actual revenue of its own day."""
+        from datetime import date, timedelta
+        from apps.analytics.models import DailySalesRollup, SalesForecast
+        from apps.analytics.forecasting import refresh_forecasts, HISTORY_DAYS, HOLDOUT_DAYS, HORIZON_DAYS
+        company = Company.objects.create(name='Forecast Co', company_code='FORECAST')
+        as_of = date(2026, 10, 1)
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(company=company, date=as_of - timedelta(days=i), region='Pune', category='Ring', revenue=1000 + i)
+            for i in range(HISTORY_DAYS)
+        ])
+        self.assertEqual(refresh_forecasts(company, as_of), 1)
+        backtest = SalesForecast.objects.filter(company=company, actual__isnull=False)
+        self.assertEqual(backtest.count(), HOLDOUT_DAYS)
+        for row in backtest:
+            self.assertEqual(row.actual, 1000 + (as_of - row.date).days)
+        self.assertEqual(SalesForecast.objects.filter(company=company, date__gt=as_of).count(), HORIZON_DAYS)
+
+
+class AnomalyScoringTest(TestCase):
+    """Test cases for daily sales anomaly scoring."""
+    
+    def _flags(self, values):
+        import numpy as np
+        import pandas as pd
+        from apps.analytics.anomalies import score_days, WINDOW_DAYS, THRESHOLD
+        matrix = pd.DataFrame({'Pune': values}, index=pd.date_range('2026-01-01', periods=len(values)))
+        score = score_days(matrix)[2][:, 0]
+        return score, {i + WINDOW_DAYS for i in np.nonzero(np.abs(np.nan_to_num(score)) > THRESHOLD)[0]}
+    
+    def _sparse(self, days):
+        # Sales on 4 days in 10 and a return-only day in 10
+        pattern = [48000, 0, 0, 52000, 0, 50000, 0, 0, 55000, -30000]
+        return [float(pattern[d % 10]) for d in range(days)]
+    
+    def test_sparse_location_with_returns(self):
+        """Test a location selling on 40% of days is scored on its selling days only."""
+        values = self._sparse(90)
+        score, flags = self._flags(values)
+        self.assertEqual(flags, set())
+        self.assertFalse(any(s == s for s, v in zip(score, values[28:]) if v <= 0))  # NaN on non-selling days
+        values[85] = 400000
+        self.assertEqual(self._flags(values)[1], {85})
+    
+    def test_daily_location_missing_day(self):
+        """Test a day without sales is flagged as a drop for a location that sells daily."""
+        values = [50000.0 + 1000 * (d % 5) for d in range(60)]
+        values[45] = 0
+        score, flags = self._flags(values)
+        self.assertEqual(flags, {45})
+        self.assertLess(score[45 - 28], 0)